@@ -1,5 +1,14 @@
-from django.contrib import admin
-from .models import Cita, Solicitante, Interaccion, DisponibilidadHoraria
+from django.conf import settings
+from django.contrib import admin, messages
+from django.db import transaction
+from .models import (
+    Cita, Solicitante, Interaccion, DisponibilidadHoraria, OperacionTeams, SincronizacionCalendario,
+    ReunionPreaprovisionada, LlamadaGraph, EmailSaliente
+)
+from .email_utils import enviar_email_cancelacion_cita
+from .services.telemetria_graph import resumen_por_hora
+from .signals import suspender_efectos_teams
+from .utils import crear_reuniones_teams_automaticas
 
 
 @admin.register(Solicitante)
@@ -102,6 +111,7 @@ class CitaAdmin(admin.ModelAdmin):
         'fecha_creacion',
         'fecha_actualizacion'
     ]
+    actions = ['crear_reuniones_teams', 'cancelar_citas']
     
     fieldsets = (
         ('Solicitante', {
@@ -132,6 +142,36 @@ class CitaAdmin(admin.ModelAdmin):
         return obj.get_documento_solicitante()
     get_documento.short_description = 'Documento'
     
+    @admin.action(description='Crear reuniones de Teams faltantes')
+    def crear_reuniones_teams(self, request, queryset):
+        """Crea en lote (Graph $batch) las reuniones de las citas agendadas sin enlace"""
+        citas = queryset.filter(estado='agendada').select_related('solicitante', 'usuario')
+        resultados = crear_reuniones_teams_automaticas(citas)
+        
+        creadas = sum(1 for url in resultados.values() if url)
+        self.message_user(request, f"Reuniones de Teams creadas: {creadas}/{len(resultados)}")
+        if creadas < len(resultados):
+            self.message_user(request, "Algunas reuniones no se pudieron crear, revisar el log", messages.WARNING)
+    
+    @admin.action(description='Cancelar citas seleccionadas')
+    def cancelar_citas(self, request, queryset):
+        """
+        Cancela las citas agendadas y envía el email de cancelación de cada una
+        Las eliminaciones de Teams se registran en el outbox con un solo INSERT al final
+        (suspender_efectos_teams), así que la acción no espera a Graph y un fallo de Graph
+        se reintenta en lugar de dejar el evento huérfano.
+        """
+        citas = list(queryset.filter(estado='agendada').select_related('solicitante'))
+        
+        with transaction.atomic(), suspender_efectos_teams(diferir=True):
+            for cita in citas:
+                cita.estado = 'cancelada'
+                cita.guardar_cambios()
+                if cita.solicitante_id:
+                    enviar_email_cancelacion_cita(cita)
+        
+        self.message_user(request, f"Citas canceladas: {len(citas)}")
+    
     # Personalizar el formulario para mostrar datos relevantes
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
         if db_field.name == "solicitante":
@@ -218,3 +258,165 @@ class DisponibilidadHorariaAdmin(admin.ModelAdmin):
             )
         }),
     )
+
+
+@admin.register(OperacionTeams)
+class OperacionTeamsAdmin(admin.ModelAdmin):
+    """
+    Configuración del admin para el outbox de operaciones de Teams (solo lectura)
+    """
+    list_display = [
+        'id',
+        'tipo',
+        'cita',
+        'estado',
+        'plazo',
+        'intentos',
+        'proximo_intento',
+        'fecha_creacion'
+    ]
+    list_filter = [
+        'estado',
+        'tipo',
+        'fecha_creacion'
+    ]
+    search_fields = ['cita__id', 'teams_event_id']
+    readonly_fields = [
+        'cita',
+        'tipo',
+        'teams_event_id',
+        'plazo',
+        'intentos',
+        'ultimo_error',
+        'fecha_creacion',
+        'fecha_procesada'
+    ]
+    raw_id_fields = ['cita']
+
+
+@admin.register(EmailSaliente)
+class EmailSalienteAdmin(admin.ModelAdmin):
+    """
+    Configuración del admin para el outbox de emails (solo lectura)
+    """
+    list_display = [
+        'id',
+        'tipo',
+        'asunto',
+        'cita',
+        'estado',
+        'intentos',
+        'proximo_intento',
+        'fecha_creacion',
+        'fecha_envio'
+    ]
+    list_filter = [
+        'estado',
+        'tipo',
+        'fecha_creacion'
+    ]
+    search_fields = ['cita__id', 'asunto', 'destinatarios']
+    readonly_fields = [
+        'cita',
+        'tipo',
+        'destinatarios',
+        'asunto',
+        'cuerpo_texto',
+        'cuerpo_html',
+        'intentos',
+        'ultimo_error',
+        'fecha_creacion',
+        'fecha_envio'
+    ]
+    raw_id_fields = ['cita']
+
+
+@admin.register(SincronizacionCalendario)
+class SincronizacionCalendarioAdmin(admin.ModelAdmin):
+    """
+    Configuración del admin para el estado de la reconciliación del calendario de Teams
+    Borrar el registro (o vaciar el delta link) fuerza una sincronización completa.
+    """
+    list_display = [
+        'buzon',
+        'ultima_ejecucion',
+        'eventos_procesados',
+        'iniciada_en',
+        'ventana_fin'
+    ]
+    readonly_fields = [
+        'buzon',
+        'ventana_inicio',
+        'ventana_fin',
+        'iniciada_en',
+        'ultima_ejecucion',
+        'eventos_procesados'
+    ]
+
+
+@admin.register(ReunionPreaprovisionada)
+class ReunionPreaprovisionadaAdmin(admin.ModelAdmin):
+    """
+    Configuración del admin para el pool de reuniones de Teams preaprovisionadas (solo lectura)
+    """
+    list_display = [
+        'fecha',
+        'hora_inicio',
+        'estado',
+        'cita',
+        'fecha_creacion',
+        'fecha_asignacion'
+    ]
+    list_filter = [
+        'estado',
+        'fecha'
+    ]
+    search_fields = ['cita__id', 'teams_event_id']
+    readonly_fields = [
+        'fecha',
+        'hora_inicio',
+        'teams_event_id',
+        'url_teams',
+        'estado',
+        'cita',
+        'fecha_creacion',
+        'fecha_asignacion'
+    ]
+    raw_id_fields = ['cita']
+
+
+@admin.register(LlamadaGraph)
+class LlamadaGraphAdmin(admin.ModelAdmin):
+    """
+    Configuración del admin para la telemetría de Microsoft Graph (solo lectura)
+    Sobre el listado se muestra la latencia p95 y las tasas de error y de limitación
+    por hora, para saber si la lentitud al agendar viene de Graph.
+    """
+    change_list_template = 'admin/citas/llamadagraph/change_list.html'
+    list_display = [
+        'fecha',
+        'operacion',
+        'status',
+        'latencia_ms',
+        'reintento',
+        'limitada'
+    ]
+    list_filter = [
+        'operacion',
+        'limitada',
+        'status',
+        'fecha'
+    ]
+    date_hierarchy = 'fecha'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        extra_context['horas_panel'] = settings.TEAMS_TELEMETRIA_HORAS_PANEL
+        extra_context['panel'] = resumen_por_hora(settings.TEAMS_TELEMETRIA_HORAS_PANEL)
+        return super().changelist_view(request, extra_context=extra_context)
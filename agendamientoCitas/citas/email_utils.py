@@ -1,7 +1,15 @@
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
+import logging
+from datetime import timedelta
+
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.conf import settings
-from django.utils.html import strip_tags
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .services.render_email import renderizador_emails
+
+logger = logging.getLogger(__name__)
 
 
 def enviar_email_confirmacion_cita(cita):
@@ -12,45 +20,30 @@ def enviar_email_confirmacion_cita(cita):
         cita: Objeto Cita que fue creado
     
     Returns:
-        bool: True si el email se envió correctamente, False en caso contrario
+        bool: True si el email quedó registrado para envío, False en caso contrario
     """
     try:
         # Preparar contexto para el template
         context = {
             'cita': cita,
             'site_url': settings.SITE_URL if hasattr(settings, 'SITE_URL') else 'http://localhost:8000',
+            'url_cancelacion': cita.get_url_cancelacion(),
         }
         
-        # Renderizar template HTML
-        html_content = render_to_string('emails/confirmacion_cita.html', context)
-        
-        # Crear versión texto plano (fallback)
-        text_content = strip_tags(html_content)
+        # Renderizar versiones texto plano y HTML (plantillas precompiladas)
+        text_content, html_content = renderizador_emails.renderizar('confirmacion_cita', context)
         
         # Preparar email
         subject = f'Confirmación de Cita - {cita.fecha.strftime("%d/%m/%Y")}'
-        from_email = settings.DEFAULT_FROM_EMAIL
         to_email = [cita.solicitante.correo_electronico]
         
-        # Crear mensaje
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=from_email,
-            to=to_email
-        )
-        
-        # Adjuntar versión HTML
-        msg.attach_alternative(html_content, "text/html")
-        
-        # Enviar
-        msg.send()
+        # Registrar en el outbox (lo envía un worker de Celery)
+        registrar_email('confirmacion', subject, text_content, to_email, html_content, cita)
         
         return True
         
     except Exception as e:
-        # Log del error (en producción usar logging apropiado)
-        print(f"Error al enviar email de confirmación: {str(e)}")
+        logger.error(f"[ERROR] No se pudo registrar el email de confirmación de cita #{cita.id}: {str(e)}")
         return False
 
 
@@ -62,7 +55,7 @@ def enviar_email_cancelacion_cita(cita):
         cita: Objeto Cita que fue cancelado
     
     Returns:
-        bool: True si el email se envió correctamente, False en caso contrario
+        bool: True si el email quedó registrado para envío, False en caso contrario
     """
     try:
         # Preparar contexto para el template
@@ -71,36 +64,20 @@ def enviar_email_cancelacion_cita(cita):
             'site_url': settings.SITE_URL if hasattr(settings, 'SITE_URL') else 'http://localhost:8000',
         }
         
-        # Renderizar template HTML
-        html_content = render_to_string('emails/cancelacion_cita.html', context)
-        
-        # Crear versión texto plano (fallback)
-        text_content = strip_tags(html_content)
+        # Renderizar versiones texto plano y HTML (plantillas precompiladas)
+        text_content, html_content = renderizador_emails.renderizar('cancelacion_cita', context)
         
         # Preparar email
         subject = f'Cita Cancelada - {cita.fecha.strftime("%d/%m/%Y")}'
-        from_email = settings.DEFAULT_FROM_EMAIL
         to_email = [cita.solicitante.correo_electronico]
         
-        # Crear mensaje
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=from_email,
-            to=to_email
-        )
-        
-        # Adjuntar versión HTML
-        msg.attach_alternative(html_content, "text/html")
-        
-        # Enviar
-        msg.send()
+        # Registrar en el outbox (lo envía un worker de Celery)
+        registrar_email('cancelacion', subject, text_content, to_email, html_content, cita)
         
         return True
         
     except Exception as e:
-        # Log del error (en producción usar logging apropiado)
-        print(f"Error al enviar email de cancelación: {str(e)}")
+        logger.error(f"[ERROR] No se pudo registrar el email de cancelación de cita #{cita.id}: {str(e)}")
         return False
 
 
@@ -113,7 +90,7 @@ def enviar_email_recordatorio_cita(cita):
         cita: Objeto Cita próxima
     
     Returns:
-        bool: True si el email se envió correctamente, False en caso contrario
+        bool: True si el email quedó registrado para envío, False en caso contrario
     """
     try:
         # Preparar contexto para el template
@@ -123,11 +100,10 @@ def enviar_email_recordatorio_cita(cita):
         }
         
         # Renderizar template HTML (crear después si lo necesitas)
-        # html_content = render_to_string('emails/recordatorio_cita.html', context)
+        # text_content, html_content = renderizador_emails.renderizar('recordatorio_cita', context)
         
         # Por ahora, texto simple
         subject = f'Recordatorio: Cita Mañana - {cita.fecha.strftime("%d/%m/%Y")}'
-        from_email = settings.DEFAULT_FROM_EMAIL
         to_email = [cita.solicitante.correo_electronico]
         
         message = f"""
@@ -144,18 +120,164 @@ def enviar_email_recordatorio_cita(cita):
         Sistema de Agendamiento ATENEA
         """
         
-        # Crear y enviar mensaje
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            body=message,
-            from_email=from_email,
-            to=to_email
-        )
-        
-        msg.send()
+        # Registrar en el outbox (lo envía un worker de Celery)
+        registrar_email('recordatorio', subject, message, to_email, cita=cita)
         
         return True
         
     except Exception as e:
-        print(f"Error al enviar email recordatorio: {str(e)}")
-        return False
\ No newline at end of file
+        logger.error(f"[ERROR] No se pudo registrar el email recordatorio de cita #{cita.id}: {str(e)}")
+        return False
+
+
+def registrar_email(tipo, asunto, cuerpo_texto, destinatarios, cuerpo_html='', cita=None):
+    """
+    Registra un email en el outbox y programa su envío en Celery
+    Si se llama dentro de una transacción, el email solo existe (y se envía) si la
+    transacción se confirma.
+    
+    Args:
+        tipo: Uno de EmailSaliente.TIPO_CHOICES
+        asunto: Asunto del email
+        cuerpo_texto: Versión texto plano
+        destinatarios: Lista de direcciones
+        cuerpo_html: Versión HTML (opcional)
+        cita: Cita relacionada (opcional)
+    
+    Returns:
+        EmailSaliente registrado
+    """
+    from .models import EmailSaliente
+    
+    email = EmailSaliente.objects.create(
+        cita=cita,
+        tipo=tipo,
+        destinatarios=list(destinatarios),
+        asunto=asunto,
+        cuerpo_texto=cuerpo_texto,
+        cuerpo_html=cuerpo_html,
+    )
+    logger.info(f"[EMAIL] Email #{email.pk} ({tipo}) registrado para {', '.join(email.destinatarios)}")
+    
+    # robust: si el broker no responde, la tarea periódica envía el email
+    transaction.on_commit(_encolar_envio_emails, robust=True)
+    return email
+
+
+def _encolar_envio_emails():
+    from .tasks import procesar_outbox_email
+    procesar_outbox_email.delay()
+
+
+def enviar_emails_pendientes() -> dict:
+    """
+    Envía los emails vencidos del outbox reutilizando una sola conexión SMTP
+    La conexión (STARTTLS y login) se abre una vez para todo el lote y no por email.
+    Cada email se reserva con un UPDATE condicional, así que si dos workers drenan el
+    outbox a la vez cada email lo envía uno solo. Si un envío falla, se cierra la
+    conexión y el siguiente email abre una nueva; si no se puede conectar, el resto
+    del lote se reprograma.
+    
+    Returns:
+        dict: Emails enviados, reprogramados y fallidos
+    """
+    from .models import EmailSaliente
+    
+    resumen = {'enviados': 0, 'reintentos': 0, 'fallidos': 0}
+    ahora = timezone.now()
+    
+    candidatos = list(
+        EmailSaliente.objects.filter(
+            estado__in=['pendiente', 'procesando'],
+            proximo_intento__lte=ahora,
+        ).order_by('proximo_intento').values_list('pk', flat=True)[:settings.EMAIL_OUTBOX_LOTE]
+    )
+    reservados = [pk for pk in candidatos if _reservar_email(EmailSaliente, pk, ahora)]
+    if not reservados:
+        return resumen
+    
+    emails = list(EmailSaliente.objects.filter(pk__in=reservados).order_by('pk'))
+    conexion = get_connection(fail_silently=False)
+    try:
+        for i, email in enumerate(emails):
+            try:
+                # No hace nada si la conexión ya está abierta
+                conexion.open()
+            except Exception as e:
+                logger.error(f"[ERROR] No se pudo conectar al servidor de correo: {str(e)}")
+                for pendiente in emails[i:]:
+                    _registrar_resultado_email(pendiente, f'Sin conexión al servidor de correo: {str(e)}', resumen)
+                break
+            
+            try:
+                enviados = conexion.send_messages([_mensaje_email(email, conexion)])
+                error = '' if enviados else 'El servidor de correo no aceptó el mensaje'
+            except Exception as e:
+                error = str(e)
+                _cerrar_conexion(conexion)
+            _registrar_resultado_email(email, error, resumen)
+    finally:
+        _cerrar_conexion(conexion)
+    
+    logger.info(
+        f"[EMAIL] Outbox: {resumen['enviados']} enviados, {resumen['reintentos']} reprogramados, "
+        f"{resumen['fallidos']} fallidos"
+    )
+    return resumen
+
+
+def _reservar_email(EmailSaliente, pk, ahora) -> bool:
+    """Reserva el email para este worker; False si otro ya lo tomó"""
+    return bool(
+        EmailSaliente.objects.filter(
+            pk=pk,
+            estado__in=['pendiente', 'procesando'],
+            proximo_intento__lte=ahora,
+        ).update(
+            estado='procesando',
+            proximo_intento=ahora + timedelta(seconds=settings.EMAIL_OUTBOX_RESERVA_SEGUNDOS),
+            intentos=F('intentos') + 1,
+        )
+    )
+
+
+def _mensaje_email(email, conexion):
+    mensaje = EmailMultiAlternatives(
+        subject=email.asunto,
+        body=email.cuerpo_texto,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=email.destinatarios,
+        connection=conexion,
+    )
+    if email.cuerpo_html:
+        mensaje.attach_alternative(email.cuerpo_html, "text/html")
+    return mensaje
+
+
+def _registrar_resultado_email(email, error, resumen):
+    """Guarda el estado del email: enviado, reprogramado con backoff exponencial o fallido"""
+    if not error:
+        email.estado = 'enviado'
+        email.fecha_envio = timezone.now()
+        resumen['enviados'] += 1
+    elif email.intentos >= settings.EMAIL_OUTBOX_MAX_INTENTOS:
+        email.estado = 'fallido'
+        resumen['fallidos'] += 1
+        logger.error(f"[ERROR] Email #{email.pk} descartado tras {email.intentos} intentos: {error}")
+    else:
+        email.estado = 'pendiente'
+        espera = settings.EMAIL_OUTBOX_BACKOFF_SEGUNDOS * 2 ** (email.intentos - 1)
+        email.proximo_intento = timezone.now() + timedelta(seconds=espera)
+        resumen['reintentos'] += 1
+        logger.warning(f"[WARN] Email #{email.pk} no enviado, reintento en {espera} s: {error}")
+    
+    email.ultimo_error = error
+    email.save(update_fields=['estado', 'proximo_intento', 'ultimo_error', 'fecha_envio'])
+
+
+def _cerrar_conexion(conexion):
+    try:
+        conexion.close()
+    except Exception:
+        # El servidor ya cerró la conexión: no hay nada que liberar
+        pass
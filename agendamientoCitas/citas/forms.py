@@ -344,7 +344,19 @@ class SolicitanteForm(forms.ModelForm):
             'tiene_discapacidad': '¿Tienes alguna discapacidad?',
             'tipo_discapacidad': 'Tipo de discapacidad (si aplica)',
         }
-    
+
+    def __init__(self, *args, **kwargs):
+        """Ocultar las opciones legadas, salvo la que ya tenga registrada el solicitante"""
+        super().__init__(*args, **kwargs)
+
+        for campo, claves in Solicitante.OPCIONES_LEGADAS.items():
+            legados = {Solicitante.get_codigo_opcion(campo, clave) for clave in claves}
+            actual = self.initial.get(campo)
+            self.fields[campo].choices = [
+                (codigo, etiqueta) for codigo, etiqueta in self.fields[campo].choices
+                if codigo not in legados or str(codigo) == str(actual)
+            ]
+
     def clean_numero_documento(self):
         """Validar formato del número de documento"""
         numero = self.cleaned_data.get('numero_documento')
@@ -0,0 +1,122 @@
+# citas/management/commands/benchmark_emails.py
+
+import time
+from datetime import date, timedelta, time as hora
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+from django.utils.html import strip_tags
+
+from citas.services.render_email import PlantillaEmail
+from citas.services.telemetria_graph import percentil
+
+EMAILS = ['confirmacion_cita', 'cancelacion_cita', 'teams_creado', 'teams_actualizado']
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el costo de renderizar cada email: render_to_string + strip_tags (antes) '
+        'contra las plantillas precompiladas con texto plano dedicado (después). No usa la BD'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iteraciones', type=int, default=500, help='Renders por email y método (default: 500)')
+        parser.add_argument('--email', choices=EMAILS, help='Medir solo este email')
+
+    def handle(self, *args, **options):
+        if options['iteraciones'] < 1:
+            raise CommandError('--iteraciones debe ser mayor que 0')
+
+        emails = [options['email']] if options['email'] else EMAILS
+        contextos = self._contextos()
+
+        self.stdout.write("=" * 70)
+        self.stdout.write(self.style.SUCCESS(
+            f"⏱️  BENCHMARK RENDER DE EMAILS ({options['iteraciones']} renders por email y método)"
+        ))
+        self.stdout.write("=" * 70)
+
+        for nombre in emails:
+            contexto = contextos[nombre]
+
+            def antes():
+                html = render_to_string(f'emails/{nombre}.html', contexto)
+                return strip_tags(html), html
+
+            inicio = time.perf_counter()
+            plantilla = PlantillaEmail(nombre)
+            compilacion = time.perf_counter() - inicio
+
+            # Un render previo de cada método: la primera carga de la plantilla no cuenta
+            antes()
+            plantilla.renderizar(contexto)
+
+            latencias_antes = self._medir(antes, options['iteraciones'])
+            latencias_despues = self._medir(lambda: plantilla.renderizar(contexto), options['iteraciones'])
+            self._reportar(nombre, latencias_antes, latencias_despues, compilacion, antes(), plantilla.renderizar(contexto))
+
+        self.stdout.write("=" * 70)
+
+    def _medir(self, renderizar, iteraciones):
+        latencias = []
+        for _ in range(iteraciones):
+            inicio = time.perf_counter()
+            renderizar()
+            latencias.append(time.perf_counter() - inicio)
+        return sorted(latencias)
+
+    def _contextos(self):
+        """Contextos de ejemplo con objetos sin guardar (mismos datos que usan las vistas y utils)"""
+        from citas.models import Cita, Solicitante
+
+        solicitante = Solicitante(
+            tipo_documento='CC',
+            numero_documento='1000000000',
+            nombre='Benchmark',
+            apellido='Email',
+            celular='3000000000',
+            correo_electronico='benchmark@example.com',
+        )
+        cita = Cita(
+            pk=1,
+            solicitante=solicitante,
+            fecha=date.today() + timedelta(days=1),
+            hora_inicio=hora(14, 0),
+            hora_fin=hora(14, 20),
+            estado='agendada',
+            motivo='Benchmark',
+            url_teams='https://teams.microsoft.com/l/meetup-join/benchmark',
+        )
+        base = {'cita': cita, 'site_url': 'http://localhost:8000'}
+        teams = {
+            'cita': cita,
+            'nombre_solicitante': str(solicitante),
+            'fecha': cita.fecha.strftime('%d/%m/%Y'),
+            'hora': cita.hora_inicio.strftime('%H:%M'),
+            'url_teams': cita.url_teams,
+            'motivo': cita.motivo,
+            'tipo_atencion': 'Virtual',
+            'duracion': 20,
+        }
+        return {
+            'confirmacion_cita': dict(base, url_cancelacion='http://localhost:8000/citas/cancelar/token/'),
+            'cancelacion_cita': base,
+            'teams_creado': teams,
+            'teams_actualizado': teams,
+        }
+
+    def _reportar(self, nombre, antes, despues, compilacion, salida_antes, salida_despues):
+        def ms(segundos):
+            return f"{segundos * 1000:.3f} ms"
+
+        self.stdout.write("")
+        self.stdout.write(self.style.SUCCESS(f"📧 {nombre}"))
+        self.stdout.write(f"   {'':18}{'antes':>14}{'después':>14}")
+        for p in (50, 95, 99):
+            self.stdout.write(f"   {f'p{p}:':18}{ms(percentil(antes, p)):>14}{ms(percentil(despues, p)):>14}")
+        mediana_despues = percentil(despues, 50)
+        mejora = percentil(antes, 50) / mediana_despues if mediana_despues else 0
+        self.stdout.write(f"   {'Mejora (p50):':18}{f'{mejora:.1f}x':>28}")
+        self.stdout.write(f"   {'Tamaño texto/HTML:':18}{f'{len(salida_antes[0])}/{len(salida_antes[1])}':>14}"
+                          f"{f'{len(salida_despues[0])}/{len(salida_despues[1])}':>14}")
+        self.stdout.write(f"   Compilación (una vez por proceso): {ms(compilacion)}")
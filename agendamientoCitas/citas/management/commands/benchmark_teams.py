@@ -0,0 +1,302 @@
+# citas/management/commands/benchmark_teams.py
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, time as hora
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from citas.services.circuit_breaker import CircuitBreaker
+from citas.services.graph_simulado import ServidorGraphSimulado
+from citas.services.microsoft_teams_service import MicrosoftTeamsService, teams_service
+from citas.services.telemetria_graph import percentil
+
+MODOS = ['servicio', 'automatica', 'batch', 'async']
+
+
+def preparar_servicio_simulado(servicio, url):
+    """
+    Apunta una instancia de MicrosoftTeamsService al Graph simulado en url
+    MSAL solo acepta authorities https, así que el token se pide directamente al
+    token endpoint simulado y se deja en el cache en memoria del servicio.
+    """
+    tenant = settings.MICROSOFT_TENANT_ID or 'simulado'
+    try:
+        respuesta = requests.post(
+            f"{url}/{tenant}/oauth2/v2.0/token",
+            data={'grant_type': 'client_credentials', 'scope': ' '.join(settings.MICROSOFT_GRAPH_SCOPES)},
+            timeout=10,
+        )
+        respuesta.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        raise CommandError(f"No se pudo obtener token del Graph simulado en {url}: {e}")
+
+    datos = respuesta.json()
+    servicio._access_token = datos['access_token']
+    servicio._token_expiry = datetime.now() + timedelta(seconds=datos['expires_in'])
+    servicio.endpoint = f"{url}/v1.0"
+    servicio.user_id = servicio.user_id or 'organizador-simulado'
+    servicio.organizadores = [servicio.user_id]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide latencia (p50/p95/p99) y throughput de la integración con Teams contra un '
+        'Microsoft Graph simulado local (no usa el tenant real)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--modo',
+            choices=MODOS,
+            default='servicio',
+            help=(
+                'servicio: crear_reunion_teams | automatica: crear_reunion_teams_automatica '
+                '(incluye BD y email, secuencial) | batch: crear_reuniones_teams_batch | '
+                'async: acrear_reuniones_teams (default: servicio)'
+            )
+        )
+        parser.add_argument('--operaciones', type=int, default=200, help='Reuniones a crear (default: 200)')
+        parser.add_argument(
+            '--concurrencia',
+            type=int,
+            default=4,
+            help='Hilos simultáneos; en modo async, peticiones simultáneas (default: 4)'
+        )
+        parser.add_argument('--tamano-lote', type=int, default=20, help='Operaciones por llamada en modo batch (default: 20)')
+        parser.add_argument('--latencia-ms', type=float, default=50, help='Latencia simulada por petición (default: 50)')
+        parser.add_argument('--jitter-ms', type=float, default=20, help='Latencia aleatoria adicional (default: 20)')
+        parser.add_argument('--tasa-error', type=float, default=0.0, help='Fracción de respuestas 503 (default: 0)')
+        parser.add_argument('--tasa-429', type=float, default=0.0, help='Fracción de respuestas 429 (default: 0)')
+        parser.add_argument('--retry-after', type=int, default=1, help='Retry-After de los 429 en segundos (default: 1)')
+        parser.add_argument(
+            '--url',
+            help='Usar un Graph simulado ya en ejecución (ver simular_graph) en lugar de iniciar uno'
+        )
+
+    def handle(self, *args, **options):
+        if options['operaciones'] < 1 or options['concurrencia'] < 1:
+            raise CommandError('--operaciones y --concurrencia deben ser mayores que 0')
+
+        modo = options['modo']
+        if modo == 'automatica' and options['concurrencia'] > 1:
+            self.stdout.write(self.style.WARNING('   Modo automatica: se ejecuta secuencialmente (una transacción de BD)'))
+            options['concurrencia'] = 1
+
+        servidor = None
+        if options['url']:
+            url = options['url'].rstrip('/')
+        else:
+            servidor = ServidorGraphSimulado(
+                latencia_ms=options['latencia_ms'],
+                jitter_ms=options['jitter_ms'],
+                tasa_error=options['tasa_error'],
+                tasa_429=options['tasa_429'],
+                retry_after=options['retry_after'],
+            ).iniciar_en_segundo_plano()
+            url = servidor.url
+
+        self.stdout.write("=" * 70)
+        self.stdout.write(self.style.SUCCESS(
+            f"⏱️  BENCHMARK TEAMS - modo {modo} ({options['operaciones']} operaciones, "
+            f"concurrencia {options['concurrencia']})"
+        ))
+        if servidor:
+            self.stdout.write(
+                f"   Graph simulado: {url} (latencia {options['latencia_ms']:.0f}±{options['jitter_ms']:.0f} ms, "
+                f"429 {options['tasa_429']:.0%}, 503 {options['tasa_error']:.0%})"
+            )
+        else:
+            self.stdout.write(f"   Graph simulado externo: {url}")
+        self.stdout.write("=" * 70)
+
+        # El log por petición distorsiona la medición y ensucia la salida
+        if options['verbosity'] < 2:
+            logging.disable(logging.INFO)
+
+        try:
+            servicio = self._preparar_servicio(MicrosoftTeamsService(), url)
+            medir = getattr(self, f'_medir_{modo}')
+            # Las llamadas al Graph simulado no van a la telemetría real
+            with override_settings(TEAMS_TELEMETRIA_ACTIVA=False):
+                inicio = time.perf_counter()
+                latencias, exitosas = medir(servicio, url, options)
+                total = time.perf_counter() - inicio
+        finally:
+            logging.disable(logging.NOTSET)
+            if servidor:
+                servidor.detener()
+
+        self._reportar(latencias, exitosas, total, options, servidor)
+
+    # --------------------------------------------
+    # Preparación
+    # --------------------------------------------
+
+    def _preparar_servicio(self, servicio, url):
+        """Apunta el servicio al Graph simulado con un circuito propio"""
+        preparar_servicio_simulado(servicio, url)
+
+        # Circuito propio: los errores simulados no deben abrir el circuito real de Graph
+        servicio.circuito = CircuitBreaker('graph-benchmark')
+        servicio.circuito.registrar_exito()
+        return servicio
+
+    def _datos_reunion(self, indice):
+        inicio = timezone.make_aware(datetime.combine(date.today() + timedelta(days=1), hora(14, 0)))
+        return {
+            'asunto': f'Benchmark #{indice}',
+            'fecha_inicio': inicio + timedelta(minutes=20 * (indice % 6)),
+            'duracion_minutos': settings.DURACION_CITA_MINUTOS,
+            'descripcion': '<p>Reunión de benchmark</p>',
+            'asistentes': [f'benchmark{indice}@example.com'],
+        }
+
+    # --------------------------------------------
+    # Modos
+    # --------------------------------------------
+
+    def _medir_servicio(self, servicio, url, options):
+        def crear(indice):
+            inicio = time.perf_counter()
+            reunion = servicio.crear_reunion_teams(**self._datos_reunion(indice))
+            return time.perf_counter() - inicio, reunion is not None
+
+        with ThreadPoolExecutor(max_workers=options['concurrencia']) as pool:
+            resultados = list(pool.map(crear, range(options['operaciones'])))
+
+        return [latencia for latencia, _ in resultados], sum(1 for _, ok in resultados if ok)
+
+    def _medir_batch(self, servicio, url, options):
+        tamano = options['tamano_lote']
+        lotes = [
+            range(i, min(i + tamano, options['operaciones']))
+            for i in range(0, options['operaciones'], tamano)
+        ]
+
+        def crear_lote(indices):
+            inicio = time.perf_counter()
+            resultados = servicio.crear_reuniones_teams_batch({i: self._datos_reunion(i) for i in indices})
+            return time.perf_counter() - inicio, sum(1 for reunion in resultados.values() if reunion)
+
+        with ThreadPoolExecutor(max_workers=options['concurrencia']) as pool:
+            resultados = list(pool.map(crear_lote, lotes))
+
+        # En este modo la latencia es por llamada ($batch de hasta --tamano-lote operaciones)
+        return [latencia for latencia, _ in resultados], sum(exitosas for _, exitosas in resultados)
+
+    def _medir_async(self, servicio, url, options):
+        async def crear(indice):
+            inicio = time.perf_counter()
+            reunion = await servicio.acrear_reunion_teams(**self._datos_reunion(indice))
+            return time.perf_counter() - inicio, reunion is not None
+
+        async def ejecutar():
+            try:
+                return await asyncio.gather(*(crear(i) for i in range(options['operaciones'])))
+            finally:
+                await servicio.aclose()
+
+        with override_settings(MICROSOFT_GRAPH_MAX_CONCURRENCIA=options['concurrencia']):
+            resultados = asyncio.run(ejecutar())
+
+        return [latencia for latencia, _ in resultados], sum(1 for _, ok in resultados if ok)
+
+    def _medir_automatica(self, servicio, url, options):
+        """
+        Mide crear_reunion_teams_automatica completo (Graph + guardar la cita + email)
+        Usa el singleton apuntado al Graph simulado; las citas se crean en una transacción
+        que se revierte al final y los emails van al backend en memoria.
+        """
+        from citas.models import Cita, Solicitante
+        from citas.utils import crear_reunion_teams_automatica
+
+        atributos = ['endpoint', 'user_id', 'organizadores', 'circuito', '_access_token', '_token_expiry']
+        originales = {atributo: getattr(teams_service, atributo) for atributo in atributos}
+        for atributo in atributos:
+            setattr(teams_service, atributo, getattr(servicio, atributo))
+
+        latencias = []
+        exitosas = 0
+        try:
+            with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+                with transaction.atomic():
+                    citas = self._crear_citas(Cita, Solicitante, options['operaciones'])
+
+                    for cita in citas:
+                        inicio = time.perf_counter()
+                        if crear_reunion_teams_automatica(cita):
+                            exitosas += 1
+                        latencias.append(time.perf_counter() - inicio)
+
+                    transaction.set_rollback(True)
+        finally:
+            for atributo, valor in originales.items():
+                setattr(teams_service, atributo, valor)
+
+        return latencias, exitosas
+
+    def _crear_citas(self, Cita, Solicitante, cantidad):
+        """Crea citas de prueba sin disparar signals (bulk_create)"""
+        codigos = {campo: 1 for campo in Solicitante.OPCIONES_CODIFICADAS}
+        solicitantes = Solicitante.objects.bulk_create([
+            Solicitante(
+                tipo_documento='CC',
+                numero_documento=f'BENCH{i:06d}',
+                nombre='Benchmark',
+                apellido=f'#{i}',
+                celular='3000000000',
+                correo_electronico=f'benchmark{i}@example.com',
+                **codigos,
+            )
+            for i in range(cantidad)
+        ])
+
+        fecha = date.today() + timedelta(days=1)
+        return Cita.objects.bulk_create([
+            Cita(
+                solicitante=solicitante,
+                fecha=fecha,
+                hora_inicio=hora(14, 0),
+                hora_fin=hora(14, 20),
+                estado='agendada',
+                motivo='Benchmark',
+            )
+            for solicitante in solicitantes
+        ])
+
+    # --------------------------------------------
+    # Reporte
+    # --------------------------------------------
+
+    def _reportar(self, latencias, exitosas, total, options, servidor):
+        ordenadas = sorted(latencias)
+        unidad = 'llamada $batch' if options['modo'] == 'batch' else 'operación'
+
+        self.stdout.write("")
+        self.stdout.write(f"Exitosas:           {exitosas}/{options['operaciones']}")
+        self.stdout.write(f"Tiempo total:       {total:.2f} s")
+        self.stdout.write(f"Throughput:         {options['operaciones'] / total if total else 0:.1f} operaciones/s")
+        if options['modo'] == 'async':
+            # Todas las operaciones se lanzan a la vez: incluye la espera por el semáforo
+            self.stdout.write(f"Latencia por {unidad} (incluye espera por el límite de concurrencia):")
+        else:
+            self.stdout.write(f"Latencia por {unidad}:")
+        for p in (50, 95, 99):
+            self.stdout.write(f"  p{p}:              {percentil(ordenadas, p) * 1000:.1f} ms")
+        self.stdout.write(f"  máx:              {(ordenadas[-1] if ordenadas else 0) * 1000:.1f} ms")
+
+        if servidor:
+            estadisticas = servidor.estadisticas
+            self.stdout.write(
+                f"Peticiones HTTP:    {estadisticas['peticiones']} "
+                f"(429: {estadisticas['429']}, 503: {estadisticas['503']})"
+            )
+        self.stdout.write("=" * 70)
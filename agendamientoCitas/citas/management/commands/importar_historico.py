@@ -0,0 +1,246 @@
+# citas/management/commands/importar_historico.py
+
+import csv
+import json
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from citas.models import Cita, Solicitante
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+CAMPOS_SOLICITANTE = [
+    'tipo_documento',
+    'numero_documento',
+    'nombre',
+    'apellido',
+    'celular',
+    'correo_electronico',
+    'tipo_discapacidad',
+]
+
+CAMPOS_CITA = ['fecha', 'hora_inicio', 'hora_fin', 'estado', 'motivo', 'url_teams']
+
+VALORES_VERDADEROS = {'1', 'true', 'si', 'sí', 's', 'yes', 'y'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa citas y solicitantes históricos desde un archivo CSV o JSONL. '
+        'Escribe por lotes con bulk_create: no dispara signals ni llama a Microsoft Graph.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo .csv o .jsonl (una cita por fila)')
+        parser.add_argument(
+            '--formato',
+            choices=['csv', 'jsonl'],
+            help='Formato del archivo (por defecto se deduce de la extensión)'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Filas validadas y escritas por transacción (default: 1000)'
+        )
+        parser.add_argument(
+            '--estado-por-defecto',
+            default='completada',
+            choices=[estado for estado, _ in Cita.ESTADO_CHOICES],
+            help="Estado de la cita si la fila no trae 'estado' (default: completada)"
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo valida el archivo, sin escribir en la base de datos'
+        )
+        parser.add_argument(
+            '--max-errores',
+            type=int,
+            default=50,
+            help='Cantidad máxima de errores de fila a mostrar (default: 50)'
+        )
+
+    def handle(self, *args, **options):
+        archivo = options['archivo']
+        formato = options['formato'] or archivo.rsplit('.', 1)[-1].lower()
+        if formato not in ('csv', 'jsonl'):
+            raise CommandError("No se pudo deducir el formato: usar --formato csv|jsonl")
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que 0')
+
+        self.estado_por_defecto = options['estado_por_defecto']
+        self.duracion = timedelta(minutes=settings.DURACION_CITA_MINUTOS)
+        dry_run = options['dry_run']
+        max_errores = options['max_errores']
+
+        self.stdout.write("=" * 70)
+        self.stdout.write(self.style.SUCCESS(f"📥 IMPORTACIÓN HISTÓRICA ({formato.upper()}) - {archivo}"))
+        if dry_run:
+            self.stdout.write(self.style.WARNING("   Modo --dry-run: no se escribirá nada"))
+        self.stdout.write("=" * 70)
+
+        total = importadas = errores = 0
+        inicio = time.perf_counter()
+
+        try:
+            with open(archivo, encoding='utf-8-sig', newline='') as fh:
+                filas = self._leer_filas(fh, formato)
+
+                while True:
+                    lote = list(islice(filas, options['lote']))
+                    if not lote:
+                        break
+
+                    validas = []
+                    for numero_fila, fila in lote:
+                        try:
+                            validas.append(self._construir(fila))
+                        except (ValidationError, ValueError) as e:
+                            errores += 1
+                            if errores <= max_errores:
+                                self.stdout.write(self.style.ERROR(f"  ❌ Fila {numero_fila}: {self._mensaje(e)}"))
+
+                    if validas and not dry_run:
+                        self._escribir_lote(validas)
+
+                    total += len(lote)
+                    importadas += len(validas)
+
+                    transcurrido = time.perf_counter() - inicio
+                    self.stdout.write(
+                        f"  • {total} filas procesadas ({importadas} válidas, {errores} con error) "
+                        f"- {total / transcurrido:.0f} filas/s"
+                    )
+        except FileNotFoundError:
+            raise CommandError(f"No existe el archivo: {archivo}")
+
+        transcurrido = time.perf_counter() - inicio
+
+        self.stdout.write("")
+        self.stdout.write("=" * 70)
+        self.stdout.write(f"Filas leídas:       {total}")
+        self.stdout.write(f"Citas {'validadas' if dry_run else 'importadas'}:  {importadas}")
+        self.stdout.write(f"Filas con error:    {errores}")
+        self.stdout.write(f"Tiempo total:       {transcurrido:.2f} s")
+        self.stdout.write(f"Rendimiento:        {total / transcurrido if transcurrido else 0:.0f} filas/s")
+        memoria = self._memoria_pico_mb()
+        if memoria is not None:
+            self.stdout.write(f"Memoria pico:       {memoria:.1f} MB")
+        self.stdout.write("=" * 70)
+
+    def _leer_filas(self, fh, formato):
+        """Genera (número de fila, dict) sin cargar el archivo completo en memoria"""
+        if formato == 'csv':
+            # La fila 1 es el encabezado
+            for numero, fila in enumerate(csv.DictReader(fh), start=2):
+                yield numero, fila
+        else:
+            for numero, linea in enumerate(fh, start=1):
+                linea = linea.strip()
+                if not linea:
+                    continue
+                try:
+                    yield numero, json.loads(linea)
+                except json.JSONDecodeError as e:
+                    yield numero, {'_error': f'JSON inválido: {e}'}
+
+    def _construir(self, fila):
+        """
+        Construye y valida (sin consultas a la base de datos) el Solicitante y la Cita de una fila
+
+        Returns:
+            tuple: (solicitante, cita, fecha_registro o None)
+        """
+        if '_error' in fila:
+            raise ValueError(fila['_error'])
+
+        datos = {campo: self._texto(fila.get(campo)) for campo in CAMPOS_SOLICITANTE}
+        for campo in Solicitante.OPCIONES_CODIFICADAS:
+            datos[campo] = self._codigo_opcion(campo, fila.get(campo))
+        datos['tiene_discapacidad'] = self._texto(fila.get('tiene_discapacidad')).lower() in VALORES_VERDADEROS
+
+        solicitante = Solicitante(**datos)
+        solicitante.clean_fields()
+        # bulk_create no llama a save(): calcular aquí el token de verificación
+        solicitante.actualizar_token_verificacion()
+
+        cita = Cita(**{campo: self._texto(fila.get(campo)) or None for campo in CAMPOS_CITA})
+        cita.estado = cita.estado or self.estado_por_defecto
+        # Cita.clean() no se usa: rechaza fechas pasadas y consulta citas activas
+        cita.clean_fields(exclude=['usuario', 'solicitante', 'hora_fin'])
+        if cita.hora_fin:
+            cita.hora_fin = Cita._meta.get_field('hora_fin').clean(cita.hora_fin, cita)
+        else:
+            cita.hora_fin = (datetime.combine(cita.fecha, cita.hora_inicio) + self.duracion).time()
+
+        fecha_registro = self._texto(fila.get('fecha_registro'))
+        if fecha_registro:
+            fecha_registro = Solicitante._meta.get_field('fecha_registro').to_python(fecha_registro)
+            if timezone.is_naive(fecha_registro):
+                fecha_registro = timezone.make_aware(fecha_registro)
+
+        return solicitante, cita, fecha_registro or None
+
+    def _escribir_lote(self, validas):
+        """Escribe un lote completo en una sola transacción con bulk_create (sin signals)"""
+        solicitantes = [solicitante for solicitante, _, _ in validas]
+
+        with transaction.atomic():
+            Solicitante.objects.bulk_create(solicitantes)
+
+            # bulk_create asigna la fecha actual a los campos auto_now_add:
+            # se restaura la fecha histórica cuando el archivo la trae
+            con_fecha = []
+            for solicitante, _, fecha_registro in validas:
+                if fecha_registro:
+                    solicitante.fecha_registro = fecha_registro
+                    con_fecha.append(solicitante)
+            if con_fecha:
+                Solicitante.objects.bulk_update(con_fecha, ['fecha_registro'])
+
+            citas = []
+            for solicitante, cita, _ in validas:
+                cita.solicitante = solicitante
+                citas.append(cita)
+            Cita.objects.bulk_create(citas)
+
+    def _codigo_opcion(self, campo, valor):
+        """Acepta el código entero o la clave textual de la opción (ej: 'migrante_internacional')"""
+        valor = self._texto(valor)
+        if valor.isdigit():
+            return int(valor)
+
+        codigo = Solicitante.get_codigo_opcion(campo, valor)
+        if codigo is None:
+            raise ValidationError({campo: f"Opción desconocida: '{valor}'"})
+        return codigo
+
+    @staticmethod
+    def _texto(valor):
+        return '' if valor is None else str(valor).strip()
+
+    @staticmethod
+    def _mensaje(error):
+        if isinstance(error, ValidationError) and hasattr(error, 'message_dict'):
+            return '; '.join(f"{campo}: {' '.join(mensajes)}" for campo, mensajes in error.message_dict.items())
+        return str(error)
+
+    @staticmethod
+    def _memoria_pico_mb():
+        """Memoria residente máxima del proceso (None si no está disponible en la plataforma)"""
+        if resource is None:
+            return None
+        # ru_maxrss viene en KB en Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
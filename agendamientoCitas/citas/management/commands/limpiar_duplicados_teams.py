@@ -0,0 +1,138 @@
+# citas/management/commands/limpiar_duplicados_teams.py
+
+from collections import defaultdict
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from citas.models import Cita, ReunionPreaprovisionada
+from citas.services.microsoft_teams_service import teams_service
+from citas.utils import PREFIJO_ASUNTO_REUNION
+
+
+class Command(BaseCommand):
+    help = (
+        'Detecta (y opcionalmente elimina) reuniones de Teams duplicadas en los calendarios de '
+        'los organizadores: eventos creados por el sistema con el mismo asunto y hora de inicio'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias-atras',
+            type=int,
+            default=30,
+            help='Días hacia atrás que se revisan (default: 30)'
+        )
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=settings.TEAMS_RECONCILIACION_DIAS_FUTURO,
+            help=f'Días hacia adelante que se revisan (default: {settings.TEAMS_RECONCILIACION_DIAS_FUTURO})'
+        )
+        parser.add_argument(
+            '--eliminar',
+            action='store_true',
+            help='Elimina los duplicados en Graph (sin esta opción solo los lista)'
+        )
+
+    def handle(self, *args, **options):
+        if options['dias_atras'] < 0 or options['dias'] < 1:
+            raise CommandError('--dias-atras no puede ser negativo y --dias debe ser mayor que 0')
+
+        ahora = timezone.now()
+        inicio = ahora - timedelta(days=options['dias_atras'])
+        fin = ahora + timedelta(days=options['dias'])
+
+        self.stdout.write("=" * 70)
+        self.stdout.write(self.style.SUCCESS("🧹 DUPLICADOS DE REUNIONES TEAMS"))
+        self.stdout.write(f"   Calendarios: {', '.join(teams_service.organizadores)}")
+        self.stdout.write(f"   Ventana:     {inicio:%Y-%m-%d} a {fin:%Y-%m-%d}")
+        self.stdout.write("=" * 70)
+
+        eventos = []
+        duplicados = []
+        for buzon in teams_service.organizadores:
+            eventos_buzon = self._leer_eventos(buzon, inicio, fin)
+            eventos.extend(eventos_buzon)
+            # Los duplicados de una cita siempre quedan en el mismo buzón (mismo transactionId)
+            duplicados.extend(self._detectar_duplicados(eventos_buzon))
+
+        if not duplicados:
+            self.stdout.write(self.style.SUCCESS(f"✅ Sin duplicados ({len(eventos)} eventos del sistema revisados)"))
+            return
+
+        for evento in duplicados:
+            self.stdout.write(
+                f"   {evento['start'] or '?'}  {evento['subject']}  "
+                f"(creado {evento['creado'] or '?'}, id {evento['id']}, buzón {evento['organizador']})"
+            )
+        self.stdout.write(
+            self.style.WARNING(f"⚠️  {len(duplicados)} duplicados de {len(eventos)} eventos del sistema")
+        )
+
+        if not options['eliminar']:
+            self.stdout.write("   Usar --eliminar para borrarlos de Graph")
+            return
+
+        eliminados = teams_service.eliminar_reuniones_teams_batch(
+            {evento['id']: evento['id'] for evento in duplicados},
+            {evento['id']: evento['organizador'] for evento in duplicados},
+        )
+        cantidad = sum(1 for eliminado in eliminados.values() if eliminado)
+        self.stdout.write(self.style.SUCCESS(f"🗑️  {cantidad}/{len(duplicados)} duplicados eliminados"))
+
+    def _leer_eventos(self, buzon, inicio, fin):
+        """Eventos vigentes creados por el sistema dentro de la ventana en el calendario del buzón"""
+        eventos = []
+        try:
+            paginas = teams_service.obtener_cambios_calendario(inicio=inicio, fin=fin, organizador=buzon)
+            for pagina, _ in paginas:
+                eventos.extend(
+                    dict(evento, organizador=buzon) for evento in pagina
+                    if not evento['eliminado']
+                    and not evento['cancelado']
+                    and evento['subject'].startswith(PREFIJO_ASUNTO_REUNION)
+                )
+        except requests.exceptions.RequestException as e:
+            raise CommandError(f"No se pudo leer el calendario de {buzon}: {e}")
+        return eventos
+
+    def _detectar_duplicados(self, eventos):
+        """
+        Agrupa los eventos por asunto y hora de inicio y retorna los sobrantes de cada grupo
+        Graph no repite un transactionId en un buzón, así que los duplicados que quedan son
+        un evento anterior al transactionId y un reintento que sí lo tiene. Se conservan
+        los eventos que usa una cita o el pool; si ninguno está en uso, el que tiene
+        transactionId (un nuevo reintento lo reutiliza) y entre ellos el más antiguo.
+        """
+        ids = [evento['id'] for evento in eventos]
+        en_uso = set(
+            Cita.objects.filter(teams_event_id__in=ids).values_list('teams_event_id', flat=True)
+        )
+        en_uso.update(
+            ReunionPreaprovisionada.objects.filter(teams_event_id__in=ids)
+            .exclude(estado='descartada')
+            .values_list('teams_event_id', flat=True)
+        )
+
+        grupos = defaultdict(list)
+        for evento in eventos:
+            grupos[(evento['subject'], evento['start'])].append(evento)
+
+        duplicados = []
+        for grupo in grupos.values():
+            if len(grupo) < 2:
+                continue
+
+            conservar = {evento['id'] for evento in grupo if evento['id'] in en_uso}
+            if not conservar:
+                conservar = {min(
+                    grupo, key=lambda evento: (not evento['transaction_id'], evento['creado'] or '')
+                )['id']}
+
+            duplicados.extend(evento for evento in grupo if evento['id'] not in conservar)
+
+        return duplicados
@@ -0,0 +1,54 @@
+# citas/management/commands/simular_graph.py
+
+from django.core.management.base import BaseCommand
+
+from citas.services.graph_simulado import ServidorGraphSimulado
+
+
+class Command(BaseCommand):
+    help = 'Inicia un Microsoft Graph simulado local (eventos de calendario, $batch y token) para pruebas de carga'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Interfaz donde escuchar (default: 127.0.0.1)')
+        parser.add_argument('--puerto', type=int, default=8765, help='Puerto (default: 8765)')
+        parser.add_argument('--latencia-ms', type=float, default=50, help='Latencia por petición (default: 50)')
+        parser.add_argument('--jitter-ms', type=float, default=20, help='Latencia aleatoria adicional (default: 20)')
+        parser.add_argument('--tasa-error', type=float, default=0.0, help='Fracción de respuestas 503 (default: 0)')
+        parser.add_argument('--tasa-429', type=float, default=0.0, help='Fracción de respuestas 429 (default: 0)')
+        parser.add_argument('--retry-after', type=int, default=1, help='Retry-After de los 429 en segundos (default: 1)')
+
+    def handle(self, *args, **options):
+        servidor = ServidorGraphSimulado(
+            direccion=(options['host'], options['puerto']),
+            latencia_ms=options['latencia_ms'],
+            jitter_ms=options['jitter_ms'],
+            tasa_error=options['tasa_error'],
+            tasa_429=options['tasa_429'],
+            retry_after=options['retry_after'],
+        )
+
+        self.stdout.write("=" * 70)
+        self.stdout.write(self.style.SUCCESS(f"🧪 GRAPH SIMULADO en {servidor.url}"))
+        self.stdout.write(f"   Endpoint Graph:  {servidor.endpoint}")
+        self.stdout.write(f"   Token endpoint:  {servidor.url}/<tenant>/oauth2/v2.0/token")
+        self.stdout.write(
+            f"   Latencia {options['latencia_ms']:.0f}±{options['jitter_ms']:.0f} ms, "
+            f"429 {options['tasa_429']:.0%}, 503 {options['tasa_error']:.0%}"
+        )
+        self.stdout.write("   Benchmark: python manage.py benchmark_teams --url " + servidor.url)
+        self.stdout.write("   Ctrl+C para detener")
+        self.stdout.write("=" * 70)
+
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            servidor.server_close()
+            estadisticas = servidor.estadisticas
+            self.stdout.write("")
+            self.stdout.write(
+                f"Peticiones atendidas: {estadisticas['peticiones']} "
+                f"(eventos creados: {estadisticas['eventos_creados']}, "
+                f"429: {estadisticas['429']}, 503: {estadisticas['503']})"
+            )
@@ -1,14 +1,53 @@
 # citas/management/commands/verificar_teams.py
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
+from django.utils import timezone
+from datetime import datetime, timedelta
+import json
+import logging
+import socket
 import sys
+import time
+import uuid
+
+# Asunto de los eventos de prueba: no empieza con PREFIJO_ASUNTO_REUNION, así que la
+# reconciliación nunca los confunde con reuniones de citas
+ASUNTO_BENCHMARK = 'Verificación ATENEA (benchmark)'
 
 
 class Command(BaseCommand):
     help = 'Verifica la configuración de Microsoft Teams (Modo Automático)'
     
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--benchmark',
+            action='store_true',
+            help=(
+                'Mide token, conexión y latencia de crear/actualizar/eliminar reuniones '
+                '(los eventos de prueba se eliminan al final); imprime el resultado en JSON'
+            )
+        )
+        parser.add_argument('--iteraciones', type=int, default=10, help='Iteraciones del benchmark (default: 10)')
+        parser.add_argument(
+            '--organizador',
+            help='Buzón donde se crean los eventos de prueba (default: MICROSOFT_TEAMS_USER_ID)'
+        )
+        parser.add_argument(
+            '--simulado',
+            action='store_true',
+            help='Usar un Graph simulado local en lugar del tenant real'
+        )
+        parser.add_argument(
+            '--url',
+            help='Usar un Graph simulado ya en ejecución (ver simular_graph) en lugar del tenant real'
+        )
+    
     def handle(self, *args, **options):
+        if options['benchmark']:
+            self._benchmark(options)
+            return
+    
         self.stdout.write("=" * 70)
         self.stdout.write(self.style.SUCCESS(
             "🔍 VERIFICACIÓN DE CONFIGURACIÓN - MICROSOFT TEAMS AUTOMÁTICO"
@@ -132,3 +171,231 @@ class Command(BaseCommand):
         self.stdout.write("")
         self.stdout.write("🚀 ¡Todo listo para usar!")
         self.stdout.write("=" * 70)
+    
+    
+    # --------------------------------------------
+    # Benchmark
+    # --------------------------------------------
+    
+    def _benchmark(self, options):
+        """
+        Mide la integración con Graph y escribe el resultado en JSON (para comparar
+        entornos o detectar regresiones tras un despliegue):
+            token: creación del cliente MSAL, adquisición en Azure AD y lectura del cache
+            conexion: primera petición (conexión nueva, incluye TLS) y peticiones con la conexión reutilizada
+            operaciones: latencia de crear, actualizar y eliminar una reunión (con los reintentos del servicio)
+        """
+        from citas.management.commands.benchmark_teams import preparar_servicio_simulado
+        from citas.services.circuit_breaker import CircuitBreaker
+        from citas.services.graph_simulado import ServidorGraphSimulado
+        from citas.services.microsoft_teams_service import MicrosoftTeamsService
+        from django.test.utils import override_settings
+        
+        iteraciones = options['iteraciones']
+        if iteraciones < 1:
+            raise CommandError('--iteraciones debe ser mayor que 0')
+        
+        # El log por petición ensucia la salida JSON
+        if options['verbosity'] < 2:
+            logging.disable(logging.INFO)
+        
+        servidor = None
+        sin_telemetria = None
+        try:
+            servicio = MicrosoftTeamsService()
+            url = options['url'].rstrip('/') if options['url'] else None
+            if options['simulado'] and not url:
+                servidor = ServidorGraphSimulado(latencia_ms=50, jitter_ms=20).iniciar_en_segundo_plano()
+                url = servidor.url
+            
+            if url:
+                inicio = time.perf_counter()
+                preparar_servicio_simulado(servicio, url)
+                token = {'adquisicion_ms': self._ms(time.perf_counter() - inicio), 'origen': 'graph_simulado'}
+                inicio = time.perf_counter()
+                servicio._get_access_token()
+                token['cache_ms'] = self._ms(time.perf_counter() - inicio)
+                # Los errores simulados no deben abrir el circuito real de Graph ni ir a la telemetría
+                servicio.circuito = CircuitBreaker('graph-verificacion')
+                sin_telemetria = override_settings(TEAMS_TELEMETRIA_ACTIVA=False)
+                sin_telemetria.enable()
+            else:
+                if not all([settings.MICROSOFT_TENANT_ID, settings.MICROSOFT_CLIENT_ID, settings.MICROSOFT_CLIENT_SECRET]):
+                    raise CommandError('Faltan credenciales de Azure AD (ver AZURE_AD_SETUP.md)')
+                token = self._medir_token(servicio)
+            
+            organizador = options['organizador'] or servicio.user_id
+            if not organizador:
+                raise CommandError('MICROSOFT_TEAMS_USER_ID no configurado: indicar --organizador')
+            
+            resultado = {
+                'fecha': timezone.now().isoformat(),
+                'host': socket.gethostname(),
+                'graph': {
+                    'endpoint': servicio.endpoint,
+                    'organizador': organizador,
+                    'simulado': bool(url),
+                },
+                'iteraciones': iteraciones,
+                'token': token,
+                'conexion': self._medir_conexion(servicio, organizador, iteraciones),
+            }
+            resultado['operaciones'], resultado['limpieza'] = self._medir_operaciones(
+                servicio, organizador, iteraciones
+            )
+        finally:
+            logging.disable(logging.NOTSET)
+            if sin_telemetria:
+                sin_telemetria.disable()
+            if servidor:
+                servidor.detener()
+        
+        self.stdout.write(json.dumps(resultado, indent=2, ensure_ascii=False))
+        
+        if resultado['limpieza']['pendientes']:
+            self.stderr.write(
+                f"⚠️  No se pudieron eliminar {len(resultado['limpieza']['pendientes'])} eventos de prueba"
+            )
+            sys.exit(1)
+    
+    def _medir_token(self, servicio):
+        """
+        Mide el token contra Azure AD con un cliente MSAL nuevo (sin el token cache
+        compartido, para medir la adquisición real) y deja el token en el servicio
+        """
+        with servicio._token_lock:
+            inicio = time.perf_counter()
+            app = servicio._get_msal_app()
+            creacion = time.perf_counter() - inicio
+            
+            inicio = time.perf_counter()
+            result = app.acquire_token_for_client(scopes=servicio.scopes)
+            adquisicion = time.perf_counter() - inicio
+            
+            inicio = time.perf_counter()
+            app.acquire_token_for_client(scopes=servicio.scopes)
+            lectura_cache = time.perf_counter() - inicio
+        
+        if 'access_token' not in result:
+            raise CommandError(
+                f"No se pudo obtener token: {result.get('error')} - {result.get('error_description')}"
+            )
+        
+        servicio._access_token = result['access_token']
+        servicio._token_expiry = datetime.now() + timedelta(seconds=result.get('expires_in', 3600))
+        return {
+            'cliente_msal_ms': self._ms(creacion),
+            'adquisicion_ms': self._ms(adquisicion),
+            'origen': result.get('token_source', 'identity_provider'),
+            'cache_ms': self._ms(lectura_cache),
+        }
+    
+    def _medir_conexion(self, servicio, organizador, iteraciones):
+        """Primera petición (sesión y conexión nuevas) contra las siguientes (conexión del pool)"""
+        import requests
+        from citas.services.microsoft_teams_service import ESTADOS_REINTENTABLES
+        
+        url = f"{servicio.endpoint}/users/{organizador}"
+        headers = {'Authorization': f'Bearer {servicio._access_token}'}
+        
+        latencias = []
+        errores = 0
+        for _ in range(iteraciones + 1):
+            inicio = time.perf_counter()
+            try:
+                response = servicio._request('GET', url, headers=headers)
+            except requests.exceptions.RequestException as e:
+                raise CommandError(f"No se pudo conectar con Graph: {e}")
+            latencias.append(time.perf_counter() - inicio)
+            
+            # 429/5xx son transitorios y se reportan; cualquier otro error es de configuración
+            if response.status_code in ESTADOS_REINTENTABLES:
+                errores += 1
+            elif response.status_code != 200:
+                raise CommandError(f"GET {url} respondió {response.status_code}: {response.text[:200]}")
+        
+        return {
+            'nueva_ms': self._ms(latencias[0]),
+            'reutilizada': dict(self._distribucion(latencias[1:]), errores=errores),
+        }
+    
+    def _medir_operaciones(self, servicio, organizador, iteraciones):
+        """
+        Crea, actualiza y elimina una reunión de prueba por iteración
+        Las reuniones que no se pudieron eliminar (fallo o interrupción) se eliminan al final.
+        
+        Returns:
+            tuple: (distribuciones por operación, resultado de la limpieza)
+        """
+        latencias = {'crear': [], 'actualizar': [], 'eliminar': []}
+        errores = {'crear': 0, 'actualizar': 0, 'eliminar': 0}
+        pendientes = set()
+        # Lejos de la agenda real y fuera del horario de atención
+        fecha_inicio = (timezone.localtime() + timedelta(days=60)).replace(hour=22, minute=0, second=0, microsecond=0)
+        
+        def medir(operacion, funcion, *args, **kwargs):
+            inicio = time.perf_counter()
+            resultado = funcion(*args, **kwargs)
+            latencias[operacion].append(time.perf_counter() - inicio)
+            if not resultado:
+                errores[operacion] += 1
+            return resultado
+        
+        try:
+            for i in range(iteraciones):
+                reunion = medir(
+                    'crear',
+                    servicio.crear_reunion_teams,
+                    asunto=f'{ASUNTO_BENCHMARK} #{i + 1}',
+                    fecha_inicio=fecha_inicio,
+                    duracion_minutos=settings.DURACION_CITA_MINUTOS,
+                    transaction_id=str(uuid.uuid4()),
+                    organizador=organizador,
+                )
+                if not reunion:
+                    continue
+                pendientes.add(reunion['id'])
+                
+                medir(
+                    'actualizar',
+                    servicio.actualizar_reunion_teams,
+                    reunion['id'],
+                    asunto=f'{ASUNTO_BENCHMARK} #{i + 1} (actualizada)',
+                    organizador=organizador,
+                )
+                if medir('eliminar', servicio.eliminar_reunion_teams, reunion['id'], organizador):
+                    pendientes.discard(reunion['id'])
+        finally:
+            limpiadas = 0
+            if pendientes:
+                eliminadas = servicio.eliminar_reuniones_teams_batch(
+                    {event_id: event_id for event_id in pendientes},
+                    {event_id: organizador for event_id in pendientes},
+                )
+                for event_id, eliminada in eliminadas.items():
+                    if eliminada:
+                        pendientes.discard(event_id)
+                        limpiadas += 1
+        
+        operaciones = {
+            operacion: dict(self._distribucion(valores), errores=errores[operacion])
+            for operacion, valores in latencias.items()
+        }
+        return operaciones, {'eliminadas_al_final': limpiadas, 'pendientes': sorted(pendientes)}
+    
+    def _distribucion(self, latencias):
+        """Percentiles de una lista de latencias (segundos) en milisegundos"""
+        from citas.services.telemetria_graph import percentil
+        
+        ordenadas = sorted(latencias)
+        return {
+            'muestras': len(ordenadas),
+            'p50_ms': self._ms(percentil(ordenadas, 50)),
+            'p95_ms': self._ms(percentil(ordenadas, 95)),
+            'p99_ms': self._ms(percentil(ordenadas, 99)),
+            'max_ms': self._ms(ordenadas[-1] if ordenadas else 0),
+            'media_ms': self._ms(sum(ordenadas) / len(ordenadas) if ordenadas else 0),
+        }
+    
+    def _ms(self, segundos):
+        return round(segundos * 1000, 1)
@@ -0,0 +1,116 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:12
+
+from django.db import migrations, models
+
+
+# Claves textuales congeladas en el orden que define su código entero (posición desde 1).
+# No importar las listas del modelo: esta migración debe seguir siendo reproducible
+# aunque en el futuro se agreguen opciones nuevas. Las claves de versiones anteriores
+# del formulario van al final con su propio código: no se reasignan a otra respuesta.
+CLAVES_POR_CAMPO = {
+    'sexo': ['M', 'F', 'I'],
+    'genero': ['hombre', 'mujer', 'no_binario', 'otro', 'prefiero_no_decir'],
+    'orientacion_sexual': ['heterosexual', 'homosexual', 'bisexual', 'pansexual', 'asexual', 'otro', 'prefiero_no_decir'],
+    'rango_edad': ['0-17', '18-25', '26-35', '36-45', '46-55', '56-65', '66+'],
+    'nivel_educativo': ['ninguno', 'primaria', 'bachillerato', 'tecnico', 'tecnologo', 'profesional', 'postgrado'],
+    'grupo_etnico': ['ninguno', 'indigena', 'rom', 'raizal', 'palenquero', 'negro'],
+    'grupo_poblacional': [
+        'campesino', 'migrante_nacional', 'migrante_internacional', 'victima_conflicto', 'palenquero', 'veterano',
+        'ninguno', 'no_responde', 'desplazado', 'reinsertado', 'habitante_calle', 'lgbtiq', 'migrante', 'otro',
+    ],
+    'estrato_socioeconomico': ['1', '2', '3', '4', '5', '6', '7'],
+    'localidad': ['usaquen', 'chapinero', 'santa_fe', 'san_cristobal', 'usme', 'tunjuelito', 'bosa', 'kennedy', 'fontibon', 'engativa', 'suba', 'barrios_unidos', 'teusaquillo', 'los_martires', 'antonio_narino', 'puente_aranda', 'candelaria', 'rafael_uribe', 'ciudad_bolivar', 'sumapaz', 'fuera_bogota'],
+    'calidad_comunicacion': [
+        'aspirante1', 'beneficiario', 'acudiente', 'representante_legal', 'ciudadania_general',
+        'propio', 'familiar', 'amigo', 'otro',
+    ],
+}
+
+
+def claves_a_codigos(apps, schema_editor):
+    """Reemplaza cada clave textual por su código entero (como texto, antes del cambio de tipo)"""
+    Solicitante = apps.get_model('citas', 'Solicitante')
+    db_alias = schema_editor.connection.alias
+    
+    for campo, claves in CLAVES_POR_CAMPO.items():
+        valores = Solicitante.objects.using(db_alias).values_list(campo, flat=True).distinct()
+        
+        for valor in list(valores):
+            if valor not in claves:
+                raise ValueError(
+                    f"Solicitante.{campo} contiene el valor '{valor}' sin código asignado. "
+                    f"Agregarlo al final de su lista en CLAVES_POR_CAMPO (y en el modelo) antes de migrar."
+                )
+            codigo = claves.index(valor) + 1
+            Solicitante.objects.using(db_alias).filter(**{campo: valor}).update(**{campo: str(codigo)})
+
+
+def codigos_a_claves(apps, schema_editor):
+    """Operación inversa: restaura la clave textual a partir del código"""
+    Solicitante = apps.get_model('citas', 'Solicitante')
+    db_alias = schema_editor.connection.alias
+    
+    for campo, claves in CLAVES_POR_CAMPO.items():
+        for codigo, clave in enumerate(claves, start=1):
+            Solicitante.objects.using(db_alias).filter(**{campo: str(codigo)}).update(**{campo: clave})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citas', '0004_cita_teams_creado_en_cita_teams_event_id_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(claves_a_codigos, codigos_a_claves),
+        migrations.AlterField(
+            model_name='solicitante',
+            name='calidad_comunicacion',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Aspirante1'), (2, 'Beneficiario'), (3, 'Acudiente'), (4, 'Representante Legal'), (5, 'Ciudadanía en General'), (6, 'Propio'), (7, 'Familiar'), (8, 'Amigo'), (9, 'Otro')], verbose_name='Te comunicas en calidad de'),
+        ),
+        migrations.AlterField(
+            model_name='solicitante',
+            name='estrato_socioeconomico',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Estrato 1'), (2, 'Estrato 2'), (3, 'Estrato 3'), (4, 'Estrato 4'), (5, 'Estrato 5'), (6, 'Estrato 6'), (7, 'No responde')], verbose_name='Estrato Socioeconómico'),
+        ),
+        migrations.AlterField(
+            model_name='solicitante',
+            name='genero',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Hombre'), (2, 'Mujer'), (3, 'No binario'), (4, 'Otro'), (5, 'Prefiero no decir')], verbose_name='Género'),
+        ),
+        migrations.AlterField(
+            model_name='solicitante',
+            name='grupo_etnico',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Ninguno'), (2, 'Indígena'), (3, 'ROM (Gitano)'), (4, 'Raizal'), (5, 'Palenquero'), (6, 'Negro(a) / Afrocolombiano(a)')], verbose_name='Grupo Étnico'),
+        ),
+        migrations.AlterField(
+            model_name='solicitante',
+            name='grupo_poblacional',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Campesino'), (2, 'Migrante Nacional'), (3, 'Migrante Internacional'), (4, 'Víctima del conflicto armado'), (5, 'Palenquero'), (6, 'Veterano'), (7, 'Ninguno'), (8, 'No responde'), (9, 'Desplazado'), (10, 'Reinsertado'), (11, 'Habitante de calle'), (12, 'LGBTIQ+'), (13, 'Migrante'), (14, 'Otro')], verbose_name='Grupo Poblacional'),
+        ),
+        migrations.AlterField(
+            model_name='solicitante',
+            name='localidad',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Usaquén'), (2, 'Chapinero'), (3, 'Santa Fe'), (4, 'San Cristóbal'), (5, 'Usme'), (6, 'Tunjuelito'), (7, 'Bosa'), (8, 'Kennedy'), (9, 'Fontibón'), (10, 'Engativá'), (11, 'Suba'), (12, 'Barrios Unidos'), (13, 'Teusaquillo'), (14, 'Los Mártires'), (15, 'Antonio Nariño'), (16, 'Puente Aranda'), (17, 'La Candelaria'), (18, 'Rafael Uribe Uribe'), (19, 'Ciudad Bolívar'), (20, 'Sumapaz'), (21, 'No reside en Bogotá')], verbose_name='Localidad'),
+        ),
+        migrations.AlterField(
+            model_name='solicitante',
+            name='nivel_educativo',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Ninguno'), (2, 'Primaria'), (3, 'Bachillerato'), (4, 'Técnico'), (5, 'Tecnólogo'), (6, 'Profesional'), (7, 'Postgrado')], verbose_name='Nivel Educativo'),
+        ),
+        migrations.AlterField(
+            model_name='solicitante',
+            name='orientacion_sexual',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Heterosexual'), (2, 'Homosexual'), (3, 'Bisexual'), (4, 'Pansexual'), (5, 'Asexual'), (6, 'Otro'), (7, 'Prefiero no decir')], verbose_name='Orientación Sexual'),
+        ),
+        migrations.AlterField(
+            model_name='solicitante',
+            name='rango_edad',
+            field=models.PositiveSmallIntegerField(choices=[(1, '0-17 años'), (2, '18-25 años'), (3, '26-35 años'), (4, '36-45 años'), (5, '46-55 años'), (6, '56-65 años'), (7, '66 años o más')], verbose_name='Rango de Edad'),
+        ),
+        migrations.AlterField(
+            model_name='solicitante',
+            name='sexo',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Masculino'), (2, 'Femenino'), (3, 'Intersexual')], verbose_name='Sexo'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:15
+
+from django.db import migrations, models
+from django.utils.crypto import salted_hmac
+
+
+# Copia congelada de citas.models.calcular_token_verificacion: la migración debe escribir
+# siempre los mismos tokens aunque la función del modelo (o su sal) cambie después
+def calcular_token_verificacion(tipo_documento, numero_documento, celular, correo_electronico):
+    celular = ''.join(filter(str.isdigit, celular or ''))
+    correo_electronico = (correo_electronico or '').strip().lower()
+    valor = '|'.join([tipo_documento or '', (numero_documento or '').strip(), celular, correo_electronico])
+    return salted_hmac('citas.Solicitante.token_verificacion', valor, algorithm='sha256').hexdigest()
+
+
+def calcular_tokens(apps, schema_editor):
+    """Calcula el token de verificación de los registros existentes, por lotes"""
+    Solicitante = apps.get_model('citas', 'Solicitante')
+    db_alias = schema_editor.connection.alias
+    
+    lote = []
+    for solicitante in Solicitante.objects.using(db_alias).only(
+        'tipo_documento', 'numero_documento', 'celular', 'correo_electronico'
+    ).iterator(chunk_size=1000):
+        solicitante.token_verificacion = calcular_token_verificacion(
+            solicitante.tipo_documento,
+            solicitante.numero_documento,
+            solicitante.celular,
+            solicitante.correo_electronico
+        )
+        lote.append(solicitante)
+        
+        if len(lote) >= 1000:
+            Solicitante.objects.using(db_alias).bulk_update(lote, ['token_verificacion'])
+            lote = []
+    
+    if lote:
+        Solicitante.objects.using(db_alias).bulk_update(lote, ['token_verificacion'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citas', '0005_solicitante_codigos_demograficos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solicitante',
+            name='token_verificacion',
+            field=models.CharField(db_index=True, editable=False, help_text='HMAC de documento, celular y correo para consultar/cancelar citas', max_length=64, null=True, verbose_name='Token de Verificación'),
+        ),
+        migrations.RunPython(calcular_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citas', '0006_solicitante_token_verificacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OperacionTeams',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('crear', 'Crear reunión'), ('actualizar', 'Actualizar reunión'), ('eliminar', 'Eliminar reunión')], max_length=15, verbose_name='Tipo')),
+                ('teams_event_id', models.CharField(blank=True, help_text='Evento a eliminar cuando la cita ya no existe', max_length=200, null=True, verbose_name='ID del Evento en Microsoft Graph')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completada', 'Completada'), ('fallida', 'Fallida')], default='pendiente', max_length=15, verbose_name='Estado')),
+                ('intentos', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now, help_text='En estado procesando: hasta cuándo la reserva el worker que la tomó', verbose_name='Próximo Intento')),
+                ('ultimo_error', models.TextField(blank=True, default='', verbose_name='Último Error')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_procesada', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Procesamiento')),
+                ('cita', models.ForeignKey(blank=True, help_text='Vacío si la cita fue eliminada', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='operaciones_teams', to='citas.cita', verbose_name='Cita')),
+            ],
+            options={
+                'verbose_name': 'Operación de Teams',
+                'verbose_name_plural': 'Operaciones de Teams',
+                'ordering': ['fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='citas_opera_estado_0bd2be_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citas', '0007_operacionteams'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SincronizacionCalendario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('buzon', models.CharField(help_text='Usuario de Graph dueño del calendario (MICROSOFT_TEAMS_USER_ID)', max_length=200, unique=True, verbose_name='Buzón')),
+                ('delta_link', models.TextField(blank=True, default='', verbose_name='Delta Link')),
+                ('ventana_inicio', models.DateTimeField(blank=True, null=True, verbose_name='Inicio de la Ventana')),
+                ('ventana_fin', models.DateTimeField(blank=True, null=True, verbose_name='Fin de la Ventana')),
+                ('iniciada_en', models.DateTimeField(blank=True, help_text='Cuándo se hizo la sincronización completa de la que viene el delta link', null=True, verbose_name='Sincronización Inicial')),
+                ('ultima_ejecucion', models.DateTimeField(blank=True, null=True, verbose_name='Última Ejecución')),
+                ('eventos_procesados', models.PositiveIntegerField(default=0, help_text='Cambios recibidos en la última ejecución', verbose_name='Eventos Procesados')),
+            ],
+            options={
+                'verbose_name': 'Sincronización de Calendario',
+                'verbose_name_plural': 'Sincronizaciones de Calendario',
+            },
+        ),
+        migrations.AlterField(
+            model_name='cita',
+            name='teams_event_id',
+            field=models.CharField(blank=True, db_index=True, help_text='ID interno del evento de Teams en Microsoft Calendar', max_length=200, null=True, verbose_name='ID del Evento en Microsoft Graph'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citas', '0008_sincronizacioncalendario'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='operacionteams',
+            name='tipo',
+            field=models.CharField(choices=[('crear', 'Crear reunión'), ('actualizar', 'Actualizar reunión'), ('eliminar', 'Eliminar reunión'), ('personalizar', 'Personalizar reunión del pool')], max_length=15, verbose_name='Tipo'),
+        ),
+        migrations.CreateModel(
+            name='ReunionPreaprovisionada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('hora_inicio', models.TimeField(verbose_name='Hora de Inicio')),
+                ('teams_event_id', models.CharField(max_length=200, unique=True, verbose_name='ID del Evento en Microsoft Graph')),
+                ('url_teams', models.URLField(max_length=500, verbose_name='Enlace de Microsoft Teams')),
+                ('estado', models.CharField(choices=[('disponible', 'Disponible'), ('asignada', 'Asignada'), ('descartada', 'Descartada')], default='disponible', max_length=15, verbose_name='Estado')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_asignacion', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Asignación')),
+                ('cita', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reunion_preaprovisionada', to='citas.cita', verbose_name='Cita')),
+            ],
+            options={
+                'verbose_name': 'Reunión Preaprovisionada',
+                'verbose_name_plural': 'Reuniones Preaprovisionadas',
+                'ordering': ['fecha', 'hora_inicio'],
+                'indexes': [models.Index(fields=['fecha', 'hora_inicio', 'estado'], name='citas_reuni_fecha_bc2fb9_idx')],
+            },
+        ),
+    ]
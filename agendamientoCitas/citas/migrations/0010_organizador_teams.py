@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citas', '0009_reunionpreaprovisionada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cita',
+            name='teams_organizador',
+            field=models.CharField(blank=True, help_text='Buzón de Graph donde está el evento (vacío: MICROSOFT_TEAMS_USER_ID)', max_length=200, null=True, verbose_name='Organizador de Teams'),
+        ),
+        migrations.AddField(
+            model_name='operacionteams',
+            name='teams_organizador',
+            field=models.CharField(blank=True, help_text='Buzón de Graph del evento a eliminar', max_length=200, null=True, verbose_name='Organizador de Teams'),
+        ),
+        migrations.AddField(
+            model_name='reunionpreaprovisionada',
+            name='organizador',
+            field=models.CharField(blank=True, default='', help_text='Buzón de Graph donde está el evento', max_length=200, verbose_name='Organizador'),
+        ),
+    ]
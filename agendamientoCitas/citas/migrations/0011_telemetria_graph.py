@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citas', '0010_organizador_teams'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LlamadaGraph',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(db_index=True, verbose_name='Fecha')),
+                ('operacion', models.CharField(choices=[('crear', 'Crear evento'), ('actualizar', 'Actualizar evento'), ('eliminar', 'Eliminar evento'), ('batch', 'JSON batching ($batch)'), ('delta', 'Consulta delta del calendario'), ('usuario', 'Consulta de usuario'), ('otra', 'Otra')], max_length=15, verbose_name='Operación')),
+                ('status', models.PositiveSmallIntegerField(help_text='0 si no hubo respuesta', verbose_name='Status HTTP')),
+                ('latencia_ms', models.PositiveIntegerField(verbose_name='Latencia (ms)')),
+                ('reintento', models.PositiveSmallIntegerField(default=0, help_text='0 = primer intento', verbose_name='Reintento')),
+                ('limitada', models.BooleanField(default=False, help_text='Graph respondió 429 (en un $batch, alguna de sus operaciones)', verbose_name='Limitada')),
+            ],
+            options={
+                'verbose_name': 'Llamada a Graph',
+                'verbose_name_plural': 'Llamadas a Graph',
+                'ordering': ['-fecha'],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:54
+
+from datetime import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def calcular_plazos(apps, schema_editor):
+    """Plazo (inicio de la reunión) de las operaciones aún no ejecutadas"""
+    OperacionTeams = apps.get_model('citas', 'OperacionTeams')
+    db_alias = schema_editor.connection.alias
+    
+    operaciones = list(
+        OperacionTeams.objects.using(db_alias)
+        .filter(estado__in=['pendiente', 'procesando'], cita__isnull=False)
+        .exclude(tipo='eliminar')
+        .select_related('cita')
+    )
+    for operacion in operaciones:
+        operacion.plazo = timezone.make_aware(datetime.combine(operacion.cita.fecha, operacion.cita.hora_inicio))
+    
+    OperacionTeams.objects.using(db_alias).bulk_update(operaciones, ['plazo'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citas', '0011_telemetria_graph'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='operacionteams',
+            name='plazo',
+            field=models.DateTimeField(blank=True, help_text='Inicio de la reunión: las operaciones con el plazo más cercano se ejecutan primero', null=True, verbose_name='Plazo'),
+        ),
+        migrations.RunPython(calcular_plazos, migrations.RunPython.noop),
+    ]
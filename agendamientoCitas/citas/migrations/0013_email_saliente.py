@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citas', '0012_operacionteams_plazo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailSaliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('confirmacion', 'Confirmación de cita'), ('cancelacion', 'Cancelación de cita'), ('recordatorio', 'Recordatorio de cita'), ('teams_creado', 'Reunión de Teams creada'), ('teams_actualizado', 'Reunión de Teams actualizada')], max_length=20, verbose_name='Tipo')),
+                ('destinatarios', models.JSONField(verbose_name='Destinatarios')),
+                ('asunto', models.CharField(max_length=255, verbose_name='Asunto')),
+                ('cuerpo_texto', models.TextField(verbose_name='Cuerpo (texto)')),
+                ('cuerpo_html', models.TextField(blank=True, default='', verbose_name='Cuerpo (HTML)')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('enviado', 'Enviado'), ('fallido', 'Fallido')], default='pendiente', max_length=15, verbose_name='Estado')),
+                ('intentos', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now, help_text='En estado procesando: hasta cuándo lo reserva el worker que lo tomó', verbose_name='Próximo Intento')),
+                ('ultimo_error', models.TextField(blank=True, default='', verbose_name='Último Error')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_envio', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Envío')),
+                ('cita', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='emails', to='citas.cita', verbose_name='Cita')),
+            ],
+            options={
+                'verbose_name': 'Email saliente',
+                'verbose_name_plural': 'Emails salientes',
+                'ordering': ['fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='citas_email_estado_c6e398_idx')],
+            },
+        ),
+    ]
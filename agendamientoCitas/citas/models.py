@@ -1,10 +1,36 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Subquery
 from django.conf import settings
+from django.core import signing
 from django.core.exceptions import ValidationError
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.crypto import salted_hmac
 from datetime import datetime, timedelta, time
 
 
+def codificar_opciones(opciones):
+    """
+    Convierte una lista de opciones [(clave, etiqueta), ...] en choices enteros
+    [(codigo, etiqueta), ...], donde el código es la posición de la opción (desde 1)
+    """
+    return [(codigo, etiqueta) for codigo, (_, etiqueta) in enumerate(opciones, start=1)]
+
+
+def calcular_token_verificacion(tipo_documento, numero_documento, celular, correo_electronico):
+    """
+    Calcula el hash con clave (HMAC-SHA256 derivado de SECRET_KEY) de los datos que el
+    solicitante debe presentar para consultar o cancelar sus citas.
+    Permite verificar la identidad comparando hashes indexados, sin cargar los datos de contacto.
+    
+    Nota: cambiar SECRET_KEY invalida los tokens guardados (recalcularlos con una migración de datos)
+    """
+    celular = ''.join(filter(str.isdigit, celular or ''))
+    correo_electronico = (correo_electronico or '').strip().lower()
+    valor = '|'.join([tipo_documento or '', (numero_documento or '').strip(), celular, correo_electronico])
+    return salted_hmac('citas.Solicitante.token_verificacion', valor, algorithm='sha256').hexdigest()
+
+
 class Solicitante(models.Model):
     """
     Modelo para registrar personas que solicitan citas
@@ -22,13 +48,13 @@ class Solicitante(models.Model):
         ('PA', 'Pasaporte'),
     ]
     
-    SEXO_CHOICES = [
+    SEXO_OPCIONES = [
         ('M', 'Masculino'),
         ('F', 'Femenino'),
         ('I', 'Intersexual'),
     ]
     
-    GENERO_CHOICES = [
+    GENERO_OPCIONES = [
         ('hombre', 'Hombre'),
         ('mujer', 'Mujer'),
         ('no_binario', 'No binario'),
@@ -36,7 +62,7 @@ class Solicitante(models.Model):
         ('prefiero_no_decir', 'Prefiero no decir'),
     ]
     
-    ORIENTACION_SEXUAL_CHOICES = [
+    ORIENTACION_SEXUAL_OPCIONES = [
         ('heterosexual', 'Heterosexual'),
         ('homosexual', 'Homosexual'),
         ('bisexual', 'Bisexual'),
@@ -46,7 +72,7 @@ class Solicitante(models.Model):
         ('prefiero_no_decir', 'Prefiero no decir'),
     ]
     
-    RANGO_EDAD_CHOICES = [
+    RANGO_EDAD_OPCIONES = [
         ('0-17', '0-17 años'),
         ('18-25', '18-25 años'),
         ('26-35', '26-35 años'),
@@ -56,7 +82,7 @@ class Solicitante(models.Model):
         ('66+', '66 años o más'),
     ]
     
-    NIVEL_EDUCATIVO_CHOICES = [
+    NIVEL_EDUCATIVO_OPCIONES = [
         ('ninguno', 'Ninguno'),
         ('primaria', 'Primaria'),
         ('bachillerato', 'Bachillerato'),
@@ -66,7 +92,7 @@ class Solicitante(models.Model):
         ('postgrado', 'Postgrado'),
     ]
     
-    GRUPO_ETNICO_CHOICES = [
+    GRUPO_ETNICO_OPCIONES = [
         ('ninguno', 'Ninguno'),
         ('indigena', 'Indígena'),
         ('rom', 'ROM (Gitano)'),
@@ -75,7 +101,7 @@ class Solicitante(models.Model):
         ('negro', 'Negro(a) / Afrocolombiano(a)'),
     ]
     
-    GRUPO_POBLACIONAL_CHOICES = [
+    GRUPO_POBLACIONAL_OPCIONES = [
         ('campesino', 'Campesino'),
         ('migrante_nacional', 'Migrante Nacional'),
         ('migrante_internacional', 'Migrante Internacional'),
@@ -84,9 +110,16 @@ class Solicitante(models.Model):
         ('veterano', 'Veterano'),
         ('ninguno', 'Ninguno'),
         ('no_responde', 'No responde'),
+        # Opciones de versiones anteriores del formulario (ver OPCIONES_LEGADAS)
+        ('desplazado', 'Desplazado'),
+        ('reinsertado', 'Reinsertado'),
+        ('habitante_calle', 'Habitante de calle'),
+        ('lgbtiq', 'LGBTIQ+'),
+        ('migrante', 'Migrante'),
+        ('otro', 'Otro'),
     ]
     
-    ESTRATO_CHOICES = [
+    ESTRATO_OPCIONES = [
         ('1', 'Estrato 1'),
         ('2', 'Estrato 2'),
         ('3', 'Estrato 3'),
@@ -96,7 +129,7 @@ class Solicitante(models.Model):
         ('7', 'No responde'),
     ]
     
-    LOCALIDAD_CHOICES = [
+    LOCALIDAD_OPCIONES = [
         ('usaquen', 'Usaquén'),
         ('chapinero', 'Chapinero'),
         ('santa_fe', 'Santa Fe'),
@@ -120,14 +153,57 @@ class Solicitante(models.Model):
         ('fuera_bogota', 'No reside en Bogotá'),
     ]
     
-    CALIDAD_CHOICES = [
+    CALIDAD_OPCIONES = [
         ('aspirante1', 'Aspirante1'),
         ('beneficiario', 'Beneficiario'),
         ('acudiente', 'Acudiente'),
         ('representante_legal', 'Representante Legal'),
         ('ciudadania_general', 'Ciudadanía en General'),
+        # Opciones de versiones anteriores del formulario (ver OPCIONES_LEGADAS)
+        ('propio', 'Propio'),
+        ('familiar', 'Familiar'),
+        ('amigo', 'Amigo'),
+        ('otro', 'Otro'),
     ]
     
+    # Los datos demográficos se guardan como códigos enteros pequeños.
+    # El código de cada opción es su posición (desde 1) en la lista *_OPCIONES
+    # correspondiente: las opciones nuevas SIEMPRE deben agregarse al final.
+    SEXO_CHOICES = codificar_opciones(SEXO_OPCIONES)
+    GENERO_CHOICES = codificar_opciones(GENERO_OPCIONES)
+    ORIENTACION_SEXUAL_CHOICES = codificar_opciones(ORIENTACION_SEXUAL_OPCIONES)
+    RANGO_EDAD_CHOICES = codificar_opciones(RANGO_EDAD_OPCIONES)
+    NIVEL_EDUCATIVO_CHOICES = codificar_opciones(NIVEL_EDUCATIVO_OPCIONES)
+    GRUPO_ETNICO_CHOICES = codificar_opciones(GRUPO_ETNICO_OPCIONES)
+    GRUPO_POBLACIONAL_CHOICES = codificar_opciones(GRUPO_POBLACIONAL_OPCIONES)
+    ESTRATO_CHOICES = codificar_opciones(ESTRATO_OPCIONES)
+    LOCALIDAD_CHOICES = codificar_opciones(LOCALIDAD_OPCIONES)
+    CALIDAD_CHOICES = codificar_opciones(CALIDAD_OPCIONES)
+    
+    # Campo del modelo -> lista de opciones textuales de la que sale su código
+    OPCIONES_CODIFICADAS = {
+        'sexo': SEXO_OPCIONES,
+        'genero': GENERO_OPCIONES,
+        'orientacion_sexual': ORIENTACION_SEXUAL_OPCIONES,
+        'rango_edad': RANGO_EDAD_OPCIONES,
+        'nivel_educativo': NIVEL_EDUCATIVO_OPCIONES,
+        'grupo_etnico': GRUPO_ETNICO_OPCIONES,
+        'grupo_poblacional': GRUPO_POBLACIONAL_OPCIONES,
+        'estrato_socioeconomico': ESTRATO_OPCIONES,
+        'localidad': LOCALIDAD_OPCIONES,
+        'calidad_comunicacion': CALIDAD_OPCIONES,
+    }
+    
+    # Opciones retiradas del formulario: conservan su código para no perder las respuestas
+    # ya registradas, pero no se ofrecen a los nuevos registros (ver SolicitanteForm)
+    OPCIONES_LEGADAS = {
+        'grupo_poblacional': {'desplazado', 'reinsertado', 'habitante_calle', 'lgbtiq', 'migrante', 'otro'},
+        'calidad_comunicacion': {'propio', 'familiar', 'amigo', 'otro'},
+    }
+    
+    # Datos que el solicitante presenta para consultar/cancelar (ver token_verificacion)
+    CAMPOS_TOKEN_VERIFICACION = ('tipo_documento', 'numero_documento', 'celular', 'correo_electronico')
+    
     # Campos de identificación (obligatorios)
     tipo_documento = models.CharField(
         max_length=5,
@@ -147,57 +223,47 @@ class Solicitante(models.Model):
     correo_electronico = models.EmailField(verbose_name='Correo Electrónico')
     
     # Datos demográficos (todos obligatorios)
-    sexo = models.CharField(
-        max_length=1,
+    sexo = models.PositiveSmallIntegerField(
         choices=SEXO_CHOICES,
         verbose_name='Sexo'
     )
-    genero = models.CharField(
-        max_length=20,
+    genero = models.PositiveSmallIntegerField(
         choices=GENERO_CHOICES,
         verbose_name='Género'
     )
-    orientacion_sexual = models.CharField(
-        max_length=20,
+    orientacion_sexual = models.PositiveSmallIntegerField(
         choices=ORIENTACION_SEXUAL_CHOICES,
         verbose_name='Orientación Sexual'
     )
-    rango_edad = models.CharField(
-        max_length=10,
+    rango_edad = models.PositiveSmallIntegerField(
         choices=RANGO_EDAD_CHOICES,
         verbose_name='Rango de Edad'
     )
-    nivel_educativo = models.CharField(
-        max_length=20,
+    nivel_educativo = models.PositiveSmallIntegerField(
         choices=NIVEL_EDUCATIVO_CHOICES,
         verbose_name='Nivel Educativo'
     )
     
     # Caracterización (todos obligatorios)
-    grupo_etnico = models.CharField(
-        max_length=20,
+    grupo_etnico = models.PositiveSmallIntegerField(
         choices=GRUPO_ETNICO_CHOICES,
         verbose_name='Grupo Étnico'
     )
-    grupo_poblacional = models.CharField(
-        max_length=30,
+    grupo_poblacional = models.PositiveSmallIntegerField(
         choices=GRUPO_POBLACIONAL_CHOICES,
         verbose_name='Grupo Poblacional'
     )
-    estrato_socioeconomico = models.CharField(
-        max_length=1,
+    estrato_socioeconomico = models.PositiveSmallIntegerField(
         choices=ESTRATO_CHOICES,
         verbose_name='Estrato Socioeconómico'
     )
-    localidad = models.CharField(
-        max_length=30,
+    localidad = models.PositiveSmallIntegerField(
         choices=LOCALIDAD_CHOICES,
         verbose_name='Localidad'
     )
     
     # Información adicional (obligatorios)
-    calidad_comunicacion = models.CharField(
-        max_length=30,
+    calidad_comunicacion = models.PositiveSmallIntegerField(
         choices=CALIDAD_CHOICES,
         verbose_name='Te comunicas en calidad de'
     )
@@ -212,6 +278,16 @@ class Solicitante(models.Model):
         verbose_name='Tipo de discapacidad (si aplica)'
     )
     
+    # Verificación de identidad (calculado al guardar)
+    token_verificacion = models.CharField(
+        max_length=64,
+        editable=False,
+        null=True,
+        db_index=True,
+        verbose_name='Token de Verificación',
+        help_text='HMAC de documento, celular y correo para consultar/cancelar citas'
+    )
+    
     # Auditoría
     fecha_registro = models.DateTimeField(
         auto_now_add=True,
@@ -236,6 +312,43 @@ class Solicitante(models.Model):
         """Retorna el nombre completo del solicitante"""
         return f"{self.nombre} {self.apellido}"
     
+    def actualizar_token_verificacion(self):
+        """Recalcula el token de verificación con los datos actuales del registro"""
+        self.token_verificacion = calcular_token_verificacion(
+            self.tipo_documento,
+            self.numero_documento,
+            self.celular,
+            self.correo_electronico
+        )
+    
+    def save(self, *args, **kwargs):
+        """Mantener el token de verificación sincronizado con los datos de contacto"""
+        self.actualizar_token_verificacion()
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.CAMPOS_TOKEN_VERIFICACION):
+            kwargs['update_fields'] = set(update_fields) | {'token_verificacion'}
+        
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def get_codigo_opcion(cls, campo, clave):
+        """
+        Traduce la clave textual de una opción demográfica (ej: 'migrante_internacional')
+        a su código entero. Útil para integrar datos de sistemas externos o legados.
+        
+        Args:
+            campo: Nombre del campo codificado (ej: 'grupo_poblacional')
+            clave: Clave textual de la opción
+        
+        Returns:
+            int: Código de la opción o None si la clave no existe
+        """
+        for codigo, (clave_opcion, _) in enumerate(cls.OPCIONES_CODIFICADAS[campo], start=1):
+            if clave_opcion == clave:
+                return codigo
+        return None
+    
     @classmethod
     def get_ultimo_registro(cls, tipo_documento, numero_documento):
         """
@@ -247,6 +360,52 @@ class Solicitante(models.Model):
             numero_documento=numero_documento
         ).order_by('-fecha_registro').first()
     
+    @classmethod
+    def get_token_ultimo_registro(cls, tipo_documento, numero_documento):
+        """
+        Obtiene solo el token de verificación del último registro de un documento
+        
+        Returns:
+            str: Token del último registro o None si el documento no tiene registros
+        """
+        return cls.objects.filter(
+            tipo_documento=tipo_documento,
+            numero_documento=numero_documento
+        ).order_by('-fecha_registro').values_list('token_verificacion', flat=True).first()
+    
+    @classmethod
+    def get_citas_activas_verificadas(cls, tipo_documento, numero_documento, token_verificacion):
+        """
+        Obtiene las citas activas de un documento si el token coincide con su último registro
+        Verificación y búsqueda se resuelven en una sola consulta indexada. Se compara
+        contra el último registro (como get_ultimo_registro): un celular o email que el
+        solicitante ya reemplazó no da acceso, y las citas agendadas con registros
+        anteriores se siguen listando.
+        
+        Args:
+            tipo_documento: Tipo de documento del solicitante
+            numero_documento: Número de documento del solicitante
+            token_verificacion: Resultado de calcular_token_verificacion()
+        
+        Returns:
+            QuerySet: Citas agendadas futuras ordenadas por fecha y hora (vacío si el token no coincide)
+        """
+        token_ultimo = cls.objects.filter(
+            tipo_documento=tipo_documento,
+            numero_documento=numero_documento
+        ).order_by('-fecha_registro').values('token_verificacion')[:1]
+        
+        return Cita.objects.filter(
+            solicitante__tipo_documento=tipo_documento,
+            solicitante__numero_documento=numero_documento,
+            estado='agendada',
+            fecha__gte=timezone.now().date()
+        ).alias(
+            token_ultimo=Subquery(token_ultimo)
+        ).filter(
+            token_ultimo=token_verificacion
+        ).select_related('solicitante').order_by('fecha', 'hora_inicio')
+    
     @classmethod
     def get_historial_por_documento(cls, tipo_documento, numero_documento):
         """
@@ -387,10 +546,19 @@ class Cita(models.Model):
         max_length=200,
         blank=True,
         null=True,
+        db_index=True,
         verbose_name='ID del Evento en Microsoft Graph',
         help_text='ID interno del evento de Teams en Microsoft Calendar'
     )
     
+    teams_organizador = models.CharField(
+        max_length=200,
+        blank=True,
+        null=True,
+        verbose_name='Organizador de Teams',
+        help_text='Buzón de Graph donde está el evento (vacío: MICROSOFT_TEAMS_USER_ID)'
+    )
+    
     teams_creado_en = models.DateTimeField(
         null=True,
         blank=True,
@@ -557,6 +725,155 @@ class Cita(models.Model):
         if self.solicitante:
             return f"{self.solicitante.tipo_documento} {self.solicitante.numero_documento}"
         return "N/A"
+    
+    # ========================================
+    # ENLACE FIRMADO DE CANCELACIÓN
+    # ========================================
+    
+    SALT_TOKEN_CANCELACION = 'citas.Cita.cancelacion'
+    
+    def get_token_cancelacion(self):
+        """
+        Genera un token firmado (con fecha de emisión) que prueba que quien lo presenta
+        recibió el email de la cita. Incluye fecha y hora: si la cita se reprograma,
+        los enlaces anteriores dejan de ser válidos.
+        """
+        return signing.dumps(
+            {'id': self.pk, 'f': self.fecha.isoformat(), 'h': self.hora_inicio.strftime('%H:%M')},
+            salt=self.SALT_TOKEN_CANCELACION,
+        )
+    
+    def get_url_cancelacion(self):
+        """URL absoluta del enlace de cancelación (para emails)"""
+        ruta = reverse('citas:cancelar_cita', args=[self.get_token_cancelacion()])
+        return settings.SITE_URL.rstrip('/') + ruta
+    
+    @classmethod
+    def leer_token_cancelacion(cls, token):
+        """
+        Verifica la firma y vigencia de un token de cancelación sin consultar la base de datos
+        
+        Returns:
+            dict: {'id', 'f' (fecha ISO), 'h' (HH:MM)} o None si el token no es válido o expiró
+        """
+        try:
+            return signing.loads(
+                token,
+                salt=cls.SALT_TOKEN_CANCELACION,
+                max_age=timedelta(days=settings.CANCELACION_TOKEN_VIGENCIA_DIAS),
+            )
+        except signing.BadSignature:
+            return None
+    
+    def coincide_con_token_cancelacion(self, datos_token):
+        """Verifica que el token corresponda a la fecha/hora vigentes de esta cita"""
+        return (
+            datos_token.get('id') == self.pk
+            and datos_token.get('f') == self.fecha.isoformat()
+            and datos_token.get('h') == self.hora_inicio.strftime('%H:%M')
+        )
+    
+    # --------------------------------------------
+    # Seguimiento de cambios (sin consultar la BD)
+    # --------------------------------------------
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Recuerda los valores leídos de la BD para detectar cambios sin otro SELECT"""
+        instance = super().from_db(db, field_names, values)
+        instance._valores_guardados = dict(zip(field_names, values))
+        return instance
+    
+    def _recordar_valores(self, campos=None):
+        """Toma los valores actuales como los guardados (todos o solo los indicados)"""
+        if campos is None or not hasattr(self, '_valores_guardados'):
+            self._valores_guardados = {
+                campo.attname: getattr(self, campo.attname)
+                for campo in self._meta.concrete_fields
+                if campo.attname in self.__dict__
+            }
+        else:
+            for nombre in campos:
+                attname = self._meta.get_field(nombre).attname
+                self._valores_guardados[attname] = getattr(self, attname)
+    
+    def campos_modificados(self) -> set:
+        """
+        Campos cuyo valor cambió desde que la cita se leyó o se guardó por última vez
+        Una cita que aún no está en la BD tiene todos sus campos modificados.
+        
+        Returns:
+            set: Nombres de los campos (attname, ej: 'solicitante_id')
+        """
+        guardados = self.__dict__.get('_valores_guardados')
+        if guardados is None:
+            if self._state.adding:
+                return {campo.attname for campo in self._meta.concrete_fields}
+            return set()
+        
+        return {
+            attname for attname, valor in guardados.items()
+            if attname in self.__dict__ and self.__dict__[attname] != valor
+        }
+    
+    def campo_modificado(self, *campos) -> bool:
+        """True si cambió alguno de los campos indicados (ver campos_modificados)"""
+        modificados = self.campos_modificados()
+        return any(self._meta.get_field(campo).attname in modificados for campo in campos)
+    
+    def valor_guardado(self, campo):
+        """Valor del campo en la BD según la última lectura o guardado (None si no se conoce)"""
+        guardados = self.__dict__.get('_valores_guardados') or {}
+        return guardados.get(self._meta.get_field(campo).attname)
+    
+    def transicion(self, created: bool = False):
+        """
+        Transición de estado del save en curso (llamar desde post_save)
+        
+        Args:
+            created: True si el save insertó la cita
+        
+        Returns:
+            tuple: (estado anterior, estado actual); el anterior es None si la cita es nueva
+        """
+        if created:
+            return None, self.estado
+        if self.campo_modificado('estado'):
+            return self.valor_guardado('estado'), self.estado
+        return self.estado, self.estado
+    
+    def guardar_cambios(self) -> bool:
+        """
+        Guarda solo los campos modificados (UPDATE acotado); si no hay cambios no hace nada
+        
+        Returns:
+            True si se guardó la cita
+        """
+        if self._state.adding:
+            self.save()
+            return True
+        
+        campos = self.campos_modificados()
+        if not campos:
+            return False
+        self.save(update_fields=[*campos, 'fecha_actualizacion'])
+        return True
+    
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._recordar_valores(fields)
+    
+    def save(self, *args, **kwargs):
+        """
+        Guarda la cita en una transacción: las operaciones de Teams que registran los
+        signals (OperacionTeams) se confirman o revierten junto con la cita
+        
+        Los signals post_save todavía ven los valores anteriores (campos_modificados);
+        después del save los valores guardados pasan a ser los actuales.
+        """
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._recordar_valores(kwargs.get('update_fields'))
 
 
 class Interaccion(models.Model):
@@ -631,13 +948,13 @@ class Interaccion(models.Model):
             
             self.id_interaccion = f"{prefijo}-{nuevo_numero:04d}"
         
-        # Actualizar estado de la cita según el resultado
+        # Actualizar estado de la cita según el resultado (solo si cambió)
         if self.resultado == 'efectiva':
             self.cita.estado = 'completada'
         elif self.resultado == 'no_asiste':
             self.cita.estado = 'no_asistio'
         
-        self.cita.save()
+        self.cita.guardar_cambios()
         super().save(*args, **kwargs)
 
 
@@ -670,4 +987,273 @@ class DisponibilidadHoraria(models.Model):
     
     def __str__(self):
         estado = "Disponible" if self.disponible else "Bloqueado"
-        return f"{self.fecha} {self.hora_inicio}-{self.hora_fin} - {estado}"
\ No newline at end of file
+        return f"{self.fecha} {self.hora_inicio}-{self.hora_fin} - {estado}"
+
+
+class OperacionTeams(models.Model):
+    """
+    Outbox de operaciones de Microsoft Teams (crear/actualizar/eliminar reunión)
+    Se registra en la misma transacción que la cita y la ejecuta un worker de Celery,
+    de modo que el agendamiento no espera a Graph ni al envío de emails.
+    """
+    TIPO_CHOICES = [
+        ('crear', 'Crear reunión'),
+        ('actualizar', 'Actualizar reunión'),
+        ('eliminar', 'Eliminar reunión'),
+        ('personalizar', 'Personalizar reunión del pool'),
+    ]
+    
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completada', 'Completada'),
+        ('fallida', 'Fallida'),
+    ]
+    
+    cita = models.ForeignKey(
+        Cita,
+        on_delete=models.SET_NULL,
+        related_name='operaciones_teams',
+        verbose_name='Cita',
+        null=True,
+        blank=True,
+        help_text='Vacío si la cita fue eliminada'
+    )
+    tipo = models.CharField(max_length=15, choices=TIPO_CHOICES, verbose_name='Tipo')
+    teams_event_id = models.CharField(
+        max_length=200,
+        blank=True,
+        null=True,
+        verbose_name='ID del Evento en Microsoft Graph',
+        help_text='Evento a eliminar cuando la cita ya no existe'
+    )
+    teams_organizador = models.CharField(
+        max_length=200,
+        blank=True,
+        null=True,
+        verbose_name='Organizador de Teams',
+        help_text='Buzón de Graph del evento a eliminar'
+    )
+    estado = models.CharField(
+        max_length=15,
+        choices=ESTADO_CHOICES,
+        default='pendiente',
+        verbose_name='Estado'
+    )
+    intentos = models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')
+    plazo = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Plazo',
+        help_text='Inicio de la reunión: las operaciones con el plazo más cercano se ejecutan primero'
+    )
+    proximo_intento = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Próximo Intento',
+        help_text='En estado procesando: hasta cuándo la reserva el worker que la tomó'
+    )
+    ultimo_error = models.TextField(blank=True, default='', verbose_name='Último Error')
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')
+    fecha_procesada = models.DateTimeField(null=True, blank=True, verbose_name='Fecha de Procesamiento')
+    
+    class Meta:
+        verbose_name = 'Operación de Teams'
+        verbose_name_plural = 'Operaciones de Teams'
+        ordering = ['fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'proximo_intento']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} - cita #{self.cita_id or '-'} ({self.get_estado_display()})"
+
+
+class SincronizacionCalendario(models.Model):
+    """
+    Estado de la consulta delta del calendario de un organizador en Microsoft Graph
+    Guarda el delta link de la última reconciliación: la siguiente solo recibe los
+    eventos que cambiaron desde entonces.
+    """
+    buzon = models.CharField(
+        max_length=200,
+        unique=True,
+        verbose_name='Buzón',
+        help_text='Usuario de Graph dueño del calendario (MICROSOFT_TEAMS_USER_ID)'
+    )
+    delta_link = models.TextField(blank=True, default='', verbose_name='Delta Link')
+    ventana_inicio = models.DateTimeField(null=True, blank=True, verbose_name='Inicio de la Ventana')
+    ventana_fin = models.DateTimeField(null=True, blank=True, verbose_name='Fin de la Ventana')
+    iniciada_en = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Sincronización Inicial',
+        help_text='Cuándo se hizo la sincronización completa de la que viene el delta link'
+    )
+    ultima_ejecucion = models.DateTimeField(null=True, blank=True, verbose_name='Última Ejecución')
+    eventos_procesados = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Eventos Procesados',
+        help_text='Cambios recibidos en la última ejecución'
+    )
+    
+    class Meta:
+        verbose_name = 'Sincronización de Calendario'
+        verbose_name_plural = 'Sincronizaciones de Calendario'
+    
+    def __str__(self):
+        return f"Calendario {self.buzon} ({self.ultima_ejecucion or 'sin sincronizar'})"
+
+
+class ReunionPreaprovisionada(models.Model):
+    """
+    Pool de reuniones de Teams creadas con anticipación para los próximos horarios agendables
+    Las crea una tarea nocturna; al agendar, la cita toma la reunión de su horario con un
+    UPDATE y el enlace queda disponible de inmediato (sin esperar a Graph). El asunto y
+    los asistentes se completan después desde el outbox.
+    """
+    ESTADO_CHOICES = [
+        ('disponible', 'Disponible'),
+        ('asignada', 'Asignada'),
+        ('descartada', 'Descartada'),
+    ]
+    
+    fecha = models.DateField(verbose_name='Fecha')
+    hora_inicio = models.TimeField(verbose_name='Hora de Inicio')
+    teams_event_id = models.CharField(
+        max_length=200,
+        unique=True,
+        verbose_name='ID del Evento en Microsoft Graph'
+    )
+    url_teams = models.URLField(max_length=500, verbose_name='Enlace de Microsoft Teams')
+    organizador = models.CharField(
+        max_length=200,
+        blank=True,
+        default='',
+        verbose_name='Organizador',
+        help_text='Buzón de Graph donde está el evento'
+    )
+    estado = models.CharField(
+        max_length=15,
+        choices=ESTADO_CHOICES,
+        default='disponible',
+        verbose_name='Estado'
+    )
+    cita = models.OneToOneField(
+        Cita,
+        on_delete=models.SET_NULL,
+        related_name='reunion_preaprovisionada',
+        verbose_name='Cita',
+        null=True,
+        blank=True
+    )
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')
+    fecha_asignacion = models.DateTimeField(null=True, blank=True, verbose_name='Fecha de Asignación')
+    
+    class Meta:
+        verbose_name = 'Reunión Preaprovisionada'
+        verbose_name_plural = 'Reuniones Preaprovisionadas'
+        ordering = ['fecha', 'hora_inicio']
+        indexes = [
+            models.Index(fields=['fecha', 'hora_inicio', 'estado']),
+        ]
+    
+    def __str__(self):
+        return f"{self.fecha} {self.hora_inicio} - {self.get_estado_display()}"
+
+
+class LlamadaGraph(models.Model):
+    """
+    Telemetría de una petición HTTP a Microsoft Graph (ver citas/services/telemetria_graph.py)
+    Se escribe por lotes desde un buffer en memoria; el admin muestra p95 y tasas por hora.
+    """
+    OPERACION_CHOICES = [
+        ('crear', 'Crear evento'),
+        ('actualizar', 'Actualizar evento'),
+        ('eliminar', 'Eliminar evento'),
+        ('batch', 'JSON batching ($batch)'),
+        ('delta', 'Consulta delta del calendario'),
+        ('usuario', 'Consulta de usuario'),
+        ('otra', 'Otra'),
+    ]
+    
+    fecha = models.DateTimeField(db_index=True, verbose_name='Fecha')
+    operacion = models.CharField(max_length=15, choices=OPERACION_CHOICES, verbose_name='Operación')
+    status = models.PositiveSmallIntegerField(verbose_name='Status HTTP', help_text='0 si no hubo respuesta')
+    latencia_ms = models.PositiveIntegerField(verbose_name='Latencia (ms)')
+    reintento = models.PositiveSmallIntegerField(default=0, verbose_name='Reintento', help_text='0 = primer intento')
+    limitada = models.BooleanField(
+        default=False,
+        verbose_name='Limitada',
+        help_text='Graph respondió 429 (en un $batch, alguna de sus operaciones)'
+    )
+    
+    class Meta:
+        verbose_name = 'Llamada a Graph'
+        verbose_name_plural = 'Llamadas a Graph'
+        ordering = ['-fecha']
+    
+    def __str__(self):
+        return f"{self.fecha} {self.get_operacion_display()} - {self.status} en {self.latencia_ms} ms"
+
+
+class EmailSaliente(models.Model):
+    """
+    Outbox de emails (ver citas/email_utils.py)
+    El email se renderiza y se registra en la transacción que lo origina; un worker de
+    Celery los envía por lotes reutilizando una sola conexión SMTP autenticada, de modo
+    que el agendamiento no espera al servidor de correo.
+    """
+    TIPO_CHOICES = [
+        ('confirmacion', 'Confirmación de cita'),
+        ('cancelacion', 'Cancelación de cita'),
+        ('recordatorio', 'Recordatorio de cita'),
+        ('teams_creado', 'Reunión de Teams creada'),
+        ('teams_actualizado', 'Reunión de Teams actualizada'),
+    ]
+    
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('enviado', 'Enviado'),
+        ('fallido', 'Fallido'),
+    ]
+    
+    cita = models.ForeignKey(
+        Cita,
+        on_delete=models.SET_NULL,
+        related_name='emails',
+        verbose_name='Cita',
+        null=True,
+        blank=True
+    )
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, verbose_name='Tipo')
+    destinatarios = models.JSONField(verbose_name='Destinatarios')
+    asunto = models.CharField(max_length=255, verbose_name='Asunto')
+    cuerpo_texto = models.TextField(verbose_name='Cuerpo (texto)')
+    cuerpo_html = models.TextField(blank=True, default='', verbose_name='Cuerpo (HTML)')
+    estado = models.CharField(
+        max_length=15,
+        choices=ESTADO_CHOICES,
+        default='pendiente',
+        verbose_name='Estado'
+    )
+    intentos = models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')
+    proximo_intento = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Próximo Intento',
+        help_text='En estado procesando: hasta cuándo lo reserva el worker que lo tomó'
+    )
+    ultimo_error = models.TextField(blank=True, default='', verbose_name='Último Error')
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')
+    fecha_envio = models.DateTimeField(null=True, blank=True, verbose_name='Fecha de Envío')
+    
+    class Meta:
+        verbose_name = 'Email saliente'
+        verbose_name_plural = 'Emails salientes'
+        ordering = ['fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'proximo_intento']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {', '.join(self.destinatarios)} ({self.get_estado_display()})"
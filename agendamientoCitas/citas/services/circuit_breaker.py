@@ -0,0 +1,163 @@
+# citas/services/circuit_breaker.py
+
+"""
+Circuit breaker y backoff para las llamadas a Microsoft Graph
+
+El estado del circuito vive en el cache de Django (Redis en producción), así que todos
+los procesos y nodos lo comparten: cuando Graph falla o limita peticiones (429/503),
+el circuito se abre y las llamadas fallan de inmediato en lugar de ocupar workers
+esperando timeouts.
+
+Estados:
+    cerrado: las peticiones pasan; se cuentan los fallos dentro de una ventana
+    abierto: las peticiones fallan de inmediato hasta que vence la apertura
+    semiabierto: vencida la apertura pasa una sola petición de prueba; si falla, se reabre
+"""
+
+import logging
+import math
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitoAbiertoError(requests.exceptions.RequestException):
+    """La petición no se envía porque el circuito está abierto"""
+
+    def __init__(self, nombre: str, segundos_restantes: float):
+        self.segundos_restantes = segundos_restantes
+        super().__init__(
+            f"Circuito '{nombre}' abierto: llamadas suspendidas por {segundos_restantes:.0f} s más"
+        )
+
+
+def leer_retry_after(valor: Optional[str]) -> Optional[float]:
+    """
+    Interpreta el header Retry-After (segundos o fecha HTTP)
+
+    Returns:
+        float: Segundos a esperar o None si no viene o no es válido
+    """
+    if not valor:
+        return None
+
+    valor = str(valor).strip()
+    if valor.isdigit():
+        return float(valor)
+
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def calcular_espera(intento: int, retry_after: Optional[float] = None) -> float:
+    """
+    Espera antes del siguiente reintento
+    Si Graph indicó Retry-After se respeta; si no, backoff exponencial con jitter
+    completo (evita que todos los workers reintenten al mismo tiempo).
+
+    Args:
+        intento: Número de intento fallido (0 = primero)
+        retry_after: Segundos indicados por Graph, si los hay
+    """
+    if retry_after is not None:
+        return retry_after
+
+    tope = min(settings.TEAMS_RETRY_MAX_DELAY, settings.TEAMS_RETRY_DELAY * 2 ** intento)
+    return random.uniform(0, tope)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker con estado compartido en el cache
+    Si el cache no responde, el circuito se considera cerrado (no bloquea las llamadas).
+    """
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.clave_abierto = f'circuito:{nombre}:abierto_hasta'
+        self.clave_semiabierto = f'circuito:{nombre}:semiabierto'
+        self.clave_prueba = f'circuito:{nombre}:prueba'
+        self.clave_fallos = f'circuito:{nombre}:fallos'
+
+    def verificar(self):
+        """
+        Lanza CircuitoAbiertoError si el circuito no admite la petición
+        En estado semiabierto solo deja pasar una petición de prueba a la vez
+        """
+        try:
+            estado = cache.get_many([self.clave_abierto, self.clave_semiabierto])
+
+            abierto_hasta = estado.get(self.clave_abierto)
+            if abierto_hasta is not None and abierto_hasta > time.time():
+                raise CircuitoAbiertoError(self.nombre, abierto_hasta - time.time())
+
+            if estado.get(self.clave_semiabierto):
+                if not cache.add(self.clave_prueba, 1, timeout=settings.MICROSOFT_GRAPH_TIMEOUT):
+                    raise CircuitoAbiertoError(self.nombre, settings.MICROSOFT_GRAPH_TIMEOUT)
+                logger.info(f"[CIRCUITO] '{self.nombre}' semiabierto: enviando petición de prueba")
+
+        except CircuitoAbiertoError:
+            raise
+        except Exception as e:
+            logger.warning(f"[WARN] No se pudo leer el circuito '{self.nombre}': {str(e)}")
+
+    def esta_abierto(self) -> bool:
+        """Consulta si el circuito está abierto, sin reservar la petición de prueba"""
+        try:
+            abierto_hasta = cache.get(self.clave_abierto)
+            return abierto_hasta is not None and abierto_hasta > time.time()
+        except Exception as e:
+            logger.warning(f"[WARN] No se pudo leer el circuito '{self.nombre}': {str(e)}")
+            return False
+
+    def registrar_exito(self):
+        """Cierra el circuito si estaba semiabierto y reinicia el conteo de fallos"""
+        try:
+            estado = cache.get_many([self.clave_semiabierto, self.clave_fallos])
+            if not estado:
+                return
+
+            cache.delete_many([self.clave_semiabierto, self.clave_prueba, self.clave_fallos])
+            if estado.get(self.clave_semiabierto):
+                logger.info(f"[CIRCUITO] '{self.nombre}' cerrado: Graph respondió correctamente")
+
+        except Exception as e:
+            logger.warning(f"[WARN] No se pudo actualizar el circuito '{self.nombre}': {str(e)}")
+
+    def registrar_fallo(self, retry_after: Optional[float] = None):
+        """
+        Cuenta un fallo y abre el circuito si se alcanza el umbral, si falló la
+        petición de prueba o si Graph pidió esperar (Retry-After)
+        """
+        try:
+            cache.add(self.clave_fallos, 0, timeout=settings.TEAMS_CIRCUITO_VENTANA_SEGUNDOS)
+            fallos = cache.incr(self.clave_fallos)
+            semiabierto = cache.get(self.clave_semiabierto)
+
+            if retry_after:
+                # Graph indicó exactamente cuánto esperar: ningún nodo lo llama antes
+                self.abrir(retry_after)
+            elif semiabierto or fallos >= settings.TEAMS_CIRCUITO_UMBRAL_FALLOS:
+                self.abrir(settings.TEAMS_CIRCUITO_APERTURA_SEGUNDOS)
+
+        except Exception as e:
+            logger.warning(f"[WARN] No se pudo actualizar el circuito '{self.nombre}': {str(e)}")
+
+    def abrir(self, segundos: float):
+        """Abre el circuito por la cantidad de segundos indicada"""
+        duracion = math.ceil(segundos)
+        cache.set(self.clave_abierto, time.time() + segundos, timeout=duracion)
+        # Al vencer la apertura queda semiabierto durante una ventana más
+        cache.set(self.clave_semiabierto, 1, timeout=duracion + settings.TEAMS_CIRCUITO_VENTANA_SEGUNDOS)
+        cache.delete_many([self.clave_fallos, self.clave_prueba])
+
+        logger.warning(f"[CIRCUITO] '{self.nombre}' abierto por {duracion} s")
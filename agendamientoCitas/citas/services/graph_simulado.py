@@ -0,0 +1,365 @@
+# citas/services/graph_simulado.py
+
+"""
+Servidor local que imita la parte de Microsoft Graph que usa el sistema
+
+Sirve para medir y probar la integración con Teams sin tocar el tenant real:
+    POST   /{tenant}/oauth2/v2.0/token                 (client_credentials)
+    GET    /{tenant}/v2.0/.well-known/openid-configuration
+    GET    /v1.0/users/{id}                           (verificar_conexion)
+    POST   /v1.0/users/{id}/calendar/events
+    PATCH  /v1.0/users/{id}/calendar/events/{event_id}
+    DELETE /v1.0/users/{id}/calendar/events/{event_id}
+    GET    /v1.0/users/{id}/calendarView/delta        (sin filtrar por la ventana)
+    POST   /v1.0/$batch
+
+Permite inyectar latencia, errores 503 y limitación 429 (con Retry-After).
+Los POST con un transactionId ya usado retornan el evento existente, como Graph.
+Los eventos se guardan en memoria y se pierden al detener el servidor.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode
+
+RUTA_TOKEN = re.compile(r'^/(?P<tenant>[^/]+)/oauth2/v2\.0/token$')
+RUTA_OPENID = re.compile(r'^/(?P<tenant>[^/]+)/v2\.0/\.well-known/openid-configuration$')
+RUTA_USUARIO = re.compile(r'^/v1\.0/users/(?P<usuario>[^/]+)$')
+RUTA_EVENTOS = re.compile(r'^/v1\.0/users/(?P<usuario>[^/]+)/calendar/events(?:/(?P<event_id>[^/]+))?$')
+RUTA_DELTA = re.compile(r'^/v1\.0/users/(?P<usuario>[^/]+)/calendarView/delta$')
+RUTA_BATCH = '/v1.0/$batch'
+
+
+class ServidorGraphSimulado(ThreadingHTTPServer):
+    """
+    Servidor HTTP (keep-alive, un hilo por conexión) con el estado de la simulación
+
+    Args:
+        direccion: (host, puerto); puerto 0 elige uno libre
+        latencia_ms: Latencia fija agregada a cada petición HTTP
+        jitter_ms: Latencia aleatoria adicional (uniforme entre 0 y este valor)
+        tasa_error: Fracción de operaciones que responden 503
+        tasa_429: Fracción de operaciones que responden 429
+        retry_after: Segundos indicados en el header Retry-After de los 429
+    """
+    daemon_threads = True
+    # El default (5) descarta conexiones cuando muchos clientes abren su pool a la vez
+    request_queue_size = 128
+
+    def __init__(
+        self,
+        direccion=('127.0.0.1', 0),
+        latencia_ms: float = 0,
+        jitter_ms: float = 0,
+        tasa_error: float = 0.0,
+        tasa_429: float = 0.0,
+        retry_after: int = 1,
+    ):
+        super().__init__(direccion, ManejadorGraphSimulado)
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.tasa_error = tasa_error
+        self.tasa_429 = tasa_429
+        self.retry_after = retry_after
+
+        self.eventos = {}
+        self.transacciones = {}
+        # Secuencia del último cambio de cada evento (el delta token es una secuencia)
+        self.cambios = {}
+        self.eliminados = {}
+        self._secuencia = 0
+        self.estadisticas = Counter()
+        self._lock = threading.Lock()
+        self._hilo = None
+
+    @property
+    def url(self) -> str:
+        host, puerto = self.server_address[:2]
+        return f'http://{host}:{puerto}'
+
+    @property
+    def endpoint(self) -> str:
+        """Equivalente a MICROSOFT_GRAPH_API_ENDPOINT"""
+        return f'{self.url}/v1.0'
+
+    def iniciar_en_segundo_plano(self):
+        """Atiende peticiones en un hilo daemon (para benchmarks dentro del mismo proceso)"""
+        self._hilo = threading.Thread(target=self.serve_forever, name='graph-simulado', daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self.shutdown()
+        self.server_close()
+
+    def contar(self, clave: str, cantidad: int = 1):
+        with self._lock:
+            self.estadisticas[clave] += cantidad
+
+    def esperar_latencia(self):
+        espera_ms = self.latencia_ms + random.uniform(0, self.jitter_ms)
+        if espera_ms > 0:
+            time.sleep(espera_ms / 1000)
+
+    def falla_inyectada(self):
+        """
+        Decide si la operación falla por la configuración de la simulación
+
+        Returns:
+            tuple: (status, headers, body) del error o None si la operación sigue normal
+        """
+        azar = random.random()
+        if azar < self.tasa_429:
+            self.contar('429')
+            return 429, {'Retry-After': str(self.retry_after)}, _error('TooManyRequests', 'Simulación: limitado')
+        if azar < self.tasa_429 + self.tasa_error:
+            self.contar('503')
+            return 503, {}, _error('ServiceUnavailable', 'Simulación: error del servicio')
+        return None
+
+    # --------------------------------------------
+    # Operaciones sobre el calendario en memoria
+    # --------------------------------------------
+
+    def ejecutar(self, metodo: str, ruta: str, cuerpo):
+        """
+        Ejecuta una operación de Graph (petición individual o elemento de un $batch)
+
+        Returns:
+            tuple: (status, headers, body)
+        """
+        ruta = ruta.split('?', 1)[0]
+        if not ruta.startswith('/v1.0'):
+            ruta = '/v1.0' + ruta
+
+        fallo = self.falla_inyectada()
+        if fallo:
+            return fallo
+
+        coincidencia = RUTA_EVENTOS.match(ruta)
+        if coincidencia:
+            return self._operacion_evento(metodo, coincidencia.group('event_id'), cuerpo or {})
+
+        coincidencia = RUTA_USUARIO.match(ruta)
+        if coincidencia and metodo == 'GET':
+            usuario = coincidencia.group('usuario')
+            return 200, {}, {'id': usuario, 'displayName': 'Organizador (Graph simulado)'}
+
+        return 404, {}, _error('ResourceNotFound', f'Ruta no simulada: {metodo} {ruta}')
+
+    def _operacion_evento(self, metodo, event_id, cuerpo):
+        if metodo == 'POST' and event_id is None:
+            event_id = uuid.uuid4().hex
+            evento = {
+                'id': event_id,
+                'transactionId': cuerpo.get('transactionId'),
+                'createdDateTime': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'subject': cuerpo.get('subject'),
+                'start': cuerpo.get('start'),
+                'end': cuerpo.get('end'),
+                'onlineMeeting': {
+                    'joinUrl': f'https://teams.microsoft.com/l/meetup-join/simulado/{event_id}',
+                    'conferenceId': str(random.randint(10 ** 8, 10 ** 9 - 1)),
+                },
+            }
+            with self._lock:
+                # Como Graph: un POST repetido con el mismo transactionId no crea otro evento
+                existente = self.eventos.get(self.transacciones.get(evento['transactionId']))
+                if existente is None:
+                    self.eventos[event_id] = evento
+                    if evento['transactionId']:
+                        self.transacciones[evento['transactionId']] = event_id
+                    self._registrar_cambio(event_id)
+
+            if existente is not None:
+                self.contar('transacciones_repetidas')
+                return 201, {}, existente
+
+            self.contar('eventos_creados')
+            return 201, {}, evento
+
+        with self._lock:
+            evento = self.eventos.get(event_id)
+
+            if evento is None:
+                return 404, {}, _error('ErrorItemNotFound', 'El evento no existe')
+
+            if metodo == 'PATCH':
+                evento.update(cuerpo)
+                self._registrar_cambio(event_id)
+                return 200, {}, evento
+
+            if metodo == 'DELETE':
+                del self.eventos[event_id]
+                self._registrar_cambio(event_id, eliminado=True)
+                return 204, {}, None
+
+            if metodo == 'GET':
+                return 200, {}, evento
+
+        return 405, {}, _error('MethodNotAllowed', metodo)
+
+    def _registrar_cambio(self, event_id, eliminado=False):
+        """Anota el cambio para las consultas delta (llamar con el lock tomado)"""
+        self._secuencia += 1
+        if eliminado:
+            self.cambios.pop(event_id, None)
+            self.eliminados[event_id] = self._secuencia
+        else:
+            self.cambios[event_id] = self._secuencia
+
+    def consulta_delta(self, ruta, consulta, tamano_pagina):
+        """
+        Consulta delta del calendario: sin token retorna todos los eventos; con
+        $deltatoken, solo los cambiados o eliminados después de esa secuencia
+        Pagina con $skiptoken como Graph (nextLink en las páginas intermedias, deltaLink al final).
+        """
+        parametros = parse_qs(consulta)
+        if '$skiptoken' in parametros:
+            desde, posicion = (int(valor) for valor in parametros['$skiptoken'][0].split(':'))
+        else:
+            desde, posicion = int(parametros.get('$deltatoken', ['0'])[0]), 0
+
+        with self._lock:
+            secuencia = self._secuencia
+            cambios = sorted(
+                [(orden, event_id, False) for event_id, orden in self.cambios.items() if orden > desde]
+                + [(orden, event_id, True) for event_id, orden in self.eliminados.items() if orden > desde and desde]
+            )
+            pagina = [
+                {'id': event_id, '@removed': {'reason': 'deleted'}} if eliminado else dict(self.eventos[event_id])
+                for _, event_id, eliminado in cambios[posicion:posicion + tamano_pagina]
+            ]
+
+        cuerpo = {'value': pagina}
+        if posicion + tamano_pagina < len(cambios):
+            cuerpo['@odata.nextLink'] = f"{self.url}{ruta}?{urlencode({'$skiptoken': f'{desde}:{posicion + tamano_pagina}'})}"
+        else:
+            cuerpo['@odata.deltaLink'] = f"{self.url}{ruta}?{urlencode({'$deltatoken': secuencia})}"
+        return 200, {}, cuerpo
+
+    def ejecutar_batch(self, cuerpo):
+        """Procesa un /$batch: cada operación puede fallar o ser limitada por separado"""
+        solicitudes = (cuerpo or {}).get('requests', [])
+        if len(solicitudes) > 20:
+            return 400, {}, _error('BadRequest', 'Un $batch admite como máximo 20 operaciones')
+
+        respuestas = []
+        for solicitud in solicitudes:
+            status, headers, body = self.ejecutar(
+                solicitud.get('method', 'GET').upper(),
+                solicitud.get('url', ''),
+                solicitud.get('body'),
+            )
+            respuesta = {'id': solicitud.get('id'), 'status': status, 'headers': headers}
+            if body is not None:
+                respuesta['body'] = body
+            respuestas.append(respuesta)
+
+        self.contar('operaciones_batch', len(solicitudes))
+        return 200, {}, {'responses': respuestas}
+
+    def emitir_token(self, tenant):
+        self.contar('tokens')
+        return 200, {}, {
+            'token_type': 'Bearer',
+            'expires_in': 3599,
+            'ext_expires_in': 3599,
+            'access_token': f'simulado-{tenant}-{uuid.uuid4().hex}',
+        }
+
+    def configuracion_openid(self, tenant):
+        base = f'{self.url}/{tenant}'
+        return 200, {}, {
+            'issuer': f'{base}/v2.0',
+            'authorization_endpoint': f'{base}/oauth2/v2.0/authorize',
+            'token_endpoint': f'{base}/oauth2/v2.0/token',
+        }
+
+
+class ManejadorGraphSimulado(BaseHTTPRequestHandler):
+    """Traduce cada petición HTTP a una operación del servidor simulado"""
+    protocol_version = 'HTTP/1.1'  # keep-alive, como Graph
+    # Headers y cuerpo se escriben por separado: sin esto Nagle + ACK retrasado suman ~40 ms
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._despachar('GET')
+
+    def do_POST(self):
+        self._despachar('POST')
+
+    def do_PATCH(self):
+        self._despachar('PATCH')
+
+    def do_DELETE(self):
+        self._despachar('DELETE')
+
+    def _despachar(self, metodo):
+        servidor = self.server
+        cuerpo = self._leer_cuerpo()
+        servidor.contar('peticiones')
+        servidor.esperar_latencia()
+
+        ruta = self.path.split('?', 1)[0]
+        coincidencia_token = RUTA_TOKEN.match(ruta)
+        coincidencia_openid = RUTA_OPENID.match(ruta)
+
+        if metodo == 'POST' and coincidencia_token:
+            respuesta = servidor.emitir_token(coincidencia_token.group('tenant'))
+        elif metodo == 'GET' and coincidencia_openid:
+            respuesta = servidor.configuracion_openid(coincidencia_openid.group('tenant'))
+        elif not self.headers.get('Authorization', '').startswith('Bearer '):
+            respuesta = 401, {}, _error('InvalidAuthenticationToken', 'Falta el token de acceso')
+        elif metodo == 'POST' and ruta == RUTA_BATCH:
+            respuesta = servidor.ejecutar_batch(cuerpo)
+        elif metodo == 'GET' and RUTA_DELTA.match(ruta):
+            preferencias = self.headers.get('Prefer', '')
+            tamano = re.search(r'odata\.maxpagesize=(\d+)', preferencias)
+            consulta = self.path.split('?', 1)[1] if '?' in self.path else ''
+            respuesta = servidor.consulta_delta(ruta, consulta, int(tamano.group(1)) if tamano else 100)
+        else:
+            respuesta = servidor.ejecutar(metodo, ruta, cuerpo)
+
+        self._responder(*respuesta)
+
+    def _leer_cuerpo(self):
+        longitud = int(self.headers.get('Content-Length') or 0)
+        if not longitud:
+            return None
+
+        datos = self.rfile.read(longitud)
+        if 'json' not in self.headers.get('Content-Type', ''):
+            return None  # ej: formulario del token endpoint
+
+        try:
+            return json.loads(datos)
+        except ValueError:
+            return None
+
+    def _responder(self, status, headers, body):
+        datos = b'' if body is None else json.dumps(body).encode('utf-8')
+
+        self.send_response(status)
+        for nombre, valor in headers.items():
+            self.send_header(nombre, valor)
+        if datos:
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+        self.server.contar(f'http_{status}')
+
+    def log_message(self, format, *args):
+        """Sin log por petición: ensuciaría la salida de los benchmarks"""
+
+
+def _error(codigo, mensaje):
+    return {'error': {'code': codigo, 'message': mensaje}}
@@ -1,19 +1,51 @@
+import asyncio
+import hashlib
 import logging
+import os
+import re
+import threading
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import TYPE_CHECKING, Optional, Dict, Any, Iterator, List, Tuple
 import time
 import urllib3
 
-import msal
 import requests
+from asgiref.sync import sync_to_async
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+# msal (criptografía/JWT) y httpx (solo API asíncrona) son los imports más costosos:
+# se importan en el primer uso para no cargarlos en cada proceso que importe este módulo
+if TYPE_CHECKING:
+    import httpx
+    import msal
+
+from .circuit_breaker import CircuitBreaker, CircuitoAbiertoError, calcular_espera, leer_retry_after
+from .telemetria_graph import telemetria
 
 logger = logging.getLogger(__name__)
 
-# Deshabilitar warnings de SSL (solo si DISABLE_SSL_VERIFY está activado)
-if getattr(settings, 'DISABLE_SSL_VERIFY', False):
-    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-    logger.warning("[WARN] SSL verification DESHABILITADA - Solo usar en desarrollo")
+# Token cache de MSAL serializado, compartido por todos los procesos y nodos (Redis)
+CLAVE_CACHE_TOKEN = 'teams:msal_token_cache'
+
+# Límite de operaciones por petición de JSON batching de Microsoft Graph
+MAX_OPERACIONES_BATCH = 20
+
+# Respuestas de Graph que indican un problema transitorio (se reintentan y abren el circuito)
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+# Buzón de Graph al que va dirigida una petición (/users/{buzon}/...)
+RUTA_BUZON = re.compile(r'/users/([^/?]+)')
+
+# Eventos por página de una consulta delta del calendario
+TAMANO_PAGINA_DELTA = 200
+
+
+class DeltaInvalidoError(Exception):
+    """Graph ya no reconoce el delta link guardado (410 Gone): hay que sincronizar de nuevo"""
 
 
 class MicrosoftTeamsService:
@@ -26,6 +58,8 @@ class MicrosoftTeamsService:
         self.client_id = settings.MICROSOFT_CLIENT_ID
         self.client_secret = settings.MICROSOFT_CLIENT_SECRET
         self.user_id = settings.MICROSOFT_TEAMS_USER_ID
+        # Buzones organizadores entre los que se reparten las reuniones nuevas
+        self.organizadores = list(settings.MICROSOFT_TEAMS_USER_IDS) or [self.user_id]
         self.authority = settings.MICROSOFT_GRAPH_AUTHORITY
         self.scopes = settings.MICROSOFT_GRAPH_SCOPES
         self.endpoint = settings.MICROSOFT_GRAPH_API_ENDPOINT
@@ -37,149 +71,532 @@ class MicrosoftTeamsService:
         self._access_token = None
         self._token_expiry = None
         
+        # Cliente MSAL de larga vida (uno por proceso) y su token cache
+        self._msal_app = None
+        self._msal_pid = None
+        self._token_cache = None
+        self._token_cache_serializado = None
+        self._token_lock = threading.Lock()
+        
+        # Sesión HTTP con pool de conexiones (se crea en el primer uso de cada proceso)
+        self._session = None
+        self._session_pid = None
+        self._session_lock = threading.Lock()
+        
+        # Estado compartido por todos los nodos: si Graph falla, se deja de llamarlo un tiempo
+        self.circuito = CircuitBreaker('graph')
+        # Graph limita por buzón: cada organizador adicional tiene su propio circuito
+        self._circuitos_buzon = {}
+        
+        # Cliente HTTP asíncrono (ligado al event loop donde se creó)
+        self._async_client = None
+        self._async_loop = None
+        self._async_semaforo = None
+        
         logger.info("[TEAMS] MicrosoftTeamsService inicializado")
         if not self.verify_ssl:
             logger.warning("[WARN] SSL verification deshabilitada")
     
-    def _get_access_token(self) -> Optional[str]:
-        """Obtiene access token de Azure AD"""
-        if self._access_token and self._token_expiry:
-            if datetime.now() < self._token_expiry - timedelta(minutes=5):
-                return self._access_token
+    def _get_session(self) -> requests.Session:
+        """
+        Retorna la sesión HTTP compartida del proceso (keep-alive + pool de conexiones)
+        
+        La sesión es segura entre hilos (el pool de urllib3 lo es). Si el proceso fue
+        bifurcado (workers de gunicorn/Celery), se crea una nueva para no compartir
+        sockets con el proceso padre.
+        """
+        pid = os.getpid()
+        if self._session is not None and self._session_pid == pid:
+            return self._session
+        
+        with self._session_lock:
+            if self._session is None or self._session_pid != pid:
+                # Reintentos solo de conexión: la petición aún no llegó a Graph, así que
+                # reintentar un POST no puede duplicar la reunión
+                reintentos = Retry(
+                    total=settings.MICROSOFT_GRAPH_CONNECT_RETRIES,
+                    connect=settings.MICROSOFT_GRAPH_CONNECT_RETRIES,
+                    read=0,
+                    status=0,
+                    backoff_factor=0.3,
+                    allowed_methods=None,
+                    # Sin esto urllib3 trata un 429/503 con Retry-After como reintento agotado y
+                    # lanza MaxRetryError: la respuesta debe llegar a _request_con_reintentos
+                    respect_retry_after_header=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=2,
+                    pool_maxsize=settings.MICROSOFT_GRAPH_POOL_MAXSIZE,
+                    max_retries=reintentos,
+                )
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.verify = self.verify_ssl  # ← SSL verification configurable
+                if not self.verify_ssl:
+                    # Solo en desarrollo (DISABLE_SSL_VERIFY): evitar un warning por petición
+                    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+                
+                self._session = session
+                self._session_pid = pid
+                logger.info(
+                    f"[HTTP] Sesión creada (pid {pid}, pool_maxsize={settings.MICROSOFT_GRAPH_POOL_MAXSIZE})"
+                )
+        
+        return self._session
+    
+    def _circuito_buzon(self, buzon: Optional[str]) -> CircuitBreaker:
+        """Circuit breaker de un buzón organizador (el principal usa self.circuito)"""
+        if not buzon or buzon == self.user_id:
+            return self.circuito
+        if buzon not in self._circuitos_buzon:
+            self._circuitos_buzon[buzon] = CircuitBreaker(f'{self.circuito.nombre}:{buzon}')
+        return self._circuitos_buzon[buzon]
+    
+    def _circuito_para_url(self, url: str) -> CircuitBreaker:
+        """Circuit breaker que corresponde a una petición según el buzón de su URL"""
+        coincidencia = RUTA_BUZON.search(url)
+        return self._circuito_buzon(coincidencia.group(1) if coincidencia else None)
+    
+    def elegir_organizador(self, clave, evitar_limitados: bool = True) -> str:
+        """
+        Elige el buzón organizador de una reunión nueva (rendezvous hashing sobre la clave)
+        La misma clave cae siempre en el mismo buzón, y agregar o quitar un buzón solo
+        mueve las claves de ese buzón. Si Graph está limitando al buzón elegido (circuito
+        abierto), se usa el siguiente en el orden de la clave.
+        
+        El resultado debe guardarse antes del primer POST y reutilizarse en los reintentos:
+        Graph deduplica el transactionId por buzón, y el salto de los buzones limitados
+        puede dar otro buzón en el siguiente intento.
+        
+        Args:
+            clave: Identificador estable de la reunión (ej: id de la cita)
+            evitar_limitados: False para no saltar los buzones con circuito abierto (cuando
+                no hay dónde guardar la elección, la clave sola define el buzón)
+        
+        Returns:
+            str: Buzón organizador
+        """
+        if len(self.organizadores) == 1:
+            return self.organizadores[0]
+        
+        orden = sorted(
+            self.organizadores,
+            key=lambda buzon: hashlib.sha1(f'{buzon}:{clave}'.encode('utf-8')).digest(),
+            reverse=True,
+        )
+        if not evitar_limitados:
+            return orden[0]
+        for buzon in orden:
+            if not self._circuito_buzon(buzon).esta_abierto():
+                return buzon
+        return orden[0]
+    
+    def _request(
+        self,
+        method: str,
+        url: str,
+        intento: int = 0,
+        registrar: bool = True,
+        **kwargs
+    ) -> requests.Response:
+        """
+        Ejecuta una petición HTTP con la sesión compartida
+        Registra la latencia y si la conexión fue nueva o reutilizada del pool
+        
+        Args:
+            intento: Número de reintento, para la telemetría (0 = primer intento)
+            registrar: False si quien llama registra la telemetría (ej: $batch)
+        
+        Raises:
+            CircuitoAbiertoError: Si el circuito del buzón de Graph está abierto (no se envía nada)
+        """
+        circuito = self._circuito_para_url(url)
+        circuito.verificar()
+        session = self._get_session()
+        kwargs.setdefault('timeout', settings.MICROSOFT_GRAPH_TIMEOUT)
+        
+        pool = session.get_adapter(url).poolmanager.connection_from_url(url)
+        conexiones_antes = pool.num_connections
+        inicio = time.perf_counter()
         
         try:
-            app = msal.ConfidentialClientApplication(
+            response = session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            latencia_ms = (time.perf_counter() - inicio) * 1000
+            logger.warning(f"[HTTP] {method} {url} - falló tras {latencia_ms:.0f} ms: {type(e).__name__}")
+            circuito.registrar_fallo()
+            if registrar:
+                telemetria.registrar(method, url, 0, latencia_ms, intento)
+            raise
+        
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+        conexion = 'nueva' if pool.num_connections > conexiones_antes else 'reutilizada'
+        logger.info(
+            f"[HTTP] {method} {url} - {response.status_code} en {latencia_ms:.0f} ms (conexión {conexion})"
+        )
+        if registrar:
+            telemetria.registrar(method, url, response.status_code, latencia_ms, intento)
+        
+        if response.status_code in ESTADOS_REINTENTABLES:
+            circuito.registrar_fallo(leer_retry_after(response.headers.get('Retry-After')))
+        else:
+            circuito.registrar_exito()
+        
+        return response
+    
+    def _request_con_reintentos(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Ejecuta una petición reintentando los errores transitorios (429, 5xx, timeouts y
+        errores de conexión) con backoff exponencial y jitter, o lo que indique Retry-After
+        
+        Si Graph pide esperar más de TEAMS_RETRY_MAX_DELAY, o el circuito se abre, no se
+        espera: se retorna/lanza de inmediato para no bloquear el worker.
+        
+        Returns:
+            requests.Response: Última respuesta obtenida
+        
+        Raises:
+            CircuitoAbiertoError, requests.exceptions.RequestException
+        """
+        for intento in range(settings.TEAMS_MAX_RETRIES):
+            ultimo_intento = intento == settings.TEAMS_MAX_RETRIES - 1
+            
+            try:
+                response = self._request(method, url, intento=intento, **kwargs)
+            except (CircuitoAbiertoError, requests.exceptions.SSLError):
+                raise
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                if ultimo_intento:
+                    raise
+                espera = calcular_espera(intento)
+                logger.warning(
+                    f"[WARN] {type(e).__name__} en {method} (intento {intento + 1}/{settings.TEAMS_MAX_RETRIES}), "
+                    f"reintentando en {espera:.1f} s"
+                )
+                time.sleep(espera)
+                continue
+            
+            if response.status_code not in ESTADOS_REINTENTABLES or ultimo_intento:
+                return response
+            
+            espera = calcular_espera(intento, leer_retry_after(response.headers.get('Retry-After')))
+            if espera > settings.TEAMS_RETRY_MAX_DELAY:
+                logger.warning(f"[WARN] Graph pidió esperar {espera:.0f} s: se abandona la petición")
+                return response
+            
+            logger.warning(
+                f"[WARN] HTTP {response.status_code} en {method} (intento {intento + 1}/{settings.TEAMS_MAX_RETRIES}), "
+                f"reintentando en {espera:.1f} s"
+            )
+            time.sleep(espera)
+        
+        return response
+    
+    def _get_msal_app(self) -> 'msal.ConfidentialClientApplication':
+        """
+        Retorna el cliente MSAL del proceso
+        Crearlo es costoso (descubrimiento del tenant), por eso se reutiliza; tras un
+        fork se crea uno nuevo para no compartir su sesión HTTP con el proceso padre.
+        Debe llamarse con self._token_lock adquirido.
+        """
+        pid = os.getpid()
+        if self._msal_app is None or self._msal_pid != pid:
+            import msal
+            
+            self._token_cache = msal.SerializableTokenCache()
+            self._token_cache_serializado = None
+            self._msal_app = msal.ConfidentialClientApplication(
                 self.client_id,
                 authority=self.authority,
                 client_credential=self.client_secret,
+                token_cache=self._token_cache,
             )
-            
-            result = app.acquire_token_for_client(scopes=self.scopes)
-            
-            if "access_token" in result:
-                self._access_token = result['access_token']
-                self._token_expiry = datetime.now() + timedelta(seconds=result.get('expires_in', 3600))
-                logger.info("[OK] Access token obtenido exitosamente")
+            self._msal_pid = pid
+            logger.info(f"[TEAMS] Cliente MSAL creado (pid {pid})")
+        
+        return self._msal_app
+    
+    def _cargar_token_cache_compartido(self):
+        """Trae el token cache compartido si otro proceso lo actualizó"""
+        try:
+            serializado = cache.get(CLAVE_CACHE_TOKEN)
+        except Exception as e:
+            logger.warning(f"[WARN] No se pudo leer el token cache compartido: {str(e)}")
+            return
+        
+        if serializado and serializado != self._token_cache_serializado:
+            self._token_cache.deserialize(serializado)
+            self._token_cache_serializado = serializado
+    
+    def _guardar_token_cache_compartido(self):
+        """Publica el token cache si MSAL obtuvo un token nuevo"""
+        if not self._token_cache.has_state_changed:
+            return
+        
+        serializado = self._token_cache.serialize()
+        self._token_cache_serializado = serializado
+        try:
+            cache.set(CLAVE_CACHE_TOKEN, serializado, timeout=settings.TEAMS_TOKEN_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"[WARN] No se pudo guardar el token cache compartido: {str(e)}")
+    
+    def _adquirir_token(self) -> Optional[str]:
+        """
+        Obtiene el token vía MSAL (primero de su cache, luego de Azure AD)
+        Debe llamarse con self._token_lock adquirido.
+        """
+        app = self._get_msal_app()
+        self._cargar_token_cache_compartido()
+        
+        result = app.acquire_token_for_client(scopes=self.scopes)
+        self._guardar_token_cache_compartido()
+        
+        if "access_token" in result:
+            self._access_token = result['access_token']
+            self._token_expiry = datetime.now() + timedelta(seconds=result.get('expires_in', 3600))
+            origen = result.get('token_source', 'identity_provider')
+            logger.info(f"[OK] Access token obtenido exitosamente (origen: {origen})")
+            return self._access_token
+        else:
+            error = result.get("error")
+            error_description = result.get("error_description")
+            logger.error(f"[ERROR] Error obteniendo token: {error} - {error_description}")
+            return None
+    
+    def _get_access_token(self) -> Optional[str]:
+        """Obtiene access token de Azure AD"""
+        if self._access_token and self._token_expiry:
+            if datetime.now() < self._token_expiry - timedelta(minutes=5):
                 return self._access_token
-            else:
-                error = result.get("error")
-                error_description = result.get("error_description")
-                logger.error(f"[ERROR] Error obteniendo token: {error} - {error_description}")
-                return None
+        
+        try:
+            with self._token_lock:
+                # Otro hilo pudo renovarlo mientras se esperaba el lock
+                if self._access_token and self._token_expiry:
+                    if datetime.now() < self._token_expiry - timedelta(minutes=5):
+                        return self._access_token
+                
+                return self._adquirir_token()
                 
         except Exception as e:
             logger.error(f"[ERROR] Excepción obteniendo token: {str(e)}")
             return None
     
+    def refrescar_token(self) -> bool:
+        """
+        Renueva el token antes de que expire y lo publica en el cache compartido
+        Pensado para ejecutarse periódicamente (tarea de Celery beat), de modo que los
+        procesos web siempre encuentren un token vigente y no llamen a Azure AD
+        
+        Returns:
+            bool: True si hay un token vigente tras la ejecución
+        """
+        margen = settings.TEAMS_TOKEN_REFRESH_MARGIN
+        
+        try:
+            with self._token_lock:
+                self._get_msal_app()
+                self._cargar_token_cache_compartido()
+                
+                # Descartar tokens que expiran dentro del margen para forzar su renovación
+                ahora = time.time()
+                for entrada in self._token_cache.find(self._token_cache.CredentialType.ACCESS_TOKEN):
+                    if int(entrada['expires_on']) - ahora < margen:
+                        self._token_cache.remove_at(entrada)
+                
+                return self._adquirir_token() is not None
+                
+        except Exception as e:
+            logger.error(f"[ERROR] Excepción refrescando token: {str(e)}")
+            return False
+    
+    def _ruta_eventos(self, event_id: Optional[str] = None, organizador: Optional[str] = None) -> str:
+        """
+        Ruta relativa (sin el endpoint) del calendario de un organizador o de uno de sus eventos
+        Sin organizador se usa el buzón principal (MICROSOFT_TEAMS_USER_ID).
+        """
+        ruta = f"/users/{organizador or self.user_id}/calendar/events"
+        return f"{ruta}/{event_id}" if event_id else ruta
+    
+    def _construir_evento(
+        self,
+        asunto: str,
+        fecha_inicio: datetime,
+        duracion_minutos: int,
+        descripcion: str = "",
+        asistentes: list = None,
+        transaction_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Arma el cuerpo del evento con reunión de Teams (común a la creación individual y por lotes)
+        
+        Args:
+            transaction_id: Identificador determinístico de la creación (ver citas.utils.transaction_id_reunion)
+        """
+        fecha_fin = fecha_inicio + timedelta(minutes=duracion_minutos)
+        
+        evento = {
+            "subject": asunto,
+            "start": {
+                "dateTime": fecha_inicio.isoformat(),
+                "timeZone": self.timezone
+            },
+            "end": {
+                "dateTime": fecha_fin.isoformat(),
+                "timeZone": self.timezone
+            },
+            "isOnlineMeeting": True,
+            "onlineMeetingProvider": "teamsForBusiness"
+        }
+        
+        if transaction_id:
+            # Graph descarta los POST repetidos con el mismo transactionId: un reintento tras
+            # un timeout (cuando Graph sí alcanzó a crear el evento) no duplica la reunión
+            evento["transactionId"] = transaction_id
+        
+        if descripcion:
+            evento["body"] = {
+                "contentType": "HTML",
+                "content": descripcion
+            }
+        
+        if asistentes:
+            evento["attendees"] = [
+                {
+                    "emailAddress": {"address": email},
+                    "type": "required"
+                }
+                for email in asistentes
+            ]
+        
+        return evento
+    
+    def _construir_cambios(
+        self,
+        asunto: Optional[str] = None,
+        fecha_inicio: Optional[datetime] = None,
+        duracion_minutos: Optional[int] = None,
+        descripcion: Optional[str] = None,
+        asistentes: Optional[list] = None
+    ) -> Dict[str, Any]:
+        """Arma el cuerpo del PATCH de un evento (vacío si no hay cambios)"""
+        cambios = {}
+        
+        if asunto:
+            cambios["subject"] = asunto
+        
+        if descripcion:
+            cambios["body"] = {
+                "contentType": "HTML",
+                "content": descripcion
+            }
+        
+        if asistentes:
+            # Reemplaza la lista completa; Graph envía la invitación a los nuevos asistentes
+            cambios["attendees"] = [
+                {
+                    "emailAddress": {"address": email},
+                    "type": "required"
+                }
+                for email in asistentes
+            ]
+        
+        if fecha_inicio and duracion_minutos:
+            fecha_fin = fecha_inicio + timedelta(minutes=duracion_minutos)
+            cambios["start"] = {
+                "dateTime": fecha_inicio.isoformat(),
+                "timeZone": self.timezone
+            }
+            cambios["end"] = {
+                "dateTime": fecha_fin.isoformat(),
+                "timeZone": self.timezone
+            }
+        
+        return cambios
+    
+    @staticmethod
+    def _extraer_reunion_info(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Extrae de la respuesta de Graph los datos de la reunión que usa la aplicación"""
+        return {
+            'id': data.get('id'),
+            'join_url': (data.get('onlineMeeting') or {}).get('joinUrl'),
+            'conference_id': (data.get('onlineMeeting') or {}).get('conferenceId'),
+            'subject': data.get('subject'),
+            'start': (data.get('start') or {}).get('dateTime'),
+            'end': (data.get('end') or {}).get('dateTime'),
+        }
+    
     def crear_reunion_teams(
         self,
         asunto: str,
         fecha_inicio: datetime,
         duracion_minutos: int,
         descripcion: str = "",
-        asistentes: list = None
+        asistentes: list = None,
+        transaction_id: Optional[str] = None,
+        organizador: Optional[str] = None
     ) -> Optional[Dict[str, Any]]:
-        """Crea una reunión de Teams automáticamente"""
+        """
+        Crea una reunión de Teams automáticamente
+        
+        Args:
+            organizador: Buzón donde se crea el evento (default: el principal)
+        
+        Returns:
+            dict: Info de la reunión, incluido el 'organizador' a guardar con el event_id
+        """
         logger.info(f"[TEAMS] Creando reunión: {asunto}")
         
-        for intento in range(settings.TEAMS_MAX_RETRIES):
-            try:
-                token = self._get_access_token()
-                if not token:
-                    logger.error("[ERROR] No se pudo obtener access token")
-                    if intento < settings.TEAMS_MAX_RETRIES - 1:
-                        time.sleep(settings.TEAMS_RETRY_DELAY)
-                        continue
-                    return None
-                
-                fecha_fin = fecha_inicio + timedelta(minutes=duracion_minutos)
-                
-                evento = {
-                    "subject": asunto,
-                    "start": {
-                        "dateTime": fecha_inicio.isoformat(),
-                        "timeZone": self.timezone
-                    },
-                    "end": {
-                        "dateTime": fecha_fin.isoformat(),
-                        "timeZone": self.timezone
-                    },
-                    "isOnlineMeeting": True,
-                    "onlineMeetingProvider": "teamsForBusiness"
-                }
-                
-                if descripcion:
-                    evento["body"] = {
-                        "contentType": "HTML",
-                        "content": descripcion
-                    }
-                
-                if asistentes:
-                    evento["attendees"] = [
-                        {
-                            "emailAddress": {"address": email},
-                            "type": "required"
-                        }
-                        for email in asistentes
-                    ]
-                
-                headers = {
-                    'Authorization': f'Bearer {token}',
-                    'Content-Type': 'application/json',
-                    'Prefer': 'outlook.timezone="' + self.timezone + '"'
-                }
-                
-                url = f"{self.endpoint}/users/{self.user_id}/calendar/events"
-                
-                response = requests.post(
-                    url,
-                    headers=headers,
-                    json=evento,
-                    timeout=settings.MICROSOFT_GRAPH_TIMEOUT,
-                    verify=self.verify_ssl  # ← SSL verification configurable
-                )
+        token = self._get_access_token()
+        if not token:
+            logger.error("[ERROR] No se pudo obtener access token")
+            return None
+        
+        evento = self._construir_evento(asunto, fecha_inicio, duracion_minutos, descripcion, asistentes, transaction_id)
+        
+        headers = {
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json',
+            'Prefer': 'outlook.timezone="' + self.timezone + '"'
+        }
+        
+        url = f"{self.endpoint}{self._ruta_eventos(organizador=organizador)}"
+        
+        try:
+            response = self._request_con_reintentos(
+                'POST',
+                url,
+                headers=headers,
+                json=evento,
+            )
+            
+            if response.status_code == 201:
+                reunion_info = self._extraer_reunion_info(response.json())
+                reunion_info['organizador'] = organizador or self.user_id
                 
-                if response.status_code == 201:
-                    data = response.json()
-                    reunion_info = {
-                        'id': data.get('id'),
-                        'join_url': data.get('onlineMeeting', {}).get('joinUrl'),
-                        'conference_id': data.get('onlineMeeting', {}).get('conferenceId'),
-                        'subject': data.get('subject'),
-                        'start': data.get('start', {}).get('dateTime'),
-                        'end': data.get('end', {}).get('dateTime'),
-                    }
-                    
-                    logger.info(f"[OK] Reunión creada: {reunion_info['id']}")
-                    return reunion_info
-                else:
-                    logger.error(f"[ERROR] HTTP {response.status_code}: {response.text}")
-                    if intento < settings.TEAMS_MAX_RETRIES - 1:
-                        time.sleep(settings.TEAMS_RETRY_DELAY)
-                        continue
-                    return None
-                    
-            except requests.exceptions.SSLError as e:
-                logger.error(f"[ERROR] Error SSL: {str(e)}")
-                logger.error("[ERROR] Configurar certificado corporativo o DISABLE_SSL_VERIFY=True")
-                return None
-            except requests.exceptions.Timeout:
-                logger.error(f"[ERROR] Timeout (intento {intento + 1}/{settings.TEAMS_MAX_RETRIES})")
-                if intento < settings.TEAMS_MAX_RETRIES - 1:
-                    time.sleep(settings.TEAMS_RETRY_DELAY)
-                    continue
-                return None
-            except Exception as e:
-                logger.error(f"[ERROR] Excepción: {str(e)}")
-                if intento < settings.TEAMS_MAX_RETRIES - 1:
-                    time.sleep(settings.TEAMS_RETRY_DELAY)
-                    continue
+                logger.info(f"[OK] Reunión creada: {reunion_info['id']}")
+                return reunion_info
+            else:
+                logger.error(f"[ERROR] HTTP {response.status_code}: {response.text}")
                 return None
-        
-        return None
+                
+        except CircuitoAbiertoError as e:
+            logger.warning(f"[WARN] {str(e)}")
+            return None
+        except requests.exceptions.SSLError as e:
+            logger.error(f"[ERROR] Error SSL: {str(e)}")
+            logger.error("[ERROR] Configurar certificado corporativo o DISABLE_SSL_VERIFY=True")
+            return None
+        except requests.exceptions.Timeout:
+            logger.error(f"[ERROR] Timeout tras {settings.TEAMS_MAX_RETRIES} intentos")
+            return None
+        except Exception as e:
+            logger.error(f"[ERROR] Excepción: {str(e)}")
+            return None
     
-    def eliminar_reunion_teams(self, event_id: str) -> bool:
-        """Elimina una reunión de Teams"""
+    def eliminar_reunion_teams(self, event_id: str, organizador: Optional[str] = None) -> bool:
+        """Elimina una reunión de Teams (del buzón organizador donde se creó)"""
         logger.info(f"[TEAMS] Eliminando reunión: {event_id}")
         
         token = self._get_access_token()
@@ -187,15 +604,10 @@ class MicrosoftTeamsService:
             return False
         
         headers = {'Authorization': f'Bearer {token}'}
-        url = f"{self.endpoint}/users/{self.user_id}/calendar/events/{event_id}"
+        url = f"{self.endpoint}{self._ruta_eventos(event_id, organizador)}"
         
         try:
-            response = requests.delete(
-                url,
-                headers=headers,
-                timeout=settings.MICROSOFT_GRAPH_TIMEOUT,
-                verify=self.verify_ssl  # ← SSL verification configurable
-            )
+            response = self._request_con_reintentos('DELETE', url, headers=headers)
             
             if response.status_code == 204:
                 logger.info(f"[OK] Reunión eliminada: {event_id}")
@@ -204,6 +616,9 @@ class MicrosoftTeamsService:
                 logger.error(f"[ERROR] Error eliminando: {response.status_code}")
                 return False
                 
+        except CircuitoAbiertoError as e:
+            logger.warning(f"[WARN] {str(e)}")
+            return False
         except Exception as e:
             logger.error(f"[ERROR] Excepción eliminando: {str(e)}")
             return False
@@ -213,7 +628,10 @@ class MicrosoftTeamsService:
         event_id: str,
         asunto: Optional[str] = None,
         fecha_inicio: Optional[datetime] = None,
-        duracion_minutos: Optional[int] = None
+        duracion_minutos: Optional[int] = None,
+        descripcion: Optional[str] = None,
+        asistentes: Optional[list] = None,
+        organizador: Optional[str] = None
     ) -> bool:
         """Actualiza una reunión existente"""
         logger.info(f"[TEAMS] Actualizando reunión: {event_id}")
@@ -222,21 +640,7 @@ class MicrosoftTeamsService:
         if not token:
             return False
         
-        cambios = {}
-        
-        if asunto:
-            cambios["subject"] = asunto
-        
-        if fecha_inicio and duracion_minutos:
-            fecha_fin = fecha_inicio + timedelta(minutes=duracion_minutos)
-            cambios["start"] = {
-                "dateTime": fecha_inicio.isoformat(),
-                "timeZone": self.timezone
-            }
-            cambios["end"] = {
-                "dateTime": fecha_fin.isoformat(),
-                "timeZone": self.timezone
-            }
+        cambios = self._construir_cambios(asunto, fecha_inicio, duracion_minutos, descripcion, asistentes)
         
         if not cambios:
             logger.warning("[WARN] No hay cambios para actualizar")
@@ -247,15 +651,14 @@ class MicrosoftTeamsService:
             'Content-Type': 'application/json'
         }
         
-        url = f"{self.endpoint}/users/{self.user_id}/calendar/events/{event_id}"
+        url = f"{self.endpoint}{self._ruta_eventos(event_id, organizador)}"
         
         try:
-            response = requests.patch(
+            response = self._request_con_reintentos(
+                'PATCH',
                 url,
                 headers=headers,
                 json=cambios,
-                timeout=settings.MICROSOFT_GRAPH_TIMEOUT,
-                verify=self.verify_ssl  # ← SSL verification configurable
             )
             
             if response.status_code == 200:
@@ -265,10 +668,321 @@ class MicrosoftTeamsService:
                 logger.error(f"[ERROR] Error actualizando: {response.status_code}")
                 return False
                 
+        except CircuitoAbiertoError as e:
+            logger.warning(f"[WARN] {str(e)}")
+            return False
         except Exception as e:
             logger.error(f"[ERROR] Excepción actualizando: {str(e)}")
             return False
     
+    def _ejecutar_batch(self, operaciones: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Ejecuta operaciones con JSON batching de Graph (/$batch, hasta 20 por petición HTTP)
+        Solo se reintentan las operaciones que fallaron por un error transitorio (429/5xx)
+        o cuyo lote no obtuvo respuesta; las demás conservan su resultado del primer intento.
+        
+        Args:
+            operaciones: {id_operacion: {'method', 'url' (relativa al endpoint), 'headers', 'body'}}
+        
+        Returns:
+            dict: {id_operacion: {'status': int, 'body': dict}} (status 0 si nunca hubo respuesta)
+        """
+        resultados = {}
+        pendientes = dict(operaciones)
+        peticiones = 0
+        retry_after = None
+        
+        for intento in range(settings.TEAMS_MAX_RETRIES):
+            if not pendientes:
+                break
+            if intento:
+                espera = calcular_espera(intento - 1, retry_after)
+                if espera > settings.TEAMS_RETRY_MAX_DELAY:
+                    logger.warning(f"[WARN] Graph pidió esperar {espera:.0f} s: no se reintenta el batch")
+                    break
+                logger.warning(
+                    f"[TEAMS] Reintentando {len(pendientes)} operaciones del batch en {espera:.1f} s "
+                    f"(intento {intento + 1}/{settings.TEAMS_MAX_RETRIES})"
+                )
+                time.sleep(espera)
+            
+            token = self._get_access_token()
+            if not token:
+                logger.error("[ERROR] No se pudo obtener access token")
+                continue
+            
+            headers = {
+                'Authorization': f'Bearer {token}',
+                'Content-Type': 'application/json'
+            }
+            url = f"{self.endpoint}/$batch"
+            
+            reintentar = {}
+            retry_after = None
+            # Circuitos de los buzones con operaciones limitadas: {circuito: Retry-After}
+            limitadas = {}
+            claves = list(pendientes)
+            
+            for i in range(0, len(claves), MAX_OPERACIONES_BATCH):
+                lote = claves[i:i + MAX_OPERACIONES_BATCH]
+                cuerpo = {'requests': [{'id': clave, **pendientes[clave]} for clave in lote]}
+                peticiones += 1
+                inicio = time.perf_counter()
+                
+                try:
+                    response = self._request('POST', url, intento=intento, registrar=False, headers=headers, json=cuerpo)
+                except CircuitoAbiertoError as e:
+                    logger.warning(f"[WARN] {str(e)}")
+                    reintentar = {}
+                    break
+                except requests.exceptions.SSLError as e:
+                    logger.error(f"[ERROR] Error SSL: {str(e)}")
+                    logger.error("[ERROR] Configurar certificado corporativo o DISABLE_SSL_VERIFY=True")
+                    reintentar = {}
+                    break
+                except requests.exceptions.RequestException as e:
+                    logger.error(f"[ERROR] Excepción en $batch: {str(e)}")
+                    telemetria.registrar('POST', url, 0, (time.perf_counter() - inicio) * 1000, intento)
+                    reintentar.update({clave: pendientes[clave] for clave in lote})
+                    continue
+                
+                latencia_ms = (time.perf_counter() - inicio) * 1000
+                if response.status_code != 200:
+                    logger.error(f"[ERROR] HTTP {response.status_code} en $batch: {response.text}")
+                    telemetria.registrar('POST', url, response.status_code, latencia_ms, intento)
+                    reintentar.update({clave: pendientes[clave] for clave in lote})
+                    continue
+                
+                limitada = False
+                respondidas = set()
+                for item in response.json().get('responses', []):
+                    clave = item.get('id')
+                    if clave not in pendientes:
+                        continue
+                    
+                    respondidas.add(clave)
+                    status = item.get('status', 0)
+                    resultados[clave] = {'status': status, 'body': item.get('body') or {}}
+                    
+                    limitada = limitada or status == 429
+                    if status in ESTADOS_REINTENTABLES:
+                        reintentar[clave] = pendientes[clave]
+                        circuito = self._circuito_para_url(pendientes[clave]['url'])
+                        limitadas.setdefault(circuito, None)
+                        segundos = leer_retry_after((item.get('headers') or {}).get('Retry-After'))
+                        if segundos is not None:
+                            retry_after = max(retry_after or 0, segundos)
+                            limitadas[circuito] = max(limitadas[circuito] or 0, segundos)
+                
+                for clave in lote:
+                    if clave not in respondidas:
+                        reintentar[clave] = pendientes[clave]
+                
+                telemetria.registrar('POST', url, response.status_code, latencia_ms, intento, limitada)
+            
+            # El $batch responde 200 aunque Graph limite operaciones individuales
+            for circuito, segundos in limitadas.items():
+                circuito.registrar_fallo(segundos)
+            
+            pendientes = reintentar
+        
+        for clave in operaciones:
+            resultados.setdefault(clave, {'status': 0, 'body': {}})
+        
+        logger.info(f"[TEAMS] Batch: {len(operaciones)} operaciones en {peticiones} peticiones HTTP")
+        return resultados
+    
+    def crear_reuniones_teams_batch(
+        self,
+        reuniones: Dict[Any, Dict[str, Any]]
+    ) -> Dict[Any, Optional[Dict[str, Any]]]:
+        """
+        Crea varias reuniones de Teams con $batch
+        
+        Args:
+            reuniones: {clave (ej: id de la cita): argumentos de crear_reunion_teams}
+        
+        Returns:
+            dict: {clave: info de la reunión o None si falló}
+        """
+        logger.info(f"[TEAMS] Creando {len(reuniones)} reuniones por batch")
+        
+        operaciones = {}
+        organizadores = {}
+        for clave, datos in reuniones.items():
+            datos = dict(datos)
+            organizadores[clave] = datos.pop('organizador', None) or self.user_id
+            operaciones[str(clave)] = {
+                'method': 'POST',
+                'url': self._ruta_eventos(organizador=organizadores[clave]),
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Prefer': 'outlook.timezone="' + self.timezone + '"'
+                },
+                'body': self._construir_evento(**datos),
+            }
+        resultados = self._ejecutar_batch(operaciones)
+        
+        reuniones_info = {}
+        for clave in reuniones:
+            resultado = resultados[str(clave)]
+            if resultado['status'] == 201:
+                reuniones_info[clave] = self._extraer_reunion_info(resultado['body'])
+                reuniones_info[clave]['organizador'] = organizadores[clave]
+                logger.info(f"[OK] Reunión creada ({clave}): {reuniones_info[clave]['id']}")
+            else:
+                reuniones_info[clave] = None
+                logger.error(f"[ERROR] No se creó la reunión ({clave}): HTTP {resultado['status']}")
+        
+        return reuniones_info
+    
+    def eliminar_reuniones_teams_batch(
+        self,
+        eventos: Dict[Any, str],
+        organizadores: Optional[Dict[Any, str]] = None
+    ) -> Dict[Any, bool]:
+        """
+        Elimina varias reuniones de Teams con $batch
+        
+        Args:
+            eventos: {clave (ej: id de la cita): event_id}
+            organizadores: {clave: buzón del evento} (las claves ausentes usan el principal)
+        
+        Returns:
+            dict: {clave: True si se eliminó}
+        """
+        logger.info(f"[TEAMS] Eliminando {len(eventos)} reuniones por batch")
+        
+        organizadores = organizadores or {}
+        operaciones = {
+            str(clave): {'method': 'DELETE', 'url': self._ruta_eventos(event_id, organizadores.get(clave))}
+            for clave, event_id in eventos.items()
+        }
+        resultados = self._ejecutar_batch(operaciones)
+        
+        eliminadas = {}
+        for clave in eventos:
+            status = resultados[str(clave)]['status']
+            # 404: el evento ya no existe (p. ej. un intento anterior sí llegó a Graph)
+            eliminadas[clave] = status in (204, 404)
+            if not eliminadas[clave]:
+                logger.error(f"[ERROR] No se eliminó la reunión ({clave}): HTTP {status}")
+        
+        return eliminadas
+    
+    def actualizar_reuniones_teams_batch(self, cambios: Dict[Any, Dict[str, Any]]) -> Dict[Any, bool]:
+        """
+        Actualiza varias reuniones de Teams con $batch
+        
+        Args:
+            cambios: {clave (ej: id de la cita): {'event_id', 'organizador', 'asunto', 'fecha_inicio', 'duracion_minutos'}}
+        
+        Returns:
+            dict: {clave: True si se actualizó}
+        """
+        logger.info(f"[TEAMS] Actualizando {len(cambios)} reuniones por batch")
+        
+        operaciones = {}
+        for clave, datos in cambios.items():
+            datos = dict(datos)
+            event_id = datos.pop('event_id')
+            organizador = datos.pop('organizador', None)
+            cuerpo = self._construir_cambios(**datos)
+            if cuerpo:
+                operaciones[str(clave)] = {
+                    'method': 'PATCH',
+                    'url': self._ruta_eventos(event_id, organizador),
+                    'headers': {'Content-Type': 'application/json'},
+                    'body': cuerpo,
+                }
+            else:
+                logger.warning(f"[WARN] No hay cambios para actualizar ({clave})")
+        
+        resultados = self._ejecutar_batch(operaciones) if operaciones else {}
+        
+        actualizadas = {}
+        for clave in cambios:
+            resultado = resultados.get(str(clave))
+            actualizadas[clave] = bool(resultado) and resultado['status'] == 200
+            if resultado and not actualizadas[clave]:
+                logger.error(f"[ERROR] No se actualizó la reunión ({clave}): HTTP {resultado['status']}")
+        
+        return actualizadas
+    
+    def obtener_cambios_calendario(
+        self,
+        delta_link: Optional[str] = None,
+        inicio: Optional[datetime] = None,
+        fin: Optional[datetime] = None,
+        organizador: Optional[str] = None
+    ) -> Iterator[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        """
+        Recorre los cambios del calendario del organizador con una consulta delta
+        (calendarView/delta) página por página
+        
+        Sin delta_link se hace la sincronización inicial de la ventana [inicio, fin):
+        Graph retorna todos sus eventos. Con el delta_link de la ejecución anterior solo
+        retorna los eventos creados, modificados o eliminados desde entonces.
+        
+        Args:
+            delta_link: @odata.deltaLink guardado de la ejecución anterior
+            inicio: Inicio de la ventana (solo en la sincronización inicial)
+            fin: Fin de la ventana (solo en la sincronización inicial)
+            organizador: Buzón cuyo calendario se consulta (default: el principal)
+        
+        Yields:
+            tuple: (eventos de la página, delta link nuevo o None si quedan páginas).
+            Cada evento es {'id', 'eliminado', 'cancelado', 'subject', 'start', 'time_zone',
+            'join_url', 'transaction_id', 'creado'}
+        
+        Raises:
+            DeltaInvalidoError: Si Graph descartó el estado de sincronización (410)
+            requests.exceptions.RequestException: Si Graph no responde o retorna un error
+        """
+        if delta_link:
+            url, params = delta_link, None
+        else:
+            url = f"{self.endpoint}/users/{organizador or self.user_id}/calendarView/delta"
+            params = {
+                'startDateTime': inicio.isoformat(),
+                'endDateTime': fin.isoformat(),
+            }
+        
+        while url:
+            token = self._get_access_token()
+            if not token:
+                raise requests.exceptions.RequestException('No se pudo obtener access token')
+            
+            headers = {
+                'Authorization': f'Bearer {token}',
+                'Prefer': f'odata.maxpagesize={TAMANO_PAGINA_DELTA}, outlook.timezone="{self.timezone}"'
+            }
+            response = self._request_con_reintentos('GET', url, headers=headers, params=params)
+            
+            if response.status_code == 410:
+                raise DeltaInvalidoError(response.text)
+            response.raise_for_status()
+            
+            data = response.json()
+            eventos = [
+                {
+                    'id': evento.get('id'),
+                    'eliminado': '@removed' in evento,
+                    'cancelado': bool(evento.get('isCancelled')),
+                    'subject': evento.get('subject') or '',
+                    'start': (evento.get('start') or {}).get('dateTime'),
+                    'time_zone': (evento.get('start') or {}).get('timeZone'),
+                    'join_url': (evento.get('onlineMeeting') or {}).get('joinUrl'),
+                    'transaction_id': evento.get('transactionId'),
+                    'creado': evento.get('createdDateTime'),
+                }
+                for evento in data.get('value', [])
+            ]
+            
+            # nextLink y deltaLink ya traen todos los parámetros de la consulta
+            url, params = data.get('@odata.nextLink'), None
+            yield eventos, data.get('@odata.deltaLink')
+    
     def verificar_conexion(self) -> bool:
         """Verifica conectividad con Graph API"""
         logger.info("[TEAMS] Verificando conexión con Microsoft Graph API")
@@ -282,12 +996,7 @@ class MicrosoftTeamsService:
         url = f"{self.endpoint}/users/{self.user_id}"
         
         try:
-            response = requests.get(
-                url,
-                headers=headers,
-                timeout=settings.MICROSOFT_GRAPH_TIMEOUT,
-                verify=self.verify_ssl  # ← SSL verification configurable
-            )
+            response = self._request('GET', url, headers=headers)
             
             if response.status_code == 200:
                 user_data = response.json()
@@ -304,7 +1013,307 @@ class MicrosoftTeamsService:
         except Exception as e:
             logger.error(f"[ERROR] Excepción verificando: {str(e)}")
             return False
+    
+    # ============================================
+    # API ASÍNCRONA (vistas ASGI y tareas async)
+    # ============================================
+    #
+    # Mismas operaciones que la API síncrona (mismo token, payloads y circuit breaker),
+    # pero con httpx: muchas llamadas concurrentes en un solo event loop. Ejemplo:
+    #
+    #     resultados = await teams_service.acrear_reuniones_teams({cita.id: datos, ...})
+    
+    def _get_async_client(self) -> 'httpx.AsyncClient':
+        """
+        Retorna el cliente HTTP asíncrono del event loop actual
+        Un AsyncClient queda ligado al loop donde se usa: si el loop cambió (ej: otro
+        asyncio.run), se crea uno nuevo junto con su semáforo de concurrencia.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            import httpx
+            
+            limites = httpx.Limits(
+                max_connections=settings.MICROSOFT_GRAPH_POOL_MAXSIZE,
+                max_keepalive_connections=settings.MICROSOFT_GRAPH_POOL_MAXSIZE,
+            )
+            # Igual que en la sesión síncrona: solo se reintentan errores de conexión
+            transporte = httpx.AsyncHTTPTransport(
+                verify=self.verify_ssl,
+                limits=limites,
+                retries=settings.MICROSOFT_GRAPH_CONNECT_RETRIES,
+            )
+            self._async_client = httpx.AsyncClient(
+                transport=transporte,
+                timeout=settings.MICROSOFT_GRAPH_TIMEOUT,
+            )
+            self._async_loop = loop
+            self._async_semaforo = asyncio.Semaphore(settings.MICROSOFT_GRAPH_MAX_CONCURRENCIA)
+            logger.info(f"[HTTP] Cliente asíncrono creado (pid {os.getpid()})")
+        
+        return self._async_client
+    
+    async def aclose(self):
+        """
+        Cierra el cliente asíncrono (llamar antes de terminar el event loop)
+        Escribe también la telemetría acumulada: desde el event loop no se puede.
+        """
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_loop = None
+        await sync_to_async(telemetria.vaciar)()
+    
+    async def _aget_access_token(self) -> Optional[str]:
+        """Versión asíncrona de _get_access_token (MSAL es bloqueante: corre en un hilo)"""
+        return await sync_to_async(self._get_access_token, thread_sensitive=False)()
+    
+    async def _arequest(self, method: str, url: str, intento: int = 0, **kwargs) -> 'httpx.Response':
+        """
+        Versión asíncrona de _request (limitada por MICROSOFT_GRAPH_MAX_CONCURRENCIA)
+        
+        Raises:
+            CircuitoAbiertoError: Si el circuito de Graph está abierto (no se envía nada)
+        """
+        import httpx
+        
+        circuito = self._circuito_para_url(url)
+        await sync_to_async(circuito.verificar, thread_sensitive=False)()
+        client = self._get_async_client()
+        
+        async with self._async_semaforo:
+            inicio = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.HTTPError as e:
+                latencia_ms = (time.perf_counter() - inicio) * 1000
+                logger.warning(f"[HTTP] {method} {url} - falló tras {latencia_ms:.0f} ms: {type(e).__name__}")
+                await sync_to_async(circuito.registrar_fallo, thread_sensitive=False)()
+                telemetria.registrar(method, url, 0, latencia_ms, intento)
+                raise
+        
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+        logger.info(f"[HTTP] {method} {url} - {response.status_code} en {latencia_ms:.0f} ms (async)")
+        telemetria.registrar(method, url, response.status_code, latencia_ms, intento)
+        
+        if response.status_code in ESTADOS_REINTENTABLES:
+            retry_after = leer_retry_after(response.headers.get('Retry-After'))
+            await sync_to_async(circuito.registrar_fallo, thread_sensitive=False)(retry_after)
+        else:
+            await sync_to_async(circuito.registrar_exito, thread_sensitive=False)()
+        
+        return response
+    
+    async def _arequest_con_reintentos(self, method: str, url: str, **kwargs) -> 'httpx.Response':
+        """Versión asíncrona de _request_con_reintentos (espera con asyncio.sleep)"""
+        import httpx
+        
+        for intento in range(settings.TEAMS_MAX_RETRIES):
+            ultimo_intento = intento == settings.TEAMS_MAX_RETRIES - 1
+            
+            try:
+                response = await self._arequest(method, url, intento=intento, **kwargs)
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                if ultimo_intento:
+                    raise
+                espera = calcular_espera(intento)
+                logger.warning(
+                    f"[WARN] {type(e).__name__} en {method} (intento {intento + 1}/{settings.TEAMS_MAX_RETRIES}), "
+                    f"reintentando en {espera:.1f} s"
+                )
+                await asyncio.sleep(espera)
+                continue
+            
+            if response.status_code not in ESTADOS_REINTENTABLES or ultimo_intento:
+                return response
+            
+            espera = calcular_espera(intento, leer_retry_after(response.headers.get('Retry-After')))
+            if espera > settings.TEAMS_RETRY_MAX_DELAY:
+                logger.warning(f"[WARN] Graph pidió esperar {espera:.0f} s: se abandona la petición")
+                return response
+            
+            logger.warning(
+                f"[WARN] HTTP {response.status_code} en {method} (intento {intento + 1}/{settings.TEAMS_MAX_RETRIES}), "
+                f"reintentando en {espera:.1f} s"
+            )
+            await asyncio.sleep(espera)
+        
+        return response
+    
+    async def acrear_reunion_teams(
+        self,
+        asunto: str,
+        fecha_inicio: datetime,
+        duracion_minutos: int,
+        descripcion: str = "",
+        asistentes: list = None,
+        transaction_id: Optional[str] = None,
+        organizador: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Versión asíncrona de crear_reunion_teams"""
+        logger.info(f"[TEAMS] Creando reunión (async): {asunto}")
+        
+        token = await self._aget_access_token()
+        if not token:
+            logger.error("[ERROR] No se pudo obtener access token")
+            return None
+        
+        headers = {
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json',
+            'Prefer': 'outlook.timezone="' + self.timezone + '"'
+        }
+        evento = self._construir_evento(asunto, fecha_inicio, duracion_minutos, descripcion, asistentes, transaction_id)
+        url = f"{self.endpoint}{self._ruta_eventos(organizador=organizador)}"
+        
+        try:
+            response = await self._arequest_con_reintentos('POST', url, headers=headers, json=evento)
+            
+            if response.status_code == 201:
+                reunion_info = self._extraer_reunion_info(response.json())
+                reunion_info['organizador'] = organizador or self.user_id
+                logger.info(f"[OK] Reunión creada: {reunion_info['id']}")
+                return reunion_info
+            else:
+                logger.error(f"[ERROR] HTTP {response.status_code}: {response.text}")
+                return None
+                
+        except CircuitoAbiertoError as e:
+            logger.warning(f"[WARN] {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"[ERROR] Excepción: {type(e).__name__} {str(e)}")
+            return None
+    
+    async def aeliminar_reunion_teams(self, event_id: str, organizador: Optional[str] = None) -> bool:
+        """Versión asíncrona de eliminar_reunion_teams"""
+        logger.info(f"[TEAMS] Eliminando reunión (async): {event_id}")
+        
+        token = await self._aget_access_token()
+        if not token:
+            return False
+        
+        headers = {'Authorization': f'Bearer {token}'}
+        url = f"{self.endpoint}{self._ruta_eventos(event_id, organizador)}"
+        
+        try:
+            response = await self._arequest_con_reintentos('DELETE', url, headers=headers)
+            
+            if response.status_code == 204:
+                logger.info(f"[OK] Reunión eliminada: {event_id}")
+                return True
+            else:
+                logger.error(f"[ERROR] Error eliminando: {response.status_code}")
+                return False
+                
+        except CircuitoAbiertoError as e:
+            logger.warning(f"[WARN] {str(e)}")
+            return False
+        except Exception as e:
+            logger.error(f"[ERROR] Excepción eliminando: {type(e).__name__} {str(e)}")
+            return False
+    
+    async def aactualizar_reunion_teams(
+        self,
+        event_id: str,
+        asunto: Optional[str] = None,
+        fecha_inicio: Optional[datetime] = None,
+        duracion_minutos: Optional[int] = None,
+        descripcion: Optional[str] = None,
+        asistentes: Optional[list] = None,
+        organizador: Optional[str] = None
+    ) -> bool:
+        """Versión asíncrona de actualizar_reunion_teams"""
+        logger.info(f"[TEAMS] Actualizando reunión (async): {event_id}")
+        
+        cambios = self._construir_cambios(asunto, fecha_inicio, duracion_minutos, descripcion, asistentes)
+        if not cambios:
+            logger.warning("[WARN] No hay cambios para actualizar")
+            return False
+        
+        token = await self._aget_access_token()
+        if not token:
+            return False
+        
+        headers = {
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json'
+        }
+        url = f"{self.endpoint}{self._ruta_eventos(event_id, organizador)}"
+        
+        try:
+            response = await self._arequest_con_reintentos('PATCH', url, headers=headers, json=cambios)
+            
+            if response.status_code == 200:
+                logger.info(f"[OK] Reunión actualizada: {event_id}")
+                return True
+            else:
+                logger.error(f"[ERROR] Error actualizando: {response.status_code}")
+                return False
+                
+        except CircuitoAbiertoError as e:
+            logger.warning(f"[WARN] {str(e)}")
+            return False
+        except Exception as e:
+            logger.error(f"[ERROR] Excepción actualizando: {type(e).__name__} {str(e)}")
+            return False
+    
+    async def acrear_reuniones_teams(
+        self,
+        reuniones: Dict[Any, Dict[str, Any]]
+    ) -> Dict[Any, Optional[Dict[str, Any]]]:
+        """
+        Crea varias reuniones de Teams de forma concurrente
+        
+        Args:
+            reuniones: {clave (ej: id de la cita): argumentos de crear_reunion_teams}
+        
+        Returns:
+            dict: {clave: info de la reunión o None si falló}
+        """
+        claves = list(reuniones)
+        resultados = await asyncio.gather(
+            *(self.acrear_reunion_teams(**reuniones[clave]) for clave in claves)
+        )
+        return dict(zip(claves, resultados))
+    
+    async def aeliminar_reuniones_teams(
+        self,
+        eventos: Dict[Any, str],
+        organizadores: Optional[Dict[Any, str]] = None
+    ) -> Dict[Any, bool]:
+        """
+        Elimina varias reuniones de Teams de forma concurrente
+        
+        Args:
+            eventos: {clave (ej: id de la cita): event_id}
+            organizadores: {clave: buzón del evento} (las claves ausentes usan el principal)
+        
+        Returns:
+            dict: {clave: True si se eliminó}
+        """
+        organizadores = organizadores or {}
+        claves = list(eventos)
+        resultados = await asyncio.gather(
+            *(self.aeliminar_reunion_teams(eventos[clave], organizadores.get(clave)) for clave in claves)
+        )
+        return dict(zip(claves, resultados))
+    
+    async def aactualizar_reuniones_teams(self, cambios: Dict[Any, Dict[str, Any]]) -> Dict[Any, bool]:
+        """
+        Actualiza varias reuniones de Teams de forma concurrente
+        
+        Args:
+            cambios: {clave (ej: id de la cita): argumentos de actualizar_reunion_teams}
+        
+        Returns:
+            dict: {clave: True si se actualizó}
+        """
+        claves = list(cambios)
+        resultados = await asyncio.gather(
+            *(self.aactualizar_reunion_teams(**cambios[clave]) for clave in claves)
+        )
+        return dict(zip(claves, resultados))
 
-
-# Instancia singleton
-teams_service = MicrosoftTeamsService()
\ No newline at end of file
+# Instancia singleton, construida en el primer uso (no al importar el módulo)
+teams_service = SimpleLazyObject(MicrosoftTeamsService)
\ No newline at end of file
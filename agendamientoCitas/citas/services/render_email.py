@@ -0,0 +1,196 @@
+# citas/services/render_email.py
+
+"""
+Renderizado de los emails del sistema
+
+Cada email (templates/emails/<nombre>) tiene dos plantillas: <nombre>.html y
+<nombre>.txt. Ambas se compilan una vez por proceso y se guardan en memoria; al
+compilar la HTML se precalcula su parte estática:
+
+    - Las reglas del bloque <style> se copian al atributo style de cada elemento
+      (muchos clientes de correo ignoran <style>); las pseudo-clases como :hover
+      quedan solo en el bloque.
+    - Se compacta el espacio en blanco de la maquetación.
+
+La versión texto plano sale de su propia plantilla en lugar de aplicar strip_tags al
+HTML, que era la parte más cara de cada email. En DEBUG las plantillas se recompilan
+en cada email para ver los cambios sin reiniciar.
+"""
+
+import re
+import threading
+
+from django.conf import settings
+from django.template import engines
+
+# Elementos sin etiqueta de cierre: no se apilan como ancestros
+ETIQUETAS_VACIAS = {'area', 'base', 'br', 'col', 'hr', 'img', 'input', 'link', 'meta', 'source', 'wbr'}
+
+# Elementos del <head> a los que no se les agrega estilo
+ETIQUETAS_SIN_ESTILO = {'html', 'head', 'meta', 'title', 'style', 'link'}
+
+_RE_ETIQUETA = re.compile(r'<!--.*?-->|<(/?)([a-zA-Z][a-zA-Z0-9]*)([^<>]*)>', re.S)
+_RE_BLOQUE_STYLE = re.compile(r'<style[^>]*>(.*?)</style>', re.S | re.I)
+_RE_REGLA = re.compile(r'([^{}]+)\{([^{}]*)\}')
+_RE_SELECTOR_SIMPLE = re.compile(r'[a-zA-Z][a-zA-Z0-9]*|\.[\w-]+')
+_RE_ESPACIOS = re.compile(r'\s*\n\s*')
+
+
+def _leer_reglas(css: str) -> list:
+    """
+    Reglas del CSS que se pueden copiar a los elementos, de menor a mayor prioridad
+    Solo se consideran selectores de etiqueta, de clase y sus descendientes (los que
+    usan las plantillas); el resto queda únicamente en el bloque <style>.
+
+    Returns:
+        list: [(partes del selector, declaraciones)] ordenadas por especificidad y orden
+    """
+    reglas = []
+    for orden, (selectores, cuerpo) in enumerate(_RE_REGLA.findall(css)):
+        # Las comillas dobles cerrarían el atributo style
+        declaraciones = [d.strip().replace('"', "'") for d in cuerpo.split(';') if d.strip()]
+        for selector in selectores.split(','):
+            partes = selector.split()
+            if not partes or not all(_RE_SELECTOR_SIMPLE.fullmatch(parte) for parte in partes):
+                continue
+            clases = sum(1 for parte in partes if parte.startswith('.'))
+            reglas.append(((clases, len(partes) - clases, orden), partes, declaraciones))
+
+    reglas.sort(key=lambda regla: regla[0])
+    return [(partes, declaraciones) for _, partes, declaraciones in reglas]
+
+
+def _coincide(parte: str, elemento) -> bool:
+    etiqueta, clases = elemento
+    return parte[1:] in clases if parte.startswith('.') else parte.lower() == etiqueta
+
+
+def _aplica(partes, elemento, ancestros) -> bool:
+    """Si el selector (partes separadas por el combinador descendiente) aplica al elemento"""
+    if not _coincide(partes[-1], elemento):
+        return False
+    pendientes = partes[:-1]
+    for ancestro in reversed(ancestros):
+        if not pendientes:
+            break
+        if _coincide(pendientes[-1], ancestro):
+            pendientes = pendientes[:-1]
+    return not pendientes
+
+
+def inlinear_css(fuente: str) -> str:
+    """
+    Copia las reglas del bloque <style> al atributo style de cada elemento
+    Trabaja sobre la fuente de la plantilla: las etiquetas de Django quedan intactas
+    (van entre elementos o dentro de valores de atributos). El estilo propio del
+    elemento va al final, así que prevalece sobre el de las reglas.
+
+    Args:
+        fuente: Fuente HTML de la plantilla
+
+    Returns:
+        str: Fuente con los estilos en línea (se conserva el bloque <style>)
+    """
+    reglas = _leer_reglas(' '.join(_RE_BLOQUE_STYLE.findall(fuente)))
+    if not reglas:
+        return fuente
+
+    ancestros = []
+
+    def reemplazar(coincidencia):
+        cierre, etiqueta, atributos = coincidencia.groups()
+        if etiqueta is None:
+            return coincidencia.group(0)
+
+        etiqueta = etiqueta.lower()
+        if cierre:
+            for i in range(len(ancestros) - 1, -1, -1):
+                if ancestros[i][0] == etiqueta:
+                    del ancestros[i:]
+                    break
+            return coincidencia.group(0)
+
+        clase = re.search(r'\bclass="([^"]*)"', atributos)
+        elemento = (etiqueta, set(clase.group(1).split()) if clase else set())
+        declaraciones = [
+            declaracion
+            for partes, declaraciones_regla in reglas if _aplica(partes, elemento, ancestros)
+            for declaracion in declaraciones_regla
+        ]
+        if etiqueta not in ETIQUETAS_VACIAS and not atributos.rstrip().endswith('/'):
+            ancestros.append(elemento)
+
+        if not declaraciones or etiqueta in ETIQUETAS_SIN_ESTILO:
+            return coincidencia.group(0)
+
+        estilo = re.search(r'\bstyle="([^"]*)"', atributos)
+        if estilo:
+            declaraciones.append(estilo.group(1).strip().rstrip(';'))
+            atributos = atributos[:estilo.start()] + atributos[estilo.end():]
+        return f'<{etiqueta} style="{"; ".join(declaraciones)}"{atributos}>'
+
+    return _RE_ETIQUETA.sub(reemplazar, fuente)
+
+
+def compactar_html(fuente: str) -> str:
+    """Reduce a un salto de línea cada bloque de espacio en blanco con saltos (sangría de la maquetación)"""
+    return _RE_ESPACIOS.sub('\n', fuente)
+
+
+class PlantillaEmail:
+    """Plantillas compiladas (HTML con estilos en línea y texto plano) de un email"""
+
+    def __init__(self, nombre: str):
+        motor = engines['django']
+        fuente = motor.get_template(f'emails/{nombre}.html').template.source
+        self.nombre = nombre
+        self.html = motor.from_string(compactar_html(inlinear_css(fuente)))
+        self.texto = motor.get_template(f'emails/{nombre}.txt')
+
+    def renderizar(self, contexto: dict):
+        """
+        Returns:
+            tuple: (texto plano, HTML)
+        """
+        return self.texto.render(contexto).strip() + '\n', self.html.render(contexto)
+
+
+class RenderizadorEmails:
+    """Cache por proceso de las plantillas de email compiladas (seguro entre hilos)"""
+
+    def __init__(self):
+        self._plantillas = {}
+        self._lock = threading.Lock()
+
+    def plantilla(self, nombre: str) -> PlantillaEmail:
+        if settings.DEBUG:
+            return PlantillaEmail(nombre)
+
+        plantilla = self._plantillas.get(nombre)
+        if plantilla is None:
+            with self._lock:
+                plantilla = self._plantillas.get(nombre)
+                if plantilla is None:
+                    plantilla = self._plantillas[nombre] = PlantillaEmail(nombre)
+        return plantilla
+
+    def renderizar(self, nombre: str, contexto: dict):
+        """
+        Renderiza un email con sus plantillas compiladas
+
+        Args:
+            nombre: Nombre del email en templates/emails (sin extensión)
+            contexto: Contexto de las plantillas
+
+        Returns:
+            tuple: (texto plano, HTML)
+        """
+        return self.plantilla(nombre).renderizar(contexto)
+
+    def limpiar(self):
+        """Descarta las plantillas compiladas (se recompilan en el siguiente email)"""
+        with self._lock:
+            self._plantillas.clear()
+
+
+renderizador_emails = RenderizadorEmails()
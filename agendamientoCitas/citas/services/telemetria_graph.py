@@ -0,0 +1,203 @@
+# citas/services/telemetria_graph.py
+
+"""
+Telemetría de las llamadas a Microsoft Graph
+
+Cada petición HTTP a Graph deja una fila compacta en LlamadaGraph (operación, status,
+latencia, número de reintento y si Graph la limitó). Las filas se acumulan en memoria
+por proceso y se escriben con un solo bulk_create cuando se juntan
+TEAMS_TELEMETRIA_LOTE o pasan TEAMS_TELEMETRIA_INTERVALO_SEGUNDOS, así que el camino
+de agendamiento no paga un INSERT por llamada.
+
+El buffer no se escribe dentro de una transacción (un rollback borraría la telemetría)
+ni desde un event loop (el ORM es síncrono): en esos casos las filas esperan a la
+siguiente llamada, a aclose() del servicio o al fin del proceso.
+"""
+
+import asyncio
+import atexit
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Filas máximas en memoria por proceso: si no se pueden escribir, se descartan las más antiguas
+MAX_PENDIENTES = 5000
+
+
+def percentil(valores_ordenados, p):
+    """Percentil por rango más cercano (valores ya ordenados)"""
+    if not valores_ordenados:
+        return 0.0
+    indice = max(0, math.ceil(p / 100 * len(valores_ordenados)) - 1)
+    return valores_ordenados[indice]
+
+
+def clasificar_operacion(metodo: str, url: str) -> str:
+    """
+    Operación de Graph a partir del método y la URL de la petición
+
+    Returns:
+        str: Uno de LlamadaGraph.OPERACION_CHOICES
+    """
+    ruta = url.split('?', 1)[0]
+    if ruta.endswith('/$batch'):
+        return 'batch'
+    if '/calendarView/delta' in ruta:
+        return 'delta'
+    if '/calendar/events' in ruta:
+        return {'POST': 'crear', 'PATCH': 'actualizar', 'DELETE': 'eliminar'}.get(metodo.upper(), 'otra')
+    if metodo.upper() == 'GET' and '/users/' in ruta:
+        return 'usuario'
+    return 'otra'
+
+
+def _en_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class BufferTelemetria:
+    """Buffer de filas de LlamadaGraph del proceso (seguro entre hilos)"""
+
+    def __init__(self):
+        self._pendientes = deque(maxlen=MAX_PENDIENTES)
+        self._lock = threading.Lock()
+        self._ultimo_vaciado = time.monotonic()
+        self._pid = os.getpid()
+
+    def registrar(self, metodo: str, url: str, status: int, latencia_ms: float,
+                  reintento: int = 0, limitada: bool = None):
+        """
+        Agrega una llamada al buffer y lo escribe si está lleno o es antiguo
+
+        Args:
+            metodo: Método HTTP
+            url: URL de la petición
+            status: Código HTTP (0 si no hubo respuesta)
+            latencia_ms: Duración de la petición
+            reintento: Número de reintento (0 = primer intento)
+            limitada: Si Graph limitó la llamada (default: status 429)
+        """
+        if not settings.TEAMS_TELEMETRIA_ACTIVA:
+            return
+
+        fila = {
+            'fecha': timezone.now(),
+            'operacion': clasificar_operacion(metodo, url),
+            'status': status,
+            'latencia_ms': max(0, round(latencia_ms)),
+            'reintento': reintento,
+            'limitada': status == 429 if limitada is None else limitada,
+        }
+
+        with self._lock:
+            if self._pid != os.getpid():
+                # Proceso bifurcado: las filas heredadas las escribe el proceso padre
+                self._pendientes.clear()
+                self._pid = os.getpid()
+            self._pendientes.append(fila)
+            vaciar = (
+                len(self._pendientes) >= settings.TEAMS_TELEMETRIA_LOTE
+                or time.monotonic() - self._ultimo_vaciado >= settings.TEAMS_TELEMETRIA_INTERVALO_SEGUNDOS
+            )
+
+        if vaciar:
+            self.vaciar()
+
+    def vaciar(self) -> int:
+        """
+        Escribe las filas pendientes con un solo bulk_create
+
+        Returns:
+            int: Filas escritas (0 si no se pudo escribir en este momento)
+        """
+        if _en_event_loop() or connection.in_atomic_block:
+            return 0
+
+        with self._lock:
+            if self._pid != os.getpid():
+                return 0
+            filas = list(self._pendientes)
+            self._pendientes.clear()
+            self._ultimo_vaciado = time.monotonic()
+
+        if not filas:
+            return 0
+
+        from citas.models import LlamadaGraph
+
+        try:
+            LlamadaGraph.objects.bulk_create([LlamadaGraph(**fila) for fila in filas])
+        except Exception as e:
+            logger.warning(f"[WARN] No se pudo guardar la telemetría de Graph ({len(filas)} llamadas): {str(e)}")
+            return 0
+
+        return len(filas)
+
+
+telemetria = BufferTelemetria()
+
+
+@atexit.register
+def _vaciar_al_salir():
+    try:
+        telemetria.vaciar()
+    except Exception:
+        pass
+
+
+def resumen_por_hora(horas: int) -> dict:
+    """
+    Latencia p95, tasa de error y tasa de limitación (429) por hora
+
+    Se consideran errores las llamadas sin respuesta y las respuestas 4xx/5xx distintas
+    de 429 (las limitadas se cuentan aparte).
+
+    Args:
+        horas: Horas hacia atrás (incluida la hora en curso)
+
+    Returns:
+        dict: {'horas': [filas por hora, la más reciente primero], 'total': fila de todo el período}
+    """
+    from django.db.models.functions import TruncHour
+
+    from citas.models import LlamadaGraph
+
+    desde = timezone.localtime().replace(minute=0, second=0, microsecond=0) - timedelta(hours=horas - 1)
+    llamadas = (
+        LlamadaGraph.objects.filter(fecha__gte=desde)
+        .annotate(hora=TruncHour('fecha'))
+        .values_list('hora', 'latencia_ms', 'status', 'limitada')
+    )
+
+    grupos = {}
+    for hora, latencia_ms, status, limitada in llamadas.iterator():
+        grupos.setdefault(hora, []).append((latencia_ms, status, limitada))
+
+    def resumir(valores):
+        latencias = sorted(latencia for latencia, _, _ in valores)
+        errores = sum(1 for _, status, _ in valores if status == 0 or (status >= 400 and status != 429))
+        limitadas = sum(1 for _, _, limitada in valores if limitada)
+        return {
+            'llamadas': len(valores),
+            'p95_ms': percentil(latencias, 95),
+            'tasa_error': 100 * errores / len(valores),
+            'tasa_limitada': 100 * limitadas / len(valores),
+        }
+
+    filas = [dict(resumir(valores), hora=hora) for hora, valores in sorted(grupos.items(), reverse=True)]
+    todas = [valor for valores in grupos.values() for valor in valores]
+    return {'horas': filas, 'total': resumir(todas) if todas else None}
@@ -1,106 +1,210 @@
 # citas/signals.py
 
 import logging
-from django.db.models.signals import post_save, pre_delete, pre_save
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
 from .models import Cita
-from .utils import (
-    crear_reunion_teams_automatica,
-    eliminar_reunion_teams_automatica,
-    actualizar_reunion_teams_automatica
-)
+from .utils import asignar_reunion_preaprovisionada, registrar_operacion_teams
 
 logger = logging.getLogger(__name__)
 
+# Efectos de Teams suspendidos en el contexto actual (ver suspender_efectos_teams):
+# None si no hay suspensión; si se difieren, {'citas': {id: {efectos}}, 'eliminadas': [(event_id, organizador)]}
+_suspension = ContextVar('suspension_efectos_teams', default=None)
 
-@receiver(post_save, sender=Cita)
-def crear_teams_al_confirmar(sender, instance, created, **kwargs):
+# Campos cuyo cambio puede requerir una operación de Teams: un save que no toca
+# ninguno (ej: guardar los datos de la reunión creada) no despacha nada
+CAMPOS_TRANSICION = {'estado', 'fecha', 'hora_inicio'}
+
+
+def _al_agendar(cita):
     """
-    Signal: Crea reunión de Teams automáticamente cuando se confirma/agenda una cita
+    Registra la reunión de Teams de una cita que pasa a agendada
+    Si el pool tiene una reunión para el horario, la cita la toma de inmediato y solo
+    se encola su personalización; si no, la reunión la crea un worker de Celery
+    después del commit (outbox)
     """
-    # Cambiar 'CONFIRMADA' por 'agendada' según tu modelo
-    if instance.estado == 'agendada' and not instance.tiene_enlace_teams():
-        logger.info(f"[SIGNAL] Cita #{instance.id} agendada, creando Teams automáticamente")
-        
-        try:
-            url_teams = crear_reunion_teams_automatica(instance)
-            
-            if url_teams:
-                logger.info(f"[SIGNAL] Teams creado exitosamente para cita #{instance.id}")
-            else:
-                logger.error(f"[SIGNAL] Falló creación de Teams para cita #{instance.id}")
-                
-        except Exception as e:
-            logger.error(f"[SIGNAL] Excepción en crear_teams: {str(e)}")
+    if cita.tiene_enlace_teams():
+        return
+    
+    if asignar_reunion_preaprovisionada(cita):
+        logger.info(f"[SIGNAL] Cita #{cita.id} agendada con reunión del pool, encolando personalización")
+        registrar_operacion_teams(cita, 'personalizar')
+    else:
+        logger.info(f"[SIGNAL] Cita #{cita.id} agendada, encolando creación de Teams")
+        registrar_operacion_teams(cita, 'crear')
 
 
-@receiver(pre_delete, sender=Cita)
-def eliminar_teams_al_borrar(sender, instance, **kwargs):
+def _al_cancelar(cita):
+    """Registra la eliminación de la reunión de Teams de una cita cancelada"""
+    if cita.puede_eliminar_teams():
+        logger.info(f"[SIGNAL] Cita #{cita.id} cancelada, encolando borrado de Teams")
+        registrar_operacion_teams(cita, 'eliminar')
+
+
+def _al_reprogramar(cita):
+    """Registra la actualización de Teams de una cita agendada que cambió de fecha/hora"""
+    if cita.tiene_enlace_teams():
+        logger.info(f"[SIGNAL] Cambio de fecha/hora en cita #{cita.id}, encolando actualización de Teams")
+        registrar_operacion_teams(cita, 'actualizar')
+
+
+# Efectos al llegar a cada estado (desde cualquier otro o al crear la cita)
+EFECTOS_POR_ESTADO = {
+    'agendada': _al_agendar,
+    'cancelada': _al_cancelar,
+}
+
+
+@contextmanager
+def suspender_efectos_teams(diferir: bool = False):
     """
-    Signal: Elimina reunión de Teams cuando se borra una cita
+    Suspende los efectos de Teams de los signals de Cita dentro del bloque
+    Para migraciones de datos, scripts y cargas masivas: los saves y deletes de citas
+    no tocan el pool, el outbox ni Graph, así que el bloque corre a velocidad de BD.
+    
+    Con diferir=True se anotan las transiciones y, al salir del bloque sin error, se
+    registran las operaciones que aún correspondan según el estado final de las citas,
+    en un solo INSERT al outbox. Si hay bloques anidados, manda el más externo.
+    
+        with suspender_efectos_teams(diferir=True):
+            for cita in citas:
+                cita.hora_inicio = nueva_hora
+                cita.save()
+    
+    Args:
+        diferir: Registrar al final las operaciones pendientes (si no, se descartan)
     """
-    if instance.puede_eliminar_teams():
-        logger.info(f"[SIGNAL] Cita #{instance.id} eliminada, borrando Teams")
-        
-        try:
-            eliminado = eliminar_reunion_teams_automatica(instance)
-            
-            if eliminado:
-                logger.info(f"[SIGNAL] Teams eliminado para cita #{instance.id}")
-            else:
-                logger.warning(f"[SIGNAL] No se pudo eliminar Teams de cita #{instance.id}")
-                
-        except Exception as e:
-            logger.error(f"[SIGNAL] Excepción en eliminar_teams: {str(e)}")
+    if _suspension.get() is not None:
+        yield
+        return
+    
+    pendientes = {'citas': {}, 'eliminadas': []} if diferir else {}
+    token = _suspension.set(pendientes)
+    try:
+        yield
+    finally:
+        _suspension.reset(token)
+    
+    if diferir:
+        _registrar_efectos_diferidos(pendientes)
 
 
-@receiver(post_save, sender=Cita)
-def eliminar_teams_si_cancela(sender, instance, **kwargs):
+def _operaciones_al_agendar(citas):
     """
-    Signal: Elimina Teams si la cita cambia a cancelada
+    Operaciones de las citas que pasaron a agendada en un bloque diferido
+    Igual que _al_agendar: cada cita toma primero una reunión del pool de su horario
+    (solo se intenta en los horarios con reuniones disponibles, leídos en una consulta)
+    y si no hay, se registra la creación.
+    
+    Args:
+        citas: Citas agendadas sin enlace de Teams
+    
+    Returns:
+        list: OperacionTeams sin guardar ('personalizar' o 'crear')
     """
-    if instance.estado == 'cancelada' and instance.puede_eliminar_teams():
-        logger.info(f"[SIGNAL] Cita #{instance.id} cancelada, eliminando Teams")
-        
-        try:
-            eliminar_reunion_teams_automatica(instance)
-        except Exception as e:
-            logger.error(f"[SIGNAL] Error eliminando Teams cancelado: {str(e)}")
-
-
-# OPCIONAL: Actualizar Teams si cambia fecha/hora
-@receiver(pre_save, sender=Cita)
-def detectar_cambio_fecha(sender, instance, **kwargs):
+    from .models import OperacionTeams, ReunionPreaprovisionada
+    
+    if not citas:
+        return []
+    
+    horarios_pool = set(
+        ReunionPreaprovisionada.objects.filter(
+            estado='disponible',
+            fecha__in={cita.fecha for cita in citas},
+        ).values_list('fecha', 'hora_inicio')
+    )
+    
+    operaciones = []
+    for cita in citas:
+        if (cita.fecha, cita.hora_inicio) in horarios_pool and asignar_reunion_preaprovisionada(cita):
+            operaciones.append(OperacionTeams(cita=cita, tipo='personalizar'))
+        else:
+            operaciones.append(OperacionTeams(cita=cita, tipo='crear'))
+    return operaciones
+
+
+def _registrar_efectos_diferidos(pendientes):
+    """Registra en el outbox las operaciones anotadas por suspender_efectos_teams(diferir=True)"""
+    from .models import OperacionTeams
+    from .utils import _registrar_operaciones_teams
+    
+    operaciones = [
+        OperacionTeams(cita=None, tipo='eliminar', teams_event_id=event_id, teams_organizador=organizador)
+        for event_id, organizador in pendientes['eliminadas']
+    ]
+    
+    agendadas = []
+    ids = list(pendientes['citas'])
+    for i in range(0, len(ids), 1000):
+        for cita in Cita.objects.filter(pk__in=ids[i:i + 1000]):
+            efectos = pendientes['citas'][cita.pk]
+            if cita.estado == 'agendada' and 'agendada' in efectos and not cita.tiene_enlace_teams():
+                agendadas.append(cita)
+            elif cita.estado == 'agendada' and 'reprogramada' in efectos and cita.tiene_enlace_teams():
+                operaciones.append(OperacionTeams(cita=cita, tipo='actualizar', teams_event_id=cita.teams_event_id))
+            elif cita.estado == 'cancelada' and 'cancelada' in efectos and cita.puede_eliminar_teams():
+                operaciones.append(OperacionTeams(
+                    cita=cita,
+                    tipo='eliminar',
+                    teams_event_id=cita.teams_event_id,
+                    teams_organizador=cita.teams_organizador,
+                ))
+    
+    operaciones.extend(_operaciones_al_agendar(agendadas))
+    registradas = _registrar_operaciones_teams(operaciones)
+    logger.info(
+        f"[SIGNAL] Efectos de Teams diferidos: {registradas} operaciones registradas "
+        f"({len(ids)} citas, {len(pendientes['eliminadas'])} eliminadas)"
+    )
+
+
+@receiver(post_save, sender=Cita)
+def despachar_transicion_cita(sender, instance, created, update_fields=None, **kwargs):
     """
-    Detecta si cambió la fecha/hora para actualizar Teams
+    Signal: Calcula una vez la transición de la cita y ejecuta los efectos que requiere
+        nueva o X → agendada: reunión de Teams (del pool o encolada)
+        X → cancelada: eliminar la reunión
+        agendada → agendada con otra fecha/hora: actualizar la reunión
+    Los cambios se leen de los valores que la cita recuerda de la BD (sin otro SELECT).
     """
-    if instance.pk:  # Solo si ya existe
-        try:
-            cita_anterior = Cita.objects.get(pk=instance.pk)
-            
-            # Verificar si cambió fecha u hora
-            fecha_cambio = cita_anterior.fecha != instance.fecha
-            hora_cambio = cita_anterior.hora_inicio != instance.hora_inicio
-            
-            if (fecha_cambio or hora_cambio) and instance.tiene_enlace_teams():
-                # Marcar para actualizar después del save
-                instance._actualizar_teams = True
-                logger.info(f"[SIGNAL] Detectado cambio de fecha/hora en cita #{instance.id}")
-                
-        except Cita.DoesNotExist:
-            pass
+    if update_fields is not None and not CAMPOS_TRANSICION.intersection(update_fields):
+        return
+    
+    anterior, actual = instance.transicion(created)
+    
+    if anterior != actual:
+        efecto = EFECTOS_POR_ESTADO.get(actual)
+        nombre = actual
+    elif actual == 'agendada' and instance.campo_modificado('fecha', 'hora_inicio'):
+        efecto = _al_reprogramar
+        nombre = 'reprogramada'
+    else:
+        return
+    
+    pendientes = _suspension.get()
+    if pendientes is not None:
+        if pendientes:
+            pendientes['citas'].setdefault(instance.pk, set()).add(nombre)
+        return
+    
+    if efecto:
+        efecto(instance)
 
 
-@receiver(post_save, sender=Cita)
-def actualizar_teams_si_cambio_fecha(sender, instance, **kwargs):
+@receiver(pre_delete, sender=Cita)
+def eliminar_teams_al_borrar(sender, instance, **kwargs):
     """
-    Actualiza Teams si se detectó cambio de fecha/hora
+    Signal: Registra la eliminación de la reunión de Teams cuando se borra una cita
     """
-    if hasattr(instance, '_actualizar_teams') and instance._actualizar_teams:
-        logger.info(f"[SIGNAL] Actualizando Teams por cambio de fecha en cita #{instance.id}")
-        
-        try:
-            actualizar_reunion_teams_automatica(instance)
-            delattr(instance, '_actualizar_teams')
-        except Exception as e:
-            logger.error(f"[SIGNAL] Error actualizando Teams: {str(e)}")
\ No newline at end of file
+    pendientes = _suspension.get()
+    if pendientes is not None:
+        if pendientes and instance.puede_eliminar_teams():
+            pendientes['eliminadas'].append((instance.teams_event_id, instance.teams_organizador))
+        return
+    
+    if instance.puede_eliminar_teams():
+        logger.info(f"[SIGNAL] Cita #{instance.id} eliminada, encolando borrado de Teams")
+        registrar_operacion_teams(instance, 'eliminar', eliminada=True)
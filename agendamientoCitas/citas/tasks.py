@@ -1,6 +1,10 @@
+from datetime import timedelta
+
 from celery import shared_task
 from django.core.mail import send_mail
 from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 
@@ -134,3 +138,167 @@ Enlace de la reunión: {cita.url_teams if cita.url_teams else 'Por confirmar'}
         return f'Cita con ID {cita_id} no encontrada o ya no está agendada'
     except Exception as e:
         return f'Error al enviar recordatorio: {str(e)}'
+
+
+@shared_task
+def refrescar_token_teams():
+    """
+    Tarea periódica para renovar el token de Microsoft Graph antes de que expire
+    """
+    from .services.microsoft_teams_service import teams_service
+    
+    if teams_service.refrescar_token():
+        return 'Token de Teams vigente'
+    return 'No se pudo refrescar el token de Teams'
+
+
+@shared_task(acks_late=True)
+def procesar_operacion_teams(operacion_id):
+    """
+    Tarea para ejecutar una operación del outbox de Teams (crear/actualizar/eliminar reunión)
+    """
+    from .models import OperacionTeams
+    from .utils import ejecutar_operacion_teams
+    
+    ahora = timezone.now()
+    
+    # Reservar la operación con un UPDATE condicional: si la tarea llega dos veces
+    # (on_commit + barrido periódico), solo un worker la ejecuta. Si el worker muere,
+    # la reserva vence y el barrido la vuelve a encolar.
+    reservada = OperacionTeams.objects.filter(
+        pk=operacion_id,
+        estado__in=['pendiente', 'procesando'],
+        proximo_intento__lte=ahora,
+    ).update(
+        estado='procesando',
+        proximo_intento=ahora + timedelta(seconds=settings.TEAMS_OUTBOX_RESERVA_SEGUNDOS),
+        intentos=F('intentos') + 1,
+    )
+    if not reservada:
+        return f'Operación {operacion_id} no disponible'
+    
+    operacion = OperacionTeams.objects.select_related(
+        'cita', 'cita__solicitante', 'cita__usuario'
+    ).get(pk=operacion_id)
+    
+    try:
+        completada = ejecutar_operacion_teams(operacion)
+        error = '' if completada else 'La operación no se completó (ver log)'
+    except Exception as e:
+        completada = False
+        error = str(e)
+    
+    if completada:
+        operacion.estado = 'completada'
+        operacion.fecha_procesada = timezone.now()
+    elif operacion.intentos >= settings.TEAMS_OUTBOX_MAX_INTENTOS:
+        operacion.estado = 'fallida'
+    else:
+        # Backoff exponencial: el barrido periódico la retoma cuando vence la espera.
+        # Cerca del plazo (la reunión está por empezar) se reintenta sin esperar de más
+        operacion.estado = 'pendiente'
+        espera = settings.TEAMS_OUTBOX_BACKOFF_SEGUNDOS * 2 ** (operacion.intentos - 1)
+        if operacion.plazo and operacion.plazo - timezone.now() < timedelta(minutes=settings.TEAMS_OUTBOX_ESCALAR_MINUTOS):
+            espera = settings.TEAMS_OUTBOX_BACKOFF_SEGUNDOS
+        operacion.proximo_intento = timezone.now() + timedelta(seconds=espera)
+    
+    operacion.ultimo_error = error
+    operacion.save(update_fields=['estado', 'proximo_intento', 'ultimo_error', 'fecha_procesada'])
+    
+    return f'Operación {operacion_id}: {operacion.estado}'
+
+
+@shared_task
+def procesar_outbox_teams():
+    """
+    Tarea periódica que encola las operaciones de Teams pendientes: reintentos,
+    operaciones cuyo encolado tras el commit falló y reservas vencidas de workers caídos
+    
+    Toma primero las de plazo más cercano y las encola con la prioridad que les
+    corresponde ahora: si hay atraso, las reuniones que están por empezar se adelantan
+    a las que se encolaron antes con menor prioridad.
+    """
+    from .models import OperacionTeams
+    from .utils import encolar_operaciones_teams
+    
+    operaciones = list(
+        OperacionTeams.objects.filter(
+            estado__in=['pendiente', 'procesando'],
+            proximo_intento__lte=timezone.now(),
+        ).order_by(
+            F('plazo').asc(nulls_last=True), 'proximo_intento'
+        ).values_list('pk', 'plazo')[:settings.TEAMS_OUTBOX_LOTE]
+    )
+    
+    encolar_operaciones_teams(operaciones)
+    
+    return f'{len(operaciones)} operaciones de Teams encoladas'
+
+
+@shared_task
+def reconciliar_calendario_teams():
+    """
+    Tarea periódica que reconcilia el calendario de Teams con las citas (consulta delta)
+    """
+    from .utils import reconciliar_calendario_teams as reconciliar
+    
+    resumen = reconciliar()
+    if resumen is None:
+        return 'Reconciliación de Teams no completada (ver log)'
+    return f"Reconciliación de Teams: {resumen['eventos']} cambios procesados"
+
+
+@shared_task
+def llenar_pool_reuniones_teams():
+    """
+    Tarea periódica (horas valle) que crea las reuniones preaprovisionadas de los
+    próximos horarios agendables y descarta las vencidas
+    """
+    from .utils import llenar_pool_reuniones_teams as llenar_pool
+    
+    resumen = llenar_pool()
+    return (
+        f"Pool de Teams: {resumen['creadas']} creadas, {resumen['descartadas']} descartadas, "
+        f"{resumen['fallidas']} fallidas"
+    )
+
+
+@shared_task
+def limpiar_telemetria_graph():
+    """
+    Tarea diaria que borra la telemetría de Graph anterior a TEAMS_TELEMETRIA_DIAS
+    """
+    from .models import LlamadaGraph
+    
+    limite = timezone.now() - timedelta(days=settings.TEAMS_TELEMETRIA_DIAS)
+    borradas, _ = LlamadaGraph.objects.filter(fecha__lt=limite).delete()
+    return f'{borradas} llamadas a Graph borradas'
+
+
+@shared_task
+def procesar_outbox_email():
+    """
+    Tarea que envía los emails pendientes del outbox con una sola conexión SMTP
+    Se encola tras registrar cada email y periódicamente (reintentos, encolados
+    fallidos y reservas vencidas de workers caídos).
+    """
+    from .email_utils import enviar_emails_pendientes
+    
+    resumen = enviar_emails_pendientes()
+    return (
+        f"Outbox de emails: {resumen['enviados']} enviados, {resumen['reintentos']} reprogramados, "
+        f"{resumen['fallidos']} fallidos"
+    )
+
+
+@shared_task
+def limpiar_outbox_email():
+    """
+    Tarea diaria que borra los emails enviados hace más de EMAIL_OUTBOX_DIAS
+    (los fallidos se conservan para revisarlos en el admin)
+    """
+    from .models import EmailSaliente
+    
+    limite = timezone.now() - timedelta(days=settings.EMAIL_OUTBOX_DIAS)
+    borrados, _ = EmailSaliente.objects.filter(estado='enviado', fecha_envio__lt=limite).delete()
+    return f'{borrados} emails enviados borrados'
@@ -10,7 +10,7 @@ urlpatterns = [
     path('agendar/confirmacion/', views.agendar_confirmacion_view, name='agendar_confirmacion'),
     path('consultar/', views.consultar_cita_view, name='consultar_cita'),
     path('cancelar/', views.buscar_cita_cancelar_view, name='cancelar_cita_buscar'),
-    path('cancelar/<int:cita_id>/', views.confirmar_cancelar_cita_view, name='cancelar_cita'),
+    path('cancelar/<str:token>/', views.confirmar_cancelar_cita_view, name='cancelar_cita'),
     
     # Rutas para asesores (con autenticación)
     path('mis-citas/', views.mis_citas_view, name='mis_citas'),
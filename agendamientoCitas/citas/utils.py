@@ -1,23 +1,219 @@
 # citas/utils.py
 
 import logging
-from datetime import datetime
+import uuid
+from datetime import datetime, timedelta
 from typing import Optional
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 
+from citas.email_utils import registrar_email
+from citas.services.render_email import renderizador_emails
+
 logger = logging.getLogger(__name__)
 
 
-def crear_reunion_teams_automatica(cita) -> Optional[str]:
+CAMPOS_REUNION_TEAMS = ['teams_event_id', 'teams_organizador', 'url_teams', 'teams_creado_en']
+
+# Espacio de nombres de los transactionId de Graph (UUID5 estables entre procesos y despliegues)
+NAMESPACE_TRANSACCIONES_TEAMS = uuid.uuid5(uuid.NAMESPACE_URL, 'atenea:citas:teams')
+
+# Asunto de las reuniones que crea el sistema: identifica sus eventos en el calendario del organizador
+PREFIJO_ASUNTO_REUNION = 'Cita ATENEA'
+
+
+def transaction_id_reunion(cita, operacion_id: Optional[int] = None) -> str:
+    """
+    transactionId determinístico para crear la reunión de una cita
+    Los reintentos de una misma creación envían el mismo valor y Graph no duplica el
+    evento. Incluye la operación del outbox: si la reunión se recrea (ej: la borraron
+    en Outlook), la nueva operación genera un evento nuevo.
+    
+    Args:
+        cita: Cita de la reunión
+        operacion_id: OperacionTeams que ejecuta la creación, si la hay
+    
+    Returns:
+        str: UUID (versión 5) como texto
+    """
+    clave = f"cita:{cita.pk}:{cita.fecha.isoformat()}:{cita.hora_inicio.strftime('%H:%M')}:{operacion_id or ''}"
+    return str(uuid.uuid5(NAMESPACE_TRANSACCIONES_TEAMS, clave))
+
+
+def _datos_reunion(cita, organizador: Optional[str] = None, operacion_id: Optional[int] = None) -> dict:
+    """
+    Arma los datos de la reunión de Teams de una cita (asunto, inicio, descripción, asistentes)
+    
+    Args:
+        cita: Cita de la reunión
+        organizador: Buzón donde se crea el evento (ver _organizador_cita)
+        operacion_id: OperacionTeams que ejecuta la creación, si la hay
+    
+    Returns:
+        dict: Argumentos para teams_service.crear_reunion_teams
+    """
+    # Obtener datos usando métodos del modelo
+    nombre_solicitante = cita.get_nombre_solicitante() if hasattr(cita, 'get_nombre_solicitante') else str(cita.solicitante)
+    email_solicitante = cita.get_email_solicitante() if hasattr(cita, 'get_email_solicitante') else cita.solicitante.email
+    
+    # Preparar datos
+    asunto = f"{PREFIJO_ASUNTO_REUNION} - {nombre_solicitante}"
+    
+    # Combinar fecha y hora
+    fecha_inicio = datetime.combine(cita.fecha, cita.hora_inicio)
+    
+    # Hacer timezone-aware si es necesario
+    if timezone.is_naive(fecha_inicio):
+        fecha_inicio = timezone.make_aware(fecha_inicio)
+    
+    # Obtener tipo de documento y número
+    try:
+        tipo_doc = cita.get_tipo_documento_display() if hasattr(cita, 'get_tipo_documento_display') else cita.tipo_documento
+        numero_doc = cita.numero_documento if hasattr(cita, 'numero_documento') else 'N/A'
+    except:
+        tipo_doc = 'Documento'
+        numero_doc = 'N/A'
+    
+    # Obtener tipo de atención
+    try:
+        tipo_atencion = cita.get_tipo_atencion_display() if hasattr(cita, 'get_tipo_atencion_display') else cita.tipo_atencion
+    except:
+        tipo_atencion = 'Virtual'
+    
+    # Obtener motivo
+    try:
+        motivo = cita.motivo if hasattr(cita, 'motivo') else cita.get_motivo() if hasattr(cita, 'get_motivo') else 'Consulta general'
+    except:
+        motivo = 'Consulta general'
+    
+    # Descripción HTML
+    descripcion = f"""
+    <div style="font-family: Arial, sans-serif;">
+        <h2 style="color: #5b47d6;">Cita de Atención ATENEA</h2>
+        <table style="border-collapse: collapse; width: 100%;">
+            <tr>
+                <td style="padding: 8px; border: 1px solid #ddd;"><strong>Solicitante:</strong></td>
+                <td style="padding: 8px; border: 1px solid #ddd;">{nombre_solicitante}</td>
+            </tr>
+            <tr>
+                <td style="padding: 8px; border: 1px solid #ddd;"><strong>Email:</strong></td>
+                <td style="padding: 8px; border: 1px solid #ddd;">{email_solicitante}</td>
+            </tr>
+            <tr>
+                <td style="padding: 8px; border: 1px solid #ddd;"><strong>Documento:</strong></td>
+                <td style="padding: 8px; border: 1px solid #ddd;">{tipo_doc} {numero_doc}</td>
+            </tr>
+            <tr>
+                <td style="padding: 8px; border: 1px solid #ddd;"><strong>Tipo de Atención:</strong></td>
+                <td style="padding: 8px; border: 1px solid #ddd;">{tipo_atencion}</td>
+            </tr>
+            <tr>
+                <td style="padding: 8px; border: 1px solid #ddd;"><strong>Motivo:</strong></td>
+                <td style="padding: 8px; border: 1px solid #ddd;">{motivo}</td>
+            </tr>
+        </table>
+    </div>
+    """
+    
+    # Asistentes
+    asistentes = [email_solicitante]
+    
+    # Duración
+    duracion = cita.duracion_minutos if hasattr(cita, 'duracion_minutos') else 30
+    
+    return {
+        'asunto': asunto,
+        'fecha_inicio': fecha_inicio,
+        'duracion_minutos': duracion,
+        'descripcion': descripcion,
+        'asistentes': asistentes,
+        'transaction_id': transaction_id_reunion(cita, operacion_id),
+        'organizador': organizador,
+    }
+
+
+def _organizador_cita(cita) -> str:
+    """
+    Buzón donde se crea la reunión de una cita sin operación del outbox
+    Graph solo deduplica el transactionId dentro de un mismo buzón: si un reintento
+    eligiera otro (ej: circuito abierto en el primero) y la primera petición sí llegó,
+    quedarían dos reuniones. Se elige una sola vez y se guarda en la cita antes del
+    primer POST; los reintentos lo reutilizan.
+    """
+    if not cita.teams_organizador:
+        from citas.models import Cita
+        from citas.services.microsoft_teams_service import teams_service
+        
+        cita.teams_organizador = teams_service.elegir_organizador(cita.pk)
+        # Sin signals: el buzón aún no tiene evento, no hay nada que sincronizar
+        Cita.objects.filter(pk=cita.pk).update(teams_organizador=cita.teams_organizador)
+        cita._recordar_valores(['teams_organizador'])
+    return cita.teams_organizador
+
+
+def _organizador_operacion(operacion) -> str:
+    """
+    Buzón donde una operación 'crear' del outbox crea la reunión
+    Se elige en la primera ejecución y se guarda en la operación antes del POST: los
+    reintentos envían el mismo transactionId al mismo buzón. Si su circuito está
+    abierto la operación espera su próximo intento, no cambia de buzón.
+    """
+    if not operacion.teams_organizador:
+        from citas.services.microsoft_teams_service import teams_service
+        
+        operacion.teams_organizador = teams_service.elegir_organizador(operacion.cita_id)
+        operacion.save(update_fields=['teams_organizador'])
+    return operacion.teams_organizador
+
+
+def _asignar_reunion(cita, reunion_info):
+    """Copia en la cita (sin guardar) los datos de la reunión creada"""
+    cita.teams_event_id = reunion_info.get('id')
+    cita.teams_organizador = reunion_info.get('organizador')
+    cita.url_teams = reunion_info.get('join_url')
+    cita.teams_creado_en = timezone.now()
+
+
+def _citas_sin_reunion():
+    """Citas que siguen esperando su reunión: agendadas y sin evento de Teams"""
+    from citas.models import Cita
+    
+    return Cita.objects.filter(estado='agendada').filter(Q(teams_event_id__isnull=True) | Q(teams_event_id=''))
+
+
+def _descartar_reuniones_creadas(reuniones):
+    """
+    Registra en el outbox la eliminación de reuniones recién creadas que ya no tienen cita
+    (se canceló o recibió otra reunión mientras Graph respondía)
+    
+    Args:
+        reuniones: Lista de (event_id, organizador)
+    """
+    from citas.models import OperacionTeams
+    
+    with transaction.atomic():
+        _registrar_operaciones_teams([
+            OperacionTeams(cita=None, tipo='eliminar', teams_event_id=event_id, teams_organizador=organizador)
+            for event_id, organizador in reuniones
+        ])
+
+
+def crear_reunion_teams_automatica(
+    cita,
+    operacion_id: Optional[int] = None,
+    organizador: Optional[str] = None
+) -> Optional[str]:
     """
     Crea una reunión de Teams automáticamente para una cita
     
     Args:
         cita: Objeto Cita confirmada
+        operacion_id: OperacionTeams que ejecuta la creación (define el transactionId)
+        organizador: Buzón fijado por la operación (default: el guardado en la cita)
     
     Returns:
         URL de la reunión o None si falla
@@ -27,90 +223,23 @@ def crear_reunion_teams_automatica(cita) -> Optional[str]:
     try:
         from citas.services.microsoft_teams_service import teams_service
         
-        # Obtener datos usando métodos del modelo
-        nombre_solicitante = cita.get_nombre_solicitante() if hasattr(cita, 'get_nombre_solicitante') else str(cita.solicitante)
-        email_solicitante = cita.get_email_solicitante() if hasattr(cita, 'get_email_solicitante') else cita.solicitante.email
-        
-        # Preparar datos
-        asunto = f"Cita ATENEA - {nombre_solicitante}"
-        
-        # Combinar fecha y hora
-        fecha_inicio = datetime.combine(cita.fecha, cita.hora_inicio)
-        
-        # Hacer timezone-aware si es necesario
-        if timezone.is_naive(fecha_inicio):
-            fecha_inicio = timezone.make_aware(fecha_inicio)
-        
-        # Obtener tipo de documento y número
-        try:
-            tipo_doc = cita.get_tipo_documento_display() if hasattr(cita, 'get_tipo_documento_display') else cita.tipo_documento
-            numero_doc = cita.numero_documento if hasattr(cita, 'numero_documento') else 'N/A'
-        except:
-            tipo_doc = 'Documento'
-            numero_doc = 'N/A'
-        
-        # Obtener tipo de atención
-        try:
-            tipo_atencion = cita.get_tipo_atencion_display() if hasattr(cita, 'get_tipo_atencion_display') else cita.tipo_atencion
-        except:
-            tipo_atencion = 'Virtual'
-        
-        # Obtener motivo
-        try:
-            motivo = cita.motivo if hasattr(cita, 'motivo') else cita.get_motivo() if hasattr(cita, 'get_motivo') else 'Consulta general'
-        except:
-            motivo = 'Consulta general'
-        
-        # Descripción HTML
-        descripcion = f"""
-        <div style="font-family: Arial, sans-serif;">
-            <h2 style="color: #5b47d6;">Cita de Atención ATENEA</h2>
-            <table style="border-collapse: collapse; width: 100%;">
-                <tr>
-                    <td style="padding: 8px; border: 1px solid #ddd;"><strong>Solicitante:</strong></td>
-                    <td style="padding: 8px; border: 1px solid #ddd;">{nombre_solicitante}</td>
-                </tr>
-                <tr>
-                    <td style="padding: 8px; border: 1px solid #ddd;"><strong>Email:</strong></td>
-                    <td style="padding: 8px; border: 1px solid #ddd;">{email_solicitante}</td>
-                </tr>
-                <tr>
-                    <td style="padding: 8px; border: 1px solid #ddd;"><strong>Documento:</strong></td>
-                    <td style="padding: 8px; border: 1px solid #ddd;">{tipo_doc} {numero_doc}</td>
-                </tr>
-                <tr>
-                    <td style="padding: 8px; border: 1px solid #ddd;"><strong>Tipo de Atención:</strong></td>
-                    <td style="padding: 8px; border: 1px solid #ddd;">{tipo_atencion}</td>
-                </tr>
-                <tr>
-                    <td style="padding: 8px; border: 1px solid #ddd;"><strong>Motivo:</strong></td>
-                    <td style="padding: 8px; border: 1px solid #ddd;">{motivo}</td>
-                </tr>
-            </table>
-        </div>
-        """
-        
-        # Asistentes
-        asistentes = [email_solicitante]
-        
-        # Duración
-        duracion = cita.duracion_minutos if hasattr(cita, 'duracion_minutos') else 30
-        
         # Crear reunión
-        reunion_info = teams_service.crear_reunion_teams(
-            asunto=asunto,
-            fecha_inicio=fecha_inicio,
-            duracion_minutos=duracion,
-            descripcion=descripcion,
-            asistentes=asistentes
-        )
+        datos = _datos_reunion(cita, organizador or _organizador_cita(cita), operacion_id)
+        reunion_info = teams_service.crear_reunion_teams(**datos)
         
         if reunion_info and reunion_info.get('join_url'):
-            # Guardar en la cita
-            cita.teams_event_id = reunion_info.get('id')
-            cita.url_teams = reunion_info.get('join_url')
-            cita.teams_creado_en = timezone.now()
-            cita.save(update_fields=['teams_event_id', 'url_teams', 'teams_creado_en'])
+            # Guardar en la cita solo si sigue esperando la reunión (UPDATE condicional, sin
+            # signals): la cita pudo cancelarse mientras Graph respondía
+            _asignar_reunion(cita, reunion_info)
+            guardada = _citas_sin_reunion().filter(pk=cita.pk).update(
+                **{campo: getattr(cita, campo) for campo in CAMPOS_REUNION_TEAMS}
+            )
+            if not guardada:
+                logger.warning(f"[WARN] Cita #{cita.id} ya no espera la reunión: se elimina el evento creado")
+                _descartar_reuniones_creadas([(reunion_info['id'], reunion_info['organizador'])])
+                cita.refresh_from_db(fields=CAMPOS_REUNION_TEAMS)
+                return None
+            cita._recordar_valores(CAMPOS_REUNION_TEAMS)
             
             logger.info(f"[OK] Reunión Teams creada para cita #{cita.id}: {cita.url_teams}")
             
@@ -154,15 +283,14 @@ def eliminar_reunion_teams_automatica(cita) -> bool:
     try:
         from citas.services.microsoft_teams_service import teams_service
         
-        resultado = teams_service.eliminar_reunion_teams(cita.teams_event_id)
+        resultado = teams_service.eliminar_reunion_teams(cita.teams_event_id, cita.teams_organizador)
         
         if resultado:
             logger.info(f"[OK] Reunión Teams eliminada para cita #{cita.id}")
             # Limpiar campos
-            cita.teams_event_id = None
-            cita.url_teams = None
-            cita.teams_creado_en = None
-            cita.save(update_fields=['teams_event_id', 'url_teams', 'teams_creado_en'])
+            for campo in CAMPOS_REUNION_TEAMS:
+                setattr(cita, campo, None)
+            cita.save(update_fields=CAMPOS_REUNION_TEAMS)
         
         return resultado
         
@@ -171,6 +299,28 @@ def eliminar_reunion_teams_automatica(cita) -> bool:
         return False
 
 
+def _datos_actualizacion(cita) -> dict:
+    """
+    Arma los datos para actualizar la reunión de Teams de una cita
+    
+    Returns:
+        dict: Argumentos para teams_service.actualizar_reunion_teams
+    """
+    nombre_solicitante = cita.get_nombre_solicitante() if hasattr(cita, 'get_nombre_solicitante') else str(cita.solicitante)
+    fecha_inicio = datetime.combine(cita.fecha, cita.hora_inicio)
+    
+    if timezone.is_naive(fecha_inicio):
+        fecha_inicio = timezone.make_aware(fecha_inicio)
+    
+    return {
+        'event_id': cita.teams_event_id,
+        'organizador': cita.teams_organizador,
+        'asunto': f"{PREFIJO_ASUNTO_REUNION} - {nombre_solicitante}",
+        'fecha_inicio': fecha_inicio,
+        'duracion_minutos': cita.duracion_minutos if hasattr(cita, 'duracion_minutos') else 30,
+    }
+
+
 def actualizar_reunion_teams_automatica(cita) -> bool:
     """
     Actualiza una reunión de Teams si cambió la fecha/hora
@@ -189,39 +339,831 @@ def actualizar_reunion_teams_automatica(cita) -> bool:
     try:
         from citas.services.microsoft_teams_service import teams_service
         
-        nombre_solicitante = cita.get_nombre_solicitante() if hasattr(cita, 'get_nombre_solicitante') else str(cita.solicitante)
-        asunto = f"Cita ATENEA - {nombre_solicitante}"
-        fecha_inicio = datetime.combine(cita.fecha, cita.hora_inicio)
+        resultado = teams_service.actualizar_reunion_teams(**_datos_actualizacion(cita))
+        
+        if resultado:
+            logger.info(f"[OK] Reunión Teams actualizada para cita #{cita.id}")
+            # Enviar email de actualización
+            try:
+                enviar_email_teams_actualizado(cita)
+            except Exception as e:
+                logger.error(f"[ERROR] No se pudo enviar email de actualización: {str(e)}")
         
-        if timezone.is_naive(fecha_inicio):
-            fecha_inicio = timezone.make_aware(fecha_inicio)
+        return resultado
         
-        duracion = cita.duracion_minutos if hasattr(cita, 'duracion_minutos') else 30
+    except Exception as e:
+        logger.error(f"[ERROR] Error actualizando reunión: {str(e)}")
+        return False
+
+
+def personalizar_reunion_teams_automatica(cita) -> bool:
+    """
+    Completa la reunión tomada del pool con los datos de la cita (asunto, descripción
+    y asistentes) y envía el email con el enlace
+    
+    Args:
+        cita: Objeto Cita con la reunión preaprovisionada asignada
+    
+    Returns:
+        True si se actualizó exitosamente
+    """
+    logger.info(f"[TEAMS] Personalizando reunión del pool para cita #{cita.id}")
+    
+    try:
+        from citas.services.microsoft_teams_service import teams_service
         
+        datos = _datos_reunion(cita)
         resultado = teams_service.actualizar_reunion_teams(
             event_id=cita.teams_event_id,
-            asunto=asunto,
-            fecha_inicio=fecha_inicio,
-            duracion_minutos=duracion
+            organizador=cita.teams_organizador,
+            asunto=datos['asunto'],
+            descripcion=datos['descripcion'],
+            asistentes=datos['asistentes'],
         )
         
         if resultado:
-            logger.info(f"[OK] Reunión Teams actualizada para cita #{cita.id}")
-            # Enviar email de actualización
+            logger.info(f"[OK] Reunión del pool personalizada para cita #{cita.id}")
             try:
-                enviar_email_teams_actualizado(cita)
+                enviar_email_teams_creado(cita)
             except Exception as e:
-                logger.error(f"[ERROR] No se pudo enviar email de actualización: {str(e)}")
+                logger.error(f"[ERROR] No se pudo enviar email: {str(e)}")
         
         return resultado
         
     except Exception as e:
-        logger.error(f"[ERROR] Error actualizando reunión: {str(e)}")
+        logger.error(f"[ERROR] Error personalizando reunión: {str(e)}")
+        return False
+
+
+def plazo_operacion_teams(cita, tipo: str) -> Optional[datetime]:
+    """
+    Plazo de una operación del outbox: el inicio de la reunión de la cita
+    Eliminar una reunión no tiene plazo (libera el calendario, nadie la espera).
+    """
+    if cita is None or tipo == 'eliminar':
+        return None
+    inicio = _inicio_cita(cita)
+    return timezone.make_aware(inicio) if timezone.is_naive(inicio) else inicio
+
+
+def prioridad_operacion_teams(plazo: Optional[datetime]) -> int:
+    """
+    Prioridad de Celery de una operación según lo que falta para su plazo (0 = la más alta)
+    Se calcula al encolar: una operación que se vuelve a encolar cerca de su plazo sube
+    de prioridad.
+    """
+    if plazo is None:
+        return settings.TEAMS_OUTBOX_PRIORIDAD_BASE
+    
+    horas = (plazo - timezone.now()).total_seconds() / 3600
+    for limite, prioridad in settings.TEAMS_OUTBOX_PRIORIDADES:
+        if horas < limite:
+            return prioridad
+    return settings.TEAMS_OUTBOX_PRIORIDAD_BASE
+
+
+def encolar_operaciones_teams(operaciones):
+    """
+    Encola en Celery la ejecución de operaciones del outbox, con prioridad según su plazo
+    
+    Args:
+        operaciones: Iterable de (id de la operación, plazo)
+    """
+    from citas.tasks import procesar_operacion_teams
+    
+    for operacion_id, plazo in operaciones:
+        procesar_operacion_teams.apply_async((operacion_id,), priority=prioridad_operacion_teams(plazo))
+
+
+def registrar_operacion_teams(cita, tipo: str, eliminada: bool = False):
+    """
+    Registra una operación de Teams en el outbox y programa su ejecución en Celery
+    Debe llamarse dentro de la transacción que guarda la cita: si se revierte, la
+    operación tampoco existe. La tarea se encola solo después del commit.
+    
+    Args:
+        cita: Cita afectada
+        tipo: 'crear', 'actualizar' o 'eliminar'
+        eliminada: True si la cita se está borrando (solo se conserva el teams_event_id)
+    
+    Returns:
+        OperacionTeams registrada o None si ya había una equivalente pendiente
+    """
+    from citas.models import OperacionTeams
+    
+    if not eliminada:
+        # Cada save de la cita dispara los signals: no duplicar operaciones aún no ejecutadas
+        if OperacionTeams.objects.filter(cita=cita, tipo=tipo, estado='pendiente').exists():
+            return None
+    
+    operacion = OperacionTeams.objects.create(
+        cita=None if eliminada else cita,
+        tipo=tipo,
+        teams_event_id=cita.teams_event_id,
+        teams_organizador=cita.teams_organizador,
+        plazo=plazo_operacion_teams(cita, tipo),
+    )
+    logger.info(f"[OUTBOX] Operación #{operacion.pk} ({tipo}) registrada para cita #{cita.pk}")
+    
+    # robust: si el broker no responde, la tarea periódica recoge la operación
+    transaction.on_commit(
+        lambda: encolar_operaciones_teams([(operacion.pk, operacion.plazo)]),
+        robust=True
+    )
+    return operacion
+
+
+def ejecutar_operacion_teams(operacion) -> bool:
+    """
+    Ejecuta una operación del outbox según el estado actual de la cita
+    Es idempotente: si la cita ya no requiere la operación (ej: se canceló antes de
+    crear la reunión), no llama a Graph y se considera completada.
+    
+    Args:
+        operacion: OperacionTeams a ejecutar
+    
+    Returns:
+        True si la operación quedó resuelta
+    """
+    cita = operacion.cita
+    
+    if operacion.tipo == 'crear':
+        if cita is None or not cita.puede_crear_teams():
+            return True
+        return crear_reunion_teams_automatica(cita, operacion.pk, _organizador_operacion(operacion)) is not None
+    
+    if operacion.tipo == 'actualizar':
+        if cita is None or not cita.teams_event_id:
+            return True
+        return actualizar_reunion_teams_automatica(cita)
+    
+    if operacion.tipo == 'personalizar':
+        if cita is None or cita.estado != 'agendada' or not cita.teams_event_id:
+            return True
+        return personalizar_reunion_teams_automatica(cita)
+    
+    # eliminar
+    if cita is not None:
+        if not cita.puede_eliminar_teams():
+            return True
+        return eliminar_reunion_teams_automatica(cita)
+    
+    if not operacion.teams_event_id:
+        return True
+    
+    # Evento huérfano detectado por la reconciliación: si entre tanto el outbox terminó de
+    # crear la reunión y la asignó a una cita, el evento ya no es huérfano
+    from citas.models import Cita, ReunionPreaprovisionada
+    if Cita.objects.filter(teams_event_id=operacion.teams_event_id, estado='agendada').exists():
+        return True
+    if ReunionPreaprovisionada.objects.filter(
+        teams_event_id=operacion.teams_event_id, estado='disponible'
+    ).exists():
+        return True
+    
+    from citas.services.microsoft_teams_service import teams_service
+    return teams_service.eliminar_reunion_teams(operacion.teams_event_id, operacion.teams_organizador)
+
+
+def _registrar_operaciones_teams(operaciones) -> int:
+    """
+    Registra varias operaciones en el outbox con un solo INSERT y las encola tras el commit
+    Omite las que ya tienen una operación equivalente pendiente (misma regla que
+    registrar_operacion_teams). Una en proceso no cuenta: pudo leer la cita antes del
+    cambio que origina la nueva.
+    
+    Args:
+        operaciones: Lista de OperacionTeams sin guardar
+    
+    Returns:
+        int: Operaciones registradas
+    """
+    from citas.models import OperacionTeams
+    
+    if not operaciones:
+        return 0
+    
+    pendientes = OperacionTeams.objects.filter(estado='pendiente')
+    existentes = set(
+        pendientes.filter(cita_id__in=[op.cita_id for op in operaciones if op.cita_id])
+        .values_list('cita_id', 'tipo')
+    )
+    eventos_existentes = set(
+        pendientes.filter(
+            cita__isnull=True,
+            teams_event_id__in=[op.teams_event_id for op in operaciones if not op.cita_id],
+        ).values_list('teams_event_id', flat=True)
+    )
+    
+    nuevas = [
+        op for op in operaciones
+        if (op.cita_id, op.tipo) not in existentes
+        and (op.cita_id or op.teams_event_id not in eventos_existentes)
+    ]
+    for op in nuevas:
+        if op.plazo is None:
+            op.plazo = plazo_operacion_teams(op.cita, op.tipo)
+    nuevas = OperacionTeams.objects.bulk_create(nuevas)
+    
+    encolar = [(op.pk, op.plazo) for op in nuevas]
+    transaction.on_commit(lambda: encolar_operaciones_teams(encolar), robust=True)
+    return len(nuevas)
+
+
+def _inicio_cita(cita) -> datetime:
+    """Fecha y hora de inicio de la cita (naive, en la zona horaria de las reuniones)"""
+    return datetime.combine(cita.fecha, cita.hora_inicio)
+
+
+def _leer_fecha_graph(valor: Optional[str]) -> Optional[datetime]:
+    """Convierte un dateTime de Graph ('2025-01-07T14:00:00.0000000') en datetime naive"""
+    try:
+        return datetime.fromisoformat(valor[:19])
+    except (TypeError, ValueError):
+        return None
+
+
+def _reconciliar_cambios(eventos, buzon: str, ventana_fin: datetime, resumen: dict):
+    """
+    Compara una página de cambios del calendario con las citas y corrige las diferencias
+    
+    - Evento eliminado o cancelado en Outlook con cita agendada: se recrea la reunión
+    - Evento de una cita cancelada o de una cita que ya no existe: se elimina (huérfano)
+    - Enlace distinto al guardado: se corrige url_teams
+    - Fecha/hora distinta a la de la cita: se actualiza el evento (la cita manda)
+    - Reunión del pool eliminada en Outlook: se descarta del pool
+    
+    Solo consulta las citas de los eventos recibidos y escribe todo en bloque.
+    
+    Args:
+        eventos: Página de cambios de teams_service.obtener_cambios_calendario
+        buzon: Buzón organizador del calendario
+        ventana_fin: Fin de la ventana de la consulta delta
+        resumen: Contadores de la ejecución (se actualizan)
+    """
+    from citas.models import Cita, OperacionTeams, ReunionPreaprovisionada
+    
+    ids = [evento['id'] for evento in eventos if evento['id']]
+    citas = {
+        cita.teams_event_id: cita
+        for cita in Cita.objects.filter(teams_event_id__in=ids)
+    }
+    # Las reuniones del pool aún sin asignar no tienen cita pero no son huérfanas
+    del_pool = set(
+        ReunionPreaprovisionada.objects.filter(teams_event_id__in=ids, estado='disponible')
+        .values_list('teams_event_id', flat=True)
+    )
+    pool_eliminadas = []
+    hoy = timezone.localdate()
+    
+    citas_modificadas = []
+    operaciones = []
+    
+    for evento in eventos:
+        cita = citas.get(evento['id'])
+        
+        if evento['eliminado'] or evento['cancelado']:
+            if evento['id'] in del_pool:
+                pool_eliminadas.append(evento['id'])
+            if cita is None:
+                continue
+            
+            if cita.estado == 'agendada' and timezone.make_aware(_inicio_cita(cita)) >= ventana_fin:
+                # Graph también reporta como eliminados los eventos que salen de la ventana
+                continue
+            
+            if cita.estado == 'agendada' and cita.fecha >= hoy:
+                # La cita sigue en pie pero perdió su reunión: se crea una nueva
+                for campo in CAMPOS_REUNION_TEAMS:
+                    setattr(cita, campo, None)
+                citas_modificadas.append(cita)
+                operaciones.append(OperacionTeams(cita=cita, tipo='crear'))
+                resumen['recreadas'] += 1
+            else:
+                cita.teams_event_id = None
+                cita.teams_organizador = None
+                citas_modificadas.append(cita)
+            continue
+        
+        if cita is None:
+            # Solo se tocan los eventos que creó el sistema, nunca los del organizador
+            if evento['subject'].startswith(PREFIJO_ASUNTO_REUNION) and evento['id'] not in del_pool:
+                operaciones.append(OperacionTeams(
+                    cita=None,
+                    tipo='eliminar',
+                    teams_event_id=evento['id'],
+                    teams_organizador=buzon,
+                    # Margen para que el outbox termine de asignar las reuniones recién creadas
+                    proximo_intento=timezone.now() + timedelta(seconds=settings.TEAMS_OUTBOX_RESERVA_SEGUNDOS),
+                ))
+                resumen['huerfanos'] += 1
+            continue
+        
+        if cita.estado == 'cancelada':
+            operaciones.append(OperacionTeams(
+                cita=cita,
+                tipo='eliminar',
+                teams_event_id=cita.teams_event_id,
+                teams_organizador=cita.teams_organizador,
+            ))
+            resumen['huerfanos'] += 1
+            continue
+        
+        if cita.estado != 'agendada':
+            continue
+        
+        if evento['join_url'] and evento['join_url'] != cita.url_teams:
+            cita.url_teams = evento['join_url']
+            citas_modificadas.append(cita)
+            resumen['enlaces'] += 1
+        
+        inicio_evento = _leer_fecha_graph(evento['start'])
+        if (
+            inicio_evento
+            and evento['time_zone'] == settings.TEAMS_TIMEZONE
+            and inicio_evento != _inicio_cita(cita)
+        ):
+            operaciones.append(OperacionTeams(cita=cita, tipo='actualizar', teams_event_id=cita.teams_event_id))
+            resumen['reprogramadas'] += 1
+    
+    with transaction.atomic():
+        if citas_modificadas:
+            # bulk_update no dispara signals: la reconciliación no genera operaciones en cadena
+            Cita.objects.bulk_update(set(citas_modificadas), CAMPOS_REUNION_TEAMS)
+        if pool_eliminadas:
+            ReunionPreaprovisionada.objects.filter(
+                teams_event_id__in=pool_eliminadas, estado='disponible'
+            ).update(estado='descartada')
+        _registrar_operaciones_teams(operaciones)
+
+
+def _registrar_citas_sin_enlace(resumen: dict):
+    """
+    Registra la creación de la reunión de las citas agendadas que siguen sin enlace
+    (ej: operaciones del outbox que agotaron sus intentos)
+    Usa los índices de estado y fecha: no depende del tamaño del calendario.
+    """
+    from citas.models import Cita, OperacionTeams
+    
+    limite = timezone.now() - timedelta(seconds=settings.TEAMS_OUTBOX_RESERVA_SEGUNDOS)
+    citas = (
+        Cita.objects.filter(estado='agendada', fecha__gte=timezone.localdate(), fecha_creacion__lte=limite)
+        .filter(Q(url_teams__isnull=True) | Q(url_teams=''))
+        .only('id')[:settings.TEAMS_OUTBOX_LOTE]
+    )
+    
+    with transaction.atomic():
+        resumen['sin_enlace'] = _registrar_operaciones_teams([
+            OperacionTeams(cita=cita, tipo='crear') for cita in citas
+        ])
+
+
+def _reconciliar_buzon(buzon: str, resumen: dict) -> bool:
+    """
+    Reconcilia el calendario de un buzón organizador con las citas (ver reconciliar_calendario_teams)
+    
+    Args:
+        buzon: Buzón organizador
+        resumen: Contadores de la ejecución (se actualizan)
+    
+    Returns:
+        True si se procesaron todos los cambios y avanzó el delta link
+    """
+    import requests
+    
+    from citas.models import SincronizacionCalendario
+    from citas.services.microsoft_teams_service import DeltaInvalidoError, teams_service
+    
+    clave_bloqueo = f'teams:reconciliacion:{buzon}'
+    if not cache.add(clave_bloqueo, 1, timeout=settings.TEAMS_OUTBOX_RESERVA_SEGUNDOS):
+        logger.info(f"[RECONCILIACION] Ya hay una reconciliación en curso para {buzon}")
         return False
+    
+    try:
+        sincronizacion, _ = SincronizacionCalendario.objects.get_or_create(buzon=buzon)
+        ahora = timezone.now()
+        
+        completa = (
+            not sincronizacion.delta_link
+            or sincronizacion.iniciada_en is None
+            or ahora - sincronizacion.iniciada_en > timedelta(days=settings.TEAMS_RECONCILIACION_REINICIO_DIAS)
+        )
+        if completa:
+            sincronizacion.delta_link = ''
+            sincronizacion.iniciada_en = ahora
+            sincronizacion.ventana_inicio = ahora - timedelta(days=1)
+            sincronizacion.ventana_fin = ahora + timedelta(days=settings.TEAMS_RECONCILIACION_DIAS_FUTURO)
+            resumen['completas'] += 1
+        
+        logger.info(
+            f"[RECONCILIACION] Iniciando {buzon} "
+            f"({'sincronización completa' if completa else 'cambios desde la última ejecución'})"
+        )
+        
+        eventos_buzon = 0
+        try:
+            paginas = teams_service.obtener_cambios_calendario(
+                sincronizacion.delta_link or None,
+                sincronizacion.ventana_inicio,
+                sincronizacion.ventana_fin,
+                organizador=buzon,
+            )
+            delta_link = None
+            for eventos, delta_link in paginas:
+                eventos_buzon += len(eventos)
+                _reconciliar_cambios(eventos, buzon, sincronizacion.ventana_fin, resumen)
+        
+        except DeltaInvalidoError:
+            # Graph descartó el estado: la próxima ejecución hace la sincronización completa
+            logger.warning(f"[RECONCILIACION] Delta link inválido para {buzon}, se hará una sincronización completa")
+            SincronizacionCalendario.objects.filter(pk=sincronizacion.pk).update(delta_link='', iniciada_en=None)
+            return False
+        except requests.exceptions.RequestException as e:
+            logger.error(f"[ERROR] Reconciliación de {buzon} interrumpida: {str(e)}")
+            return False
+        finally:
+            resumen['eventos'] += eventos_buzon
+        
+        if not delta_link:
+            logger.error(f"[ERROR] Graph no retornó delta link para {buzon}: se repetirá la consulta")
+            return False
+        
+        # El delta link solo avanza si se procesaron todas las páginas
+        sincronizacion.delta_link = delta_link
+        sincronizacion.ultima_ejecucion = timezone.now()
+        sincronizacion.eventos_procesados = eventos_buzon
+        sincronizacion.save()
+        return True
+    
+    finally:
+        cache.delete(clave_bloqueo)
+
+
+def reconciliar_calendario_teams() -> Optional[dict]:
+    """
+    Reconcilia los calendarios de los buzones organizadores en Microsoft Graph con las citas
+    
+    Usa la consulta delta de Graph: cada ejecución procesa solo los eventos que cambiaron
+    desde la anterior (el delta link de cada buzón se guarda en SincronizacionCalendario),
+    así que el costo depende de los cambios y no del tamaño del calendario. Las
+    correcciones contra Graph se registran en el outbox de Teams.
+    
+    La ventana de la consulta delta es fija; cada TEAMS_RECONCILIACION_REINICIO_DIAS se
+    hace una sincronización completa con una ventana nueva.
+    
+    Returns:
+        dict: Resumen de la ejecución o None si no se completó ningún buzón
+    """
+    from citas.services.microsoft_teams_service import teams_service
+    
+    resumen = {
+        'buzones': 0,
+        'completas': 0,
+        'eventos': 0,
+        'recreadas': 0,
+        'huerfanos': 0,
+        'enlaces': 0,
+        'reprogramadas': 0,
+        'sin_enlace': 0,
+    }
+    for buzon in teams_service.organizadores:
+        if _reconciliar_buzon(buzon, resumen):
+            resumen['buzones'] += 1
+    
+    if not resumen['buzones']:
+        return None
+    
+    _registrar_citas_sin_enlace(resumen)
+    
+    logger.info(f"[RECONCILIACION] Completada: {resumen}")
+    return resumen
+
+
+def asignar_reunion_preaprovisionada(cita) -> bool:
+    """
+    Asigna a la cita una reunión del pool de su mismo horario, si hay
+    La reserva es un UPDATE condicional sobre la fila del pool: dos citas no pueden
+    tomar la misma reunión. Deja el enlace en la cita sin volver a disparar los signals;
+    la personalización (asunto, asistentes) queda a cargo del outbox.
+    
+    Args:
+        cita: Cita agendada sin enlace de Teams
+    
+    Returns:
+        True si se asignó una reunión
+    """
+    from citas.models import Cita, ReunionPreaprovisionada
+    
+    disponibles = ReunionPreaprovisionada.objects.filter(
+        fecha=cita.fecha,
+        hora_inicio=cita.hora_inicio,
+        estado='disponible',
+    )
+    
+    # Si otra cita toma la misma reunión entre el SELECT y el UPDATE, se prueba con la siguiente
+    for _ in range(3):
+        reunion = disponibles.values('pk', 'teams_event_id', 'organizador', 'url_teams').first()
+        if reunion is None:
+            return False
+        
+        ahora = timezone.now()
+        tomada = ReunionPreaprovisionada.objects.filter(pk=reunion['pk'], estado='disponible').update(
+            estado='asignada',
+            cita=cita,
+            fecha_asignacion=ahora,
+        )
+        if tomada:
+            _asignar_reunion(cita, {
+                'id': reunion['teams_event_id'],
+                'organizador': reunion['organizador'] or None,
+                'join_url': reunion['url_teams'],
+            })
+            Cita.objects.filter(pk=cita.pk).update(**{campo: getattr(cita, campo) for campo in CAMPOS_REUNION_TEAMS})
+            cita._recordar_valores(CAMPOS_REUNION_TEAMS)
+            logger.info(f"[POOL] Cita #{cita.pk} tomó la reunión preaprovisionada #{reunion['pk']}")
+            return True
+    
+    return False
+
+
+def _horarios_agendables(desde, dias: int) -> list:
+    """
+    Horarios (fecha, hora) en los que se puede agendar durante los próximos días
+    Aplica las mismas reglas que Cita.es_horario_valido y la antelación mínima.
+    """
+    from citas.models import Cita, DisponibilidadHoraria
+    
+    ahora = timezone.now()
+    antelacion = timedelta(hours=settings.ANTELACION_MINIMA_AGENDAMIENTO_HORAS)
+    paso = settings.DURACION_CITA_MINUTOS
+    
+    bloqueados = set(
+        DisponibilidadHoraria.objects.filter(
+            fecha__range=(desde, desde + timedelta(days=dias)),
+            disponible=False,
+        ).values_list('fecha', 'hora_inicio')
+    )
+    
+    horarios = []
+    for dia in range(dias + 1):
+        fecha = desde + timedelta(days=dia)
+        for minutos in range(0, 24 * 60, paso):
+            hora = (datetime.min + timedelta(minutes=minutos)).time()
+            if not Cita(fecha=fecha, hora_inicio=hora).es_horario_valido():
+                continue
+            if (fecha, hora) in bloqueados:
+                continue
+            if timezone.make_aware(datetime.combine(fecha, hora)) - ahora < antelacion:
+                continue
+            horarios.append((fecha, hora))
+    
+    return horarios
+
+
+def llenar_pool_reuniones_teams() -> dict:
+    """
+    Mantiene el pool de reuniones preaprovisionadas (pensada para horas valle)
+    
+    - Elimina de Graph las reuniones del pool cuyo horario ya pasó sin ser asignadas
+    - Crea por $batch una reunión para cada horario agendable de los próximos
+      TEAMS_POOL_DIAS días que no tenga cita ni reunión disponible
+    
+    Returns:
+        dict: {'creadas', 'descartadas', 'fallidas'}
+    """
+    from citas.models import Cita, ReunionPreaprovisionada
+    from citas.services.microsoft_teams_service import teams_service
+    
+    ahora = timezone.localtime()
+    hoy = ahora.date()
+    resumen = {'creadas': 0, 'descartadas': 0, 'fallidas': 0}
+    
+    # Reuniones vencidas: nadie las va a usar y ocupan el calendario del organizador
+    vencidas = list(
+        ReunionPreaprovisionada.objects.filter(estado='disponible')
+        .filter(Q(fecha__lt=hoy) | Q(fecha=hoy, hora_inicio__lt=ahora.time()))
+        .values_list('pk', 'teams_event_id', 'organizador')
+    )
+    if vencidas:
+        eliminadas = teams_service.eliminar_reuniones_teams_batch(
+            {pk: event_id for pk, event_id, _ in vencidas},
+            {pk: organizador for pk, _, organizador in vencidas if organizador},
+        )
+        descartadas = [pk for pk, eliminada in eliminadas.items() if eliminada]
+        resumen['descartadas'] = ReunionPreaprovisionada.objects.filter(pk__in=descartadas).update(estado='descartada')
+    
+    horarios = _horarios_agendables(hoy, settings.TEAMS_POOL_DIAS)
+    if not horarios:
+        return resumen
+    
+    rango = (horarios[0][0], horarios[-1][0])
+    ocupados = set(
+        Cita.objects.filter(estado='agendada', fecha__range=rango).values_list('fecha', 'hora_inicio')
+    )
+    ocupados.update(
+        ReunionPreaprovisionada.objects.filter(estado='disponible', fecha__range=rango)
+        .values_list('fecha', 'hora_inicio')
+    )
+    faltantes = [horario for horario in horarios if horario not in ocupados]
+    if not faltantes:
+        return resumen
+    
+    logger.info(f"[POOL] Creando {len(faltantes)} reuniones preaprovisionadas")
+    reuniones = teams_service.crear_reuniones_teams_batch({
+        indice: {
+            'asunto': f"{PREFIJO_ASUNTO_REUNION} - Disponible",
+            'fecha_inicio': timezone.make_aware(datetime.combine(fecha, hora)),
+            'duracion_minutos': settings.TEAMS_DEFAULT_MEETING_DURATION,
+            # Sin fila hasta que Graph responde: el buzón sale solo del horario (sin saltar
+            # los limitados), así el reintento del mismo transactionId va al mismo buzón
+            'organizador': teams_service.elegir_organizador(
+                f"{fecha.isoformat()}:{hora.strftime('%H:%M')}", evitar_limitados=False
+            ),
+            'transaction_id': str(uuid.uuid5(
+                NAMESPACE_TRANSACCIONES_TEAMS, f"pool:{fecha.isoformat()}:{hora.strftime('%H:%M')}:{hoy.isoformat()}"
+            )),
+        }
+        for indice, (fecha, hora) in enumerate(faltantes)
+    })
+    
+    nuevas = [
+        ReunionPreaprovisionada(
+            fecha=fecha,
+            hora_inicio=hora,
+            teams_event_id=reuniones[indice]['id'],
+            organizador=reuniones[indice]['organizador'],
+            url_teams=reuniones[indice]['join_url'],
+        )
+        for indice, (fecha, hora) in enumerate(faltantes)
+        if reuniones[indice] and reuniones[indice].get('join_url')
+    ]
+    ReunionPreaprovisionada.objects.bulk_create(nuevas)
+    
+    resumen['creadas'] = len(nuevas)
+    resumen['fallidas'] = len(faltantes) - len(nuevas)
+    logger.info(f"[POOL] Pool actualizado: {resumen}")
+    return resumen
+
+
+def crear_reuniones_teams_automaticas(citas) -> dict:
+    """
+    Crea las reuniones de Teams de varias citas con Graph $batch (hasta 20 por petición)
+    
+    Args:
+        citas: Iterable de citas agendadas sin enlace de Teams
+    
+    Returns:
+        dict: {id de la cita: URL de la reunión o None si falla}
+    """
+    citas = {cita.id: cita for cita in citas if cita.puede_crear_teams()}
+    if not citas:
+        return {}
+    
+    logger.info(f"[TEAMS] Creando reuniones Teams para {len(citas)} citas por batch")
+    
+    try:
+        from citas.models import Cita
+        from citas.services.microsoft_teams_service import teams_service
+        
+        # El buzón de cada cita se guarda antes del POST (ver _organizador_cita)
+        sin_organizador = [cita for cita in citas.values() if not cita.teams_organizador]
+        for cita in sin_organizador:
+            cita.teams_organizador = teams_service.elegir_organizador(cita.pk)
+        Cita.objects.bulk_update(sin_organizador, ['teams_organizador'])
+        for cita in sin_organizador:
+            cita._recordar_valores(['teams_organizador'])
+        
+        reuniones = teams_service.crear_reuniones_teams_batch(
+            {cita_id: _datos_reunion(cita, cita.teams_organizador) for cita_id, cita in citas.items()}
+        )
+    except Exception as e:
+        logger.error(f"[ERROR] Error creando reuniones por batch: {str(e)}")
+        return {cita_id: None for cita_id in citas}
+    
+    urls = {}
+    creadas = []
+    for cita_id, reunion_info in reuniones.items():
+        if reunion_info and reunion_info.get('join_url'):
+            _asignar_reunion(citas[cita_id], reunion_info)
+            creadas.append(citas[cita_id])
+            urls[cita_id] = reunion_info.get('join_url')
+        else:
+            urls[cita_id] = None
+            logger.error(f"[ERROR] No se pudo crear reunión Teams para cita #{cita_id}")
+    
+    if creadas:
+        with transaction.atomic():
+            # Solo se guardan las citas que siguen esperando la reunión (bloqueadas hasta el commit)
+            vigentes = set(
+                _citas_sin_reunion().select_for_update()
+                .filter(pk__in=[cita.pk for cita in creadas]).values_list('pk', flat=True)
+            )
+            sobrantes = [cita for cita in creadas if cita.pk not in vigentes]
+            creadas = [cita for cita in creadas if cita.pk in vigentes]
+            # Una sola consulta para guardar todos los enlaces (sin signals)
+            Cita.objects.bulk_update(creadas, CAMPOS_REUNION_TEAMS)
+        
+        if sobrantes:
+            logger.warning(f"[WARN] {len(sobrantes)} citas ya no esperaban su reunión: se eliminan los eventos creados")
+            _descartar_reuniones_creadas([(cita.teams_event_id, cita.teams_organizador) for cita in sobrantes])
+        for cita in sobrantes:
+            urls[cita.pk] = None
+            cita.refresh_from_db(fields=CAMPOS_REUNION_TEAMS)
+        for cita in creadas:
+            cita._recordar_valores(CAMPOS_REUNION_TEAMS)
+    
+    for cita in creadas:
+        try:
+            enviar_email_teams_creado(cita)
+        except Exception as e:
+            logger.error(f"[ERROR] No se pudo enviar email de cita #{cita.id}: {str(e)}")
+    
+    logger.info(f"[OK] Reuniones Teams creadas: {len(creadas)}/{len(citas)}")
+    return urls
+
+
+def eliminar_reuniones_teams_automaticas(citas) -> dict:
+    """
+    Elimina las reuniones de Teams de varias citas con Graph $batch
+    
+    Args:
+        citas: Iterable de citas con teams_event_id
+    
+    Returns:
+        dict: {id de la cita: True si se eliminó}
+    """
+    citas = {cita.id: cita for cita in citas if cita.puede_eliminar_teams()}
+    if not citas:
+        return {}
+    
+    logger.info(f"[TEAMS] Eliminando reuniones Teams de {len(citas)} citas por batch")
+    
+    try:
+        from citas.services.microsoft_teams_service import teams_service
+        
+        resultados = teams_service.eliminar_reuniones_teams_batch(
+            {cita_id: cita.teams_event_id for cita_id, cita in citas.items()},
+            {cita_id: cita.teams_organizador for cita_id, cita in citas.items() if cita.teams_organizador},
+        )
+    except Exception as e:
+        logger.error(f"[ERROR] Error eliminando reuniones por batch: {str(e)}")
+        return {cita_id: False for cita_id in citas}
+    
+    eliminadas = []
+    for cita_id, eliminada in resultados.items():
+        if eliminada:
+            cita = citas[cita_id]
+            for campo in CAMPOS_REUNION_TEAMS:
+                setattr(cita, campo, None)
+            eliminadas.append(cita)
+    
+    if eliminadas:
+        from citas.models import Cita
+        Cita.objects.bulk_update(eliminadas, CAMPOS_REUNION_TEAMS)
+    
+    logger.info(f"[OK] Reuniones Teams eliminadas: {len(eliminadas)}/{len(citas)}")
+    return resultados
+
+
+def actualizar_reuniones_teams_automaticas(citas) -> dict:
+    """
+    Actualiza las reuniones de Teams de varias citas con Graph $batch
+    
+    Args:
+        citas: Iterable de citas con teams_event_id
+    
+    Returns:
+        dict: {id de la cita: True si se actualizó}
+    """
+    citas = {cita.id: cita for cita in citas if cita.teams_event_id}
+    if not citas:
+        return {}
+    
+    logger.info(f"[TEAMS] Actualizando reuniones Teams de {len(citas)} citas por batch")
+    
+    try:
+        from citas.services.microsoft_teams_service import teams_service
+        
+        resultados = teams_service.actualizar_reuniones_teams_batch(
+            {cita_id: _datos_actualizacion(cita) for cita_id, cita in citas.items()}
+        )
+    except Exception as e:
+        logger.error(f"[ERROR] Error actualizando reuniones por batch: {str(e)}")
+        return {cita_id: False for cita_id in citas}
+    
+    for cita_id, actualizada in resultados.items():
+        if actualizada:
+            try:
+                enviar_email_teams_actualizado(citas[cita_id])
+            except Exception as e:
+                logger.error(f"[ERROR] No se pudo enviar email de actualización de cita #{cita_id}: {str(e)}")
+    
+    logger.info(f"[OK] Reuniones Teams actualizadas: {sum(resultados.values())}/{len(citas)}")
+    return resultados
 
 
 def enviar_email_teams_creado(cita):
-    """Envía email cuando se crea el enlace de Teams"""
+    """Registra el email con el enlace de Teams en el outbox de emails"""
     
     # Obtener datos del modelo
     nombre_solicitante = cita.get_nombre_solicitante() if hasattr(cita, 'get_nombre_solicitante') else str(cita.solicitante)
@@ -256,23 +1198,14 @@ def enviar_email_teams_creado(cita):
         'duracion': duracion,
     }
     
-    html_message = render_to_string('emails/teams_creado.html', contexto)
-    plain_message = strip_tags(html_message)
-    
-    send_mail(
-        subject=asunto,
-        message=plain_message,
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[email_solicitante],
-        html_message=html_message,
-        fail_silently=False,
-    )
+    plain_message, html_message = renderizador_emails.renderizar('teams_creado', contexto)
     
-    logger.info(f"[EMAIL] Email de Teams enviado a {email_solicitante}")
+    # Lo envía el worker del outbox de emails (reutiliza la conexión SMTP)
+    registrar_email('teams_creado', asunto, plain_message, [email_solicitante], html_message, cita)
 
 
 def enviar_email_teams_actualizado(cita):
-    """Envía email cuando se actualiza la reunión de Teams"""
+    """Registra el email de reunión de Teams actualizada en el outbox de emails"""
     
     nombre_solicitante = cita.get_nombre_solicitante() if hasattr(cita, 'get_nombre_solicitante') else str(cita.solicitante)
     email_solicitante = cita.get_email_solicitante() if hasattr(cita, 'get_email_solicitante') else cita.solicitante.email
@@ -299,16 +1232,7 @@ def enviar_email_teams_actualizado(cita):
         'tipo_atencion': tipo_atencion,
     }
     
-    html_message = render_to_string('emails/teams_actualizado.html', contexto)
-    plain_message = strip_tags(html_message)
-    
-    send_mail(
-        subject=asunto,
-        message=plain_message,
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[email_solicitante],
-        html_message=html_message,
-        fail_silently=False,
-    )
+    plain_message, html_message = renderizador_emails.renderizar('teams_actualizado', contexto)
     
-    logger.info(f"[EMAIL] Email de actualización enviado a {email_solicitante}")
\ No newline at end of file
+    # Lo envía el worker del outbox de emails (reutiliza la conexión SMTP)
+    registrar_email('teams_actualizado', asunto, plain_message, [email_solicitante], html_message, cita)
\ No newline at end of file
@@ -8,6 +8,7 @@ from django.core.exceptions import ValidationError
 from .models import Cita, Interaccion
 from .forms import CitaForm, InteraccionForm
 from .email_utils import enviar_email_confirmacion_cita, enviar_email_cancelacion_cita
+from .wizard import obtener_estado_wizard, guardar_estado_wizard
 
 
 @login_required
@@ -77,7 +78,7 @@ def cancelar_cita_view(request, cita_id):
     
     if request.method == 'POST':
         cita.estado = 'cancelada'
-        cita.save()
+        cita.guardar_cambios()
         messages.success(request, 'Cita cancelada exitosamente.')
         # TODO: Enviar correo de cancelación
         return redirect('citas:mis_citas')
@@ -243,8 +244,8 @@ def agendar_cita_publica_view(request):
                 )
                 return render(request, 'citas/agendar_paso1_solicitante.html', {'form': form})
             
-            # Guardar datos en sesión para el siguiente paso
-            request.session['solicitante_data'] = {
+            # Guardar datos en el estado del asistente para el siguiente paso
+            solicitante_data = {
                 'tipo_documento': form.cleaned_data['tipo_documento'],
                 'numero_documento': form.cleaned_data['numero_documento'],
                 'nombre': form.cleaned_data['nombre'],
@@ -266,7 +267,9 @@ def agendar_cita_publica_view(request):
             }
             
             # Redirigir al paso 2: selección de fecha y hora
-            return redirect('citas:agendar_paso2')
+            response = redirect('citas:agendar_paso2')
+            guardar_estado_wizard(request, response, {'solicitante_data': solicitante_data})
+            return response
     else:
         form = SolicitanteForm(initial=initial_data)
     
@@ -278,37 +281,35 @@ def consultar_cita_view(request):
     Vista pública para consultar citas por documento
     Valida datos del solicitante y muestra la próxima cita agendada
     """
-    from django.utils import timezone
     from .forms import ConsultarCitaForm
-    from .models import Solicitante, Cita
+    from .models import Solicitante, calcular_token_verificacion
     
     if request.method == 'POST':
         form = ConsultarCitaForm(request.POST)
         if form.is_valid():
             tipo_doc = form.cleaned_data['tipo_documento']
             numero_doc = form.cleaned_data['numero_documento']
-            celular = form.cleaned_data['celular']
-            email = form.cleaned_data['correo_electronico']
-            
-            # Buscar el último registro del solicitante
-            solicitante = Solicitante.get_ultimo_registro(tipo_doc, numero_doc)
-            
-            if not solicitante:
-                messages.error(request, 'No se encontró ningún registro con el documento proporcionado.')
-                return render(request, 'citas/consultar_cita.html', {'form': form})
+            token = calcular_token_verificacion(
+                tipo_doc,
+                numero_doc,
+                form.cleaned_data['celular'],
+                form.cleaned_data['correo_electronico']
+            )
             
-            # Validar que los datos coincidan
-            if solicitante.celular != celular or solicitante.correo_electronico != email:
-                messages.error(request, 'Los datos proporcionados no coinciden con nuestros registros.')
-                return render(request, 'citas/consultar_cita.html', {'form': form})
+            # Verificar datos y buscar la próxima cita agendada en una sola consulta
+            proxima_cita = Solicitante.get_citas_activas_verificadas(tipo_doc, numero_doc, token).first()
             
-            # Buscar la próxima cita agendada
-            proxima_cita = Cita.objects.filter(
-                solicitante__tipo_documento=tipo_doc,
-                solicitante__numero_documento=numero_doc,
-                estado='agendada',
-                fecha__gte=timezone.now().date()
-            ).select_related('solicitante').order_by('fecha', 'hora_inicio').first()
+            if not proxima_cita:
+                # Sin cita: distinguir documento inexistente, datos incorrectos o sin citas
+                token_ultimo = Solicitante.get_token_ultimo_registro(tipo_doc, numero_doc)
+                
+                if token_ultimo is None:
+                    messages.error(request, 'No se encontró ningún registro con el documento proporcionado.')
+                    return render(request, 'citas/consultar_cita.html', {'form': form})
+                
+                if token_ultimo != token:
+                    messages.error(request, 'Los datos proporcionados no coinciden con nuestros registros.')
+                    return render(request, 'citas/consultar_cita.html', {'form': form})
             
             return render(request, 'citas/consultar_cita_resultado.html', {
                 'form': form,
@@ -329,8 +330,8 @@ def agendar_paso2_fecha_view(request):
     from .email_utils import enviar_email_confirmacion_cita
     from django.utils import timezone
     
-    # Verificar que existan datos del solicitante en sesión
-    solicitante_data = request.session.get('solicitante_data')
+    # Verificar que existan datos del solicitante en el estado del asistente
+    solicitante_data = obtener_estado_wizard(request).get('solicitante_data')
     if not solicitante_data:
         messages.warning(request, 'Sesión expirada. Por favor ingresa tus datos nuevamente.')
         return redirect('citas:agendar_cita')
@@ -353,10 +354,10 @@ def agendar_paso2_fecha_view(request):
             f'a las {cita_activa_existente.hora_inicio.strftime("%H:%M")}. '
             f'No puedes agendar otra cita hasta completar o cancelar la existente.'
         )
-        # Limpiar sesión
-        if 'solicitante_data' in request.session:
-            del request.session['solicitante_data']
-        return redirect('home')
+        # Limpiar estado del asistente
+        response = redirect('home')
+        guardar_estado_wizard(request, response, {})
+        return response
     
     if request.method == 'POST':
         form = SeleccionFechaHoraForm(request.POST)
@@ -376,10 +377,10 @@ def agendar_paso2_fecha_view(request):
                     request,
                     'Ya tienes una cita agendada activa. No puedes agendar otra cita hasta completar o cancelar la existente.'
                 )
-                # Limpiar sesión
-                if 'solicitante_data' in request.session:
-                    del request.session['solicitante_data']
-                return redirect('home')
+                # Limpiar estado del asistente
+                response = redirect('home')
+                guardar_estado_wizard(request, response, {})
+                return response
             
             # Crear el Solicitante
             solicitante = Solicitante.objects.create(
@@ -433,7 +434,7 @@ def agendar_paso2_fecha_view(request):
                 if email_enviado:
                     messages.success(
                         request, 
-                        '¡Cita agendada exitosamente! Te hemos enviado un email de confirmación.'
+                        '¡Cita agendada exitosamente! Te enviaremos un email de confirmación.'
                     )
                 else:
                     messages.success(
@@ -441,13 +442,11 @@ def agendar_paso2_fecha_view(request):
                         '¡Cita agendada exitosamente! (No pudimos enviar el email de confirmación)'
                     )
                 
-                # Guardar ID de cita en sesión para confirmación
-                request.session['cita_id'] = cita.id
-                
-                # Limpiar datos del solicitante de la sesión
-                del request.session['solicitante_data']
+                # Reemplazar los datos del solicitante por el ID de la cita para la confirmación
+                response = redirect('citas:agendar_confirmacion')
+                guardar_estado_wizard(request, response, {'cita_id': cita.id})
                 
-                return redirect('citas:agendar_confirmacion')
+                return response
                 
             except ValidationError as e:
                 # Capturar errores de validación del modelo
@@ -487,8 +486,8 @@ def agendar_confirmacion_view(request):
     """
     from .models import Cita
     
-    # Obtener ID de cita de la sesión
-    cita_id = request.session.get('cita_id')
+    # Obtener ID de cita del estado del asistente
+    cita_id = obtener_estado_wizard(request).get('cita_id')
     if not cita_id:
         messages.warning(request, 'No se encontró información de la cita.')
         return redirect('home')
@@ -496,13 +495,14 @@ def agendar_confirmacion_view(request):
     # Obtener la cita
     cita = get_object_or_404(Cita, id=cita_id)
     
-    # Limpiar sesión
-    if 'cita_id' in request.session:
-        del request.session['cita_id']
-    
-    return render(request, 'citas/agendar_confirmacion.html', {
+    response = render(request, 'citas/agendar_confirmacion.html', {
         'cita': cita,
     })
+    
+    # Limpiar estado del asistente
+    guardar_estado_wizard(request, response, {})
+    
+    return response
 
 
 
@@ -511,39 +511,36 @@ def buscar_cita_cancelar_view(request):
     Vista pública para buscar citas a cancelar por documento
     Valida datos del solicitante y muestra citas agendadas que pueden cancelarse
     """
-    from django.utils import timezone
     from .forms import ConsultarCitaForm
-    from .models import Solicitante, Cita
+    from .models import Solicitante, calcular_token_verificacion
     
     if request.method == 'POST':
         form = ConsultarCitaForm(request.POST)
         if form.is_valid():
             tipo_doc = form.cleaned_data['tipo_documento']
             numero_doc = form.cleaned_data['numero_documento']
-            celular = form.cleaned_data['celular']
-            email = form.cleaned_data['correo_electronico']
-            
-            # Buscar el último registro del solicitante
-            solicitante = Solicitante.get_ultimo_registro(tipo_doc, numero_doc)
-            
-            if not solicitante:
-                messages.error(request, 'No se encontró ningún registro con el documento proporcionado.')
-                return render(request, 'citas/cancelar_cita_buscar.html', {'form': form})
-            
-            # Validar que los datos coincidan
-            if solicitante.celular != celular or solicitante.correo_electronico != email:
-                messages.error(request, 'Los datos proporcionados no coinciden con nuestros registros.')
-                return render(request, 'citas/cancelar_cita_buscar.html', {'form': form})
+            token = calcular_token_verificacion(
+                tipo_doc,
+                numero_doc,
+                form.cleaned_data['celular'],
+                form.cleaned_data['correo_electronico']
+            )
             
-            # Buscar todas las citas agendadas
-            citas = Cita.objects.filter(
-                solicitante__tipo_documento=tipo_doc,
-                solicitante__numero_documento=numero_doc,
-                estado='agendada',
-                fecha__gte=timezone.now().date()
-            ).select_related('solicitante').order_by('fecha', 'hora_inicio')
+            # Verificar datos y buscar todas las citas agendadas en una sola consulta
+            citas = list(Solicitante.get_citas_activas_verificadas(tipo_doc, numero_doc, token))
             
             if not citas:
+                # Sin citas: distinguir documento inexistente, datos incorrectos o sin citas
+                token_ultimo = Solicitante.get_token_ultimo_registro(tipo_doc, numero_doc)
+                
+                if token_ultimo is None:
+                    messages.error(request, 'No se encontró ningún registro con el documento proporcionado.')
+                    return render(request, 'citas/cancelar_cita_buscar.html', {'form': form})
+                
+                if token_ultimo != token:
+                    messages.error(request, 'Los datos proporcionados no coinciden con nuestros registros.')
+                    return render(request, 'citas/cancelar_cita_buscar.html', {'form': form})
+                
                 messages.info(request, 'No tienes citas agendadas para cancelar.')
                 return render(request, 'citas/cancelar_cita_buscar.html', {'form': form})
             
@@ -556,15 +553,40 @@ def buscar_cita_cancelar_view(request):
     return render(request, 'citas/cancelar_cita_buscar.html', {'form': form})
 
 
-def confirmar_cancelar_cita_view(request, cita_id):
+def confirmar_cancelar_cita_view(request, token):
     """
     Vista pública para confirmar y ejecutar la cancelación de una cita
-    Valida que la cita pueda cancelarse (2 horas de antelación)
+    El token firmado (enviado por email o generado tras verificar los datos) prueba
+    que quien cancela es el solicitante, sin repetir la búsqueda por documento.
+    
+    GET solo muestra la confirmación (sin consultar la base de datos), para que los
+    analizadores de enlaces de los correos no cancelen la cita al abrir el link.
+    POST valida la firma y actualiza la cita por su llave primaria.
     """
+    from datetime import date, datetime
     from .models import Cita
     from .email_utils import enviar_email_cancelacion_cita
     
-    cita = get_object_or_404(Cita, id=cita_id)
+    datos_token = Cita.leer_token_cancelacion(token)
+    if not datos_token:
+        messages.error(request, 'El enlace de cancelación no es válido o ya expiró. Busca tu cita con tus datos.')
+        return redirect('citas:cancelar_cita_buscar')
+    
+    if request.method != 'POST':
+        return render(request, 'citas/cancelar_cita_enlace.html', {
+            'fecha': date.fromisoformat(datos_token['f']),
+            'hora': datetime.strptime(datos_token['h'], '%H:%M').time(),
+        })
+    
+    cita = get_object_or_404(Cita.objects.select_related('solicitante'), pk=datos_token['id'])
+    
+    if not cita.coincide_con_token_cancelacion(datos_token):
+        messages.error(request, 'La cita fue modificada después de enviar este enlace. Busca tu cita con tus datos.')
+        return redirect('citas:cancelar_cita_buscar')
+    
+    if cita.estado == 'cancelada':
+        messages.info(request, 'Esta cita ya se encontraba cancelada.')
+        return redirect('home')
     
     # Validar que la cita pueda cancelarse
     if not cita.puede_cancelarse():
@@ -574,29 +596,25 @@ def confirmar_cancelar_cita_view(request, cita_id):
         )
         return redirect('home')
     
-    if request.method == 'POST':
-        # Cambiar estado a cancelada
-        cita.estado = 'cancelada'
-        cita.save()
-        # ========================================
-        # ENVIAR EMAIL DE CANCELACIÓN
-        # ========================================
-        email_enviado = enviar_email_cancelacion_cita(cita)
-        if email_enviado:
-            messages.success(
-                request, 
-                f'Cita cancelada exitosamente. Te hemos enviado un email de confirmación. Fecha: {cita.fecha.strftime("%d/%m/%Y")} - Hora: {cita.hora_inicio.strftime("%H:%M")}'
-            )
-        else:
-            messages.success(
-                request, 
-                f'Cita cancelada exitosamente. Fecha: {cita.fecha.strftime("%d/%m/%Y")} - Hora: {cita.hora_inicio.strftime("%H:%M")}'
-            )
-        # ========================================
-        
-        return redirect('home')
+    # Cambiar estado a cancelada
+    cita.estado = 'cancelada'
+    cita.guardar_cambios()
+    # ========================================
+    # ENVIAR EMAIL DE CANCELACIÓN
+    # ========================================
+    email_enviado = enviar_email_cancelacion_cita(cita)
+    if email_enviado:
+        messages.success(
+            request, 
+            f'Cita cancelada exitosamente. Te enviaremos un email de confirmación. Fecha: {cita.fecha.strftime("%d/%m/%Y")} - Hora: {cita.hora_inicio.strftime("%H:%M")}'
+        )
+    else:
+        messages.success(
+            request, 
+            f'Cita cancelada exitosamente. Fecha: {cita.fecha.strftime("%d/%m/%Y")} - Hora: {cita.hora_inicio.strftime("%H:%M")}'
+        )
+    # ========================================
     
-    # Si no es POST, redirigir al home
     return redirect('home')
 
 
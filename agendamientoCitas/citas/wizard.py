@@ -0,0 +1,67 @@
+# citas/wizard.py
+
+"""
+Estado del asistente público de agendamiento (paso 1 -> paso 2 -> confirmación)
+
+El estado se guarda en el cache (Redis en producción) con un TTL, identificado por
+un token aleatorio en una cookie. Así el asistente no escribe en la tabla de sesiones
+y los asistentes abandonados expiran solos.
+"""
+
+import secrets
+
+from django.conf import settings
+from django.core.cache import cache
+
+COOKIE_WIZARD = 'citas_wizard'
+
+
+def _clave_cache(wizard_id):
+    return f'citas:wizard:{wizard_id}'
+
+
+def obtener_estado_wizard(request) -> dict:
+    """
+    Obtiene el estado del asistente asociado a la petición
+
+    Returns:
+        dict: Estado guardado o un dict vacío si no existe o ya expiró
+    """
+    wizard_id = request.COOKIES.get(COOKIE_WIZARD)
+    if not wizard_id:
+        return {}
+
+    return cache.get(_clave_cache(wizard_id)) or {}
+
+
+def guardar_estado_wizard(request, response, estado: dict):
+    """
+    Guarda el estado del asistente y renueva su expiración
+    Si el estado está vacío, se elimina del cache junto con la cookie
+
+    Args:
+        request: Petición actual (para reutilizar el token existente)
+        response: Respuesta donde se fija la cookie
+        estado: Datos a guardar (serializables)
+    """
+    wizard_id = request.COOKIES.get(COOKIE_WIZARD)
+
+    if not estado:
+        if wizard_id:
+            cache.delete(_clave_cache(wizard_id))
+            response.delete_cookie(COOKIE_WIZARD)
+        return
+
+    if not wizard_id:
+        wizard_id = secrets.token_urlsafe(24)
+
+    ttl = settings.WIZARD_AGENDAMIENTO_TTL_SEGUNDOS
+    cache.set(_clave_cache(wizard_id), estado, timeout=ttl)
+    response.set_cookie(
+        COOKIE_WIZARD,
+        wizard_id,
+        max_age=ttl,
+        httponly=True,
+        samesite='Lax',
+        secure=settings.SESSION_COOKIE_SECURE,
+    )
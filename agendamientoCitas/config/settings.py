@@ -3,7 +3,9 @@ Django settings for config project.
 """
 import os
 from pathlib import Path
+from celery.schedules import crontab
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -106,6 +108,37 @@ else:
         }
     }
 
+# ============================================
+# CACHE
+# ============================================
+
+# Redis compartido entre procesos y nodos: estado del asistente de agendamiento, circuit
+# breaker y token de Graph, lock de la reconciliación. Es obligatorio fuera de DEBUG; en
+# desarrollo, sin REDIS_CACHE_URL se usa un cache en memoria válido solo para un proceso
+REDIS_CACHE_URL = config('REDIS_CACHE_URL', default='')
+
+if not REDIS_CACHE_URL and not DEBUG:
+    raise ImproperlyConfigured(
+        'REDIS_CACHE_URL es obligatorio con DEBUG=False: con un cache en memoria por proceso, '
+        'el asistente de agendamiento, el circuit breaker, el token de Graph y el lock de la '
+        'reconciliación no se comparten entre workers'
+    )
+
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+            'KEY_PREFIX': 'agendamiento',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # ============================================
 # PASSWORD VALIDATION
 # ============================================
@@ -171,6 +204,15 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=10, cast=int)
 
+# Outbox de emails (EmailSaliente): un worker de Celery los envía por lotes con una sola conexión SMTP
+EMAIL_OUTBOX_LOTE = 100
+EMAIL_OUTBOX_MAX_INTENTOS = 5
+EMAIL_OUTBOX_BACKOFF_SEGUNDOS = 60
+# Cuánto reserva un worker los emails de su lote (debe cubrir el lote completo con EMAIL_TIMEOUT)
+EMAIL_OUTBOX_RESERVA_SEGUNDOS = 20 * 60
+# Días que se conservan los emails enviados
+EMAIL_OUTBOX_DIAS = 30
+
 # Remitente por defecto
 DEFAULT_FROM_EMAIL = f'ATENEA Sistema de Citas <{EMAIL_HOST_USER}>'
 ADMIN_EMAIL = EMAIL_HOST_USER
@@ -187,6 +229,14 @@ MICROSOFT_TENANT_ID = config('MICROSOFT_TENANT_ID', default='')
 MICROSOFT_CLIENT_ID = config('MICROSOFT_CLIENT_ID', default='')
 MICROSOFT_CLIENT_SECRET = config('MICROSOFT_CLIENT_SECRET', default='')
 MICROSOFT_TEAMS_USER_ID = config('MICROSOFT_TEAMS_USER_ID', default='')
+# Buzones organizadores entre los que se reparten las reuniones (separados por coma).
+# Graph limita las peticiones por buzón: más buzones permiten crear más reuniones por minuto.
+# Por defecto solo MICROSOFT_TEAMS_USER_ID, que debe seguir en la lista (reuniones ya creadas)
+MICROSOFT_TEAMS_USER_IDS = [
+    buzon.strip()
+    for buzon in config('MICROSOFT_TEAMS_USER_IDS', default=MICROSOFT_TEAMS_USER_ID).split(',')
+    if buzon.strip()
+]
 
 # Graph API Configuration
 MICROSOFT_GRAPH_API_ENDPOINT = 'https://graph.microsoft.com/v1.0'
@@ -200,7 +250,59 @@ TEAMS_TIMEZONE = config('TIME_ZONE', default='America/Bogota')
 
 # Reintentos en caso de fallo
 TEAMS_MAX_RETRIES = 3
+# Base del backoff exponencial con jitter (segundos) y espera máxima entre reintentos
 TEAMS_RETRY_DELAY = 2
+TEAMS_RETRY_MAX_DELAY = 30
+
+# Circuit breaker de Graph (estado compartido en el cache)
+TEAMS_CIRCUITO_UMBRAL_FALLOS = 5
+TEAMS_CIRCUITO_VENTANA_SEGUNDOS = 60
+TEAMS_CIRCUITO_APERTURA_SEGUNDOS = 30
+
+# Token de Graph compartido entre procesos (requiere REDIS_CACHE_URL en producción)
+TEAMS_TOKEN_CACHE_TTL = 24 * 60 * 60
+# Los tokens que expiran dentro de este margen (segundos) se renuevan de forma proactiva
+TEAMS_TOKEN_REFRESH_MARGIN = 15 * 60
+
+# Pool de conexiones HTTP (keep-alive) hacia Graph, por proceso
+MICROSOFT_GRAPH_POOL_MAXSIZE = config('MICROSOFT_GRAPH_POOL_MAXSIZE', default=10, cast=int)
+# Reintentos a nivel de conexión (antes de enviar la petición)
+MICROSOFT_GRAPH_CONNECT_RETRIES = config('MICROSOFT_GRAPH_CONNECT_RETRIES', default=2, cast=int)
+# Peticiones simultáneas a Graph por event loop (API asíncrona)
+MICROSOFT_GRAPH_MAX_CONCURRENCIA = config('MICROSOFT_GRAPH_MAX_CONCURRENCIA', default=10, cast=int)
+
+# Outbox de operaciones de Teams (ejecutadas por Celery después del commit)
+TEAMS_OUTBOX_MAX_INTENTOS = 6
+TEAMS_OUTBOX_BACKOFF_SEGUNDOS = 60
+# Tiempo que un worker reserva una operación; debe cubrir los reintentos internos del servicio
+TEAMS_OUTBOX_RESERVA_SEGUNDOS = 10 * 60
+# Operaciones encoladas por cada ejecución del barrido periódico
+TEAMS_OUTBOX_LOTE = 200
+# Prioridad de Celery según las horas que faltan para la reunión: (horas, prioridad), 0 es la más alta.
+# Las que no entran en ningún tramo (o no tienen plazo, ej: eliminar) van con TEAMS_OUTBOX_PRIORIDAD_BASE
+TEAMS_OUTBOX_PRIORIDADES = [(2, 0), (24, 3), (7 * 24, 6)]
+TEAMS_OUTBOX_PRIORIDAD_BASE = 9
+# Operaciones a menos de estos minutos de su plazo reintentan sin backoff exponencial
+TEAMS_OUTBOX_ESCALAR_MINUTOS = 120
+
+# Reconciliación periódica del calendario del organizador con las citas (consulta delta)
+# Días hacia adelante que cubre la ventana de la consulta delta
+TEAMS_RECONCILIACION_DIAS_FUTURO = 90
+# Cada cuántos días se descarta el delta link y se sincroniza de nuevo (mueve la ventana)
+TEAMS_RECONCILIACION_REINICIO_DIAS = 7
+
+# Pool de reuniones preaprovisionadas: días hacia adelante que cubre y hora local del llenado
+TEAMS_POOL_DIAS = config('TEAMS_POOL_DIAS', default=14, cast=int)
+TEAMS_POOL_HORA_LLENADO = 2
+
+# Telemetría de las llamadas a Graph (LlamadaGraph, panel por hora en el admin)
+TEAMS_TELEMETRIA_ACTIVA = config('TEAMS_TELEMETRIA_ACTIVA', default=True, cast=bool)
+# Las filas se escriben con un solo INSERT al juntar este lote o tras este intervalo
+TEAMS_TELEMETRIA_LOTE = 50
+TEAMS_TELEMETRIA_INTERVALO_SEGUNDOS = 30
+# Días que se conserva la telemetría y horas que muestra el panel del admin
+TEAMS_TELEMETRIA_DIAS = 30
+TEAMS_TELEMETRIA_HORAS_PANEL = 24
 
 # ============================================
 # CELERY CONFIGURATION
@@ -213,6 +315,53 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Prioridades en Redis (0 = la más alta): el outbox de Teams atiende primero las reuniones más próximas.
+# Con prefetch 1 cada worker toma una tarea a la vez y las prioritarias no esperan tras las ya reservadas
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'queue_order_strategy': 'priority',
+    'priority_steps': list(range(10)),
+    'sep': ':',
+}
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+CELERY_BEAT_SCHEDULE = {
+    # Mantener vigente el token de Graph fuera del flujo de agendamiento
+    'refrescar-token-teams': {
+        'task': 'citas.tasks.refrescar_token_teams',
+        'schedule': 5 * 60,
+    },
+    # Reintentos y recuperación del outbox de operaciones de Teams
+    'procesar-outbox-teams': {
+        'task': 'citas.tasks.procesar_outbox_teams',
+        'schedule': 60,
+    },
+    # Envío de emails del outbox: reintentos y recuperación
+    'procesar-outbox-email': {
+        'task': 'citas.tasks.procesar_outbox_email',
+        'schedule': 60,
+    },
+    # Corrige diferencias entre el calendario de Teams y las citas (solo cambios recientes)
+    'reconciliar-calendario-teams': {
+        'task': 'citas.tasks.reconciliar_calendario_teams',
+        'schedule': 15 * 60,
+    },
+    # Llenar el pool de reuniones preaprovisionadas fuera del horario de atención
+    'llenar-pool-reuniones-teams': {
+        'task': 'citas.tasks.llenar_pool_reuniones_teams',
+        'schedule': crontab(hour=TEAMS_POOL_HORA_LLENADO, minute=0),
+    },
+    # Borrar la telemetría de Graph vencida
+    'limpiar-telemetria-graph': {
+        'task': 'citas.tasks.limpiar_telemetria_graph',
+        'schedule': crontab(hour=TEAMS_POOL_HORA_LLENADO, minute=30),
+    },
+    # Borrar los emails enviados antiguos del outbox
+    'limpiar-outbox-email': {
+        'task': 'citas.tasks.limpiar_outbox_email',
+        'schedule': crontab(hour=TEAMS_POOL_HORA_LLENADO, minute=45),
+    },
+}
+
 # ============================================
 # DJANGO REST FRAMEWORK
 # ============================================
@@ -236,6 +385,12 @@ DURACION_CITA_MINUTOS = 20
 ANTELACION_MINIMA_AGENDAMIENTO_HORAS = 1
 ANTELACION_MINIMA_CANCELACION_HORAS = 2
 
+# Vigencia de los enlaces firmados de cancelación enviados por email
+CANCELACION_TOKEN_VIGENCIA_DIAS = 60
+
+# Tiempo máximo entre el paso 1 y la confirmación del agendamiento público
+WIZARD_AGENDAMIENTO_TTL_SEGUNDOS = 30 * 60
+
 # ============================================
 # LOGGING
 # ============================================
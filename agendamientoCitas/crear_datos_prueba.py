@@ -12,6 +12,7 @@ django.setup()
 from django.utils import timezone
 from usuarios.models import Usuario
 from citas.models import Cita
+from citas.signals import suspender_efectos_teams
 
 def crear_usuarios_prueba():
     """Crear usuarios de prueba"""
@@ -151,7 +152,9 @@ if __name__ == '__main__':
     print("="*50)
     
     crear_usuarios_prueba()
-    crear_citas_prueba()
+    # Datos de prueba: sin reuniones reales de Teams (la cita ya trae un enlace de ejemplo)
+    with suspender_efectos_teams():
+        crear_citas_prueba()
     mostrar_resumen()
     
     print("✓ Datos de prueba creados exitosamente!")